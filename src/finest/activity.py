@@ -0,0 +1,154 @@
+""" Daily activity rollups behind the monthly and daily charts """
+from collections import defaultdict
+from datetime import date
+from django.db import connections, router, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from .models import SubmittedWebsite, Review, DailyActivity
+
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+def local_day(value):
+    """Calendar day of a datetime in the site timezone"""
+    if timezone.is_aware(value):
+        return timezone.localdate(value)
+    return value.date()
+
+
+def record_activity(changes):
+    """
+    Apply counter changes given as (user_id, day, metric, delta) tuples,
+    with one INSERT of the missing rows and one UPDATE however many users
+    and days they touch.
+    """
+    totals = defaultdict(lambda: defaultdict(int))
+    for user_id, day, metric, delta in changes:
+        if user_id and delta:
+            totals[(user_id, day)][metric] += delta
+    if not totals:
+        return
+
+    with transaction.atomic():
+        # Only increments create rows, so cascading deletes never resurrect them
+        DailyActivity.objects.bulk_create(
+            [DailyActivity(user_id=user_id, date=day)
+             for (user_id, day), metrics in totals.items()
+             if any(delta > 0 for delta in metrics.values())],
+            ignore_conflicts=True,
+        )
+        _add_to_counters(totals)
+
+
+def _add_to_counters(totals):
+    """UPDATE ... FROM (VALUES ...) adding {(user_id, day): {metric: delta}} to existing rows, floored at 0"""
+    connection = connections[router.db_for_write(DailyActivity)]
+    quote = connection.ops.quote_name
+    greatest = 'MAX' if connection.vendor == 'sqlite' else 'GREATEST'
+    table = quote(DailyActivity._meta.db_table)
+    columns = ['user_id', 'date', *DailyActivity.METRICS]
+
+    params = []
+    for (user_id, day), metrics in sorted(totals.items()):
+        params += [user_id, day, *[metrics.get(metric, 0) for metric in DailyActivity.METRICS]]
+    row = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    assignments = ', '.join(
+        f'{quote(metric)} = {greatest}({table}.{quote(metric)} + deltas.{quote(metric)}, 0)'
+        for metric in DailyActivity.METRICS
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'WITH deltas ({", ".join(map(quote, columns))}) AS (VALUES {", ".join([row] * len(totals))}) '
+            f'UPDATE {table} SET {assignments} FROM deltas '
+            f'WHERE {table}.{quote("user_id")} = deltas.{quote("user_id")} '
+            f'AND {table}.{quote("date")} = deltas.{quote("date")}',
+            params,
+        )
+
+
+def activity_series(user, metric, start=None, end=None, bucket='month'):
+    """Return [(bucket_start, total)] for a metric, read from the daily rollups"""
+    rows = DailyActivity.objects.filter(user=user, **{f'{metric}__gt': 0})
+    if start:
+        rows = rows.filter(date__gte=start)
+    if end:
+        rows = rows.filter(date__lte=end)
+
+    series = defaultdict(int)
+    for day, count in rows.order_by('date').values_list('date', metric):
+        key = day.replace(day=1) if bucket == 'month' else day
+        series[key] += count
+    return sorted(series.items())
+
+
+def chart_series(user, metric, start=None, end=None, bucket='month'):
+    """Labels and counts of the non-empty buckets, ready for the chart templates"""
+    series = activity_series(user, metric, start, end, bucket)
+    single_year = len({day.year for day, _ in series}) <= 1
+
+    labels = []
+    for day, _ in series:
+        if bucket == 'month':
+            label = MONTHS[day.month - 1]
+            labels.append(label if single_year else f'{label} {day.year}')
+        else:
+            labels.append(day.strftime('%b %d') if single_year else day.isoformat())
+    return labels, [count for _, count in series]
+
+
+def date_range_from_request(request, default_start=None, default_end=None):
+    """Read ?start=YYYY-MM-DD&end=YYYY-MM-DD&bucket=month|day from a request"""
+    try:
+        start = parse_date(request.GET.get('start', '')) or default_start
+        end = parse_date(request.GET.get('end', '')) or default_end
+    except ValueError:
+        start, end = default_start, default_end
+    bucket = 'day' if request.GET.get('bucket') == 'day' else 'month'
+    return start, end, bucket
+
+
+def current_year_range():
+    """First and last day of the current year"""
+    year = timezone.localdate().year
+    return date(year, 1, 1), date(year, 12, 31)
+
+
+def rebuild_activity(user_ids=None):
+    """Recompute the daily rollups from the raw tables"""
+    reviews = Review.objects.all()
+    websites = SubmittedWebsite.objects.all()
+    stale = DailyActivity.objects.all()
+    if user_ids is not None:
+        stale = stale.filter(user_id__in=user_ids)
+
+    sources = [
+        ('reviews_written', reviews, 'user_id', TruncDate('created_at')),
+        ('reviews_received', reviews, 'submitted_website__user_id', TruncDate('created_at')),
+        ('sites_submitted', websites, 'user_id', TruncDate('submitted_at')),
+        ('site_of_the_day_wins', websites.filter(date_site_of_the_day__isnull=False),
+         'user_id', F('date_site_of_the_day')),
+    ]
+
+    rows = defaultdict(lambda: defaultdict(int))
+    for metric, queryset, user_field, day in sources:
+        if user_ids is not None:
+            queryset = queryset.filter(**{f'{user_field}__in': user_ids})
+        counts = (
+            queryset.order_by()
+            .annotate(activity_user=F(user_field), activity_day=day)
+            .values('activity_user', 'activity_day')
+            .annotate(total=Count('id'))
+        )
+        for row in counts.iterator():
+            rows[(row['activity_user'], row['activity_day'])][metric] += row['total']
+
+    with transaction.atomic():
+        stale.delete()
+        DailyActivity.objects.bulk_create(
+            [DailyActivity(user_id=user_id, date=day, **metrics)
+             for (user_id, day), metrics in rows.items()],
+            batch_size=1000,
+        )
+    return len(rows)
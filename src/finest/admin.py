@@ -1,9 +1,128 @@
 """Admin Models"""
-from django.contrib import admin
-from .models import Contact, SubmittedWebsite, Review, Profile
-
-# Register your models here.
-admin.site.register(Contact)
-admin.site.register(SubmittedWebsite)
-admin.site.register(Review)
-admin.site.register(Profile)
+from django.contrib import admin, messages
+from django.db.models import Q
+from .models import Contact, Job, SubmittedWebsite, Review, Profile, SearchDocument
+from .moderation import clear_sites_of_the_day, delete_reviews
+from .pagination import EstimatedCountPaginator
+from .search import matching_documents
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelists of large tables: newest first on the primary key, no
+    second COUNT(*) for the unfiltered total, and estimated counts when
+    nothing is filtered.
+    """
+    ordering = ('-id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class FullTextSearchAdmin(LargeTableAdmin):
+    """
+    Search through the full-text index of finest.search instead of LIKE
+    scans of the table; a number finds the row with that id.
+    """
+    search_kind = None
+    search_document_field = None
+    # Shows the search box, the lookup itself is get_search_results
+    search_fields = ('id',)
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if search_term.isdigit():
+            return queryset.filter(pk=int(search_term)), False
+        documents = matching_documents(search_term, self.search_kind)
+        return queryset.filter(pk__in=documents.values(self.search_document_field)), False
+
+
+@admin.register(SubmittedWebsite)
+class SubmittedWebsiteAdmin(FullTextSearchAdmin):
+    """Projects, searched by title and description"""
+    list_display = ('id', 'title', 'user', 'submitted_at', 'favorite_count', 'date_site_of_the_day')
+    list_select_related = ('user',)
+    list_filter = ('submitted_at', 'date_site_of_the_day')
+    autocomplete_fields = ('user',)
+    readonly_fields = ('favorite_count', 'variants')
+    search_kind = SearchDocument.PROJECT
+    search_document_field = 'submitted_website_id'
+    search_help_text = 'Words of the title or description, or a project id.'
+    actions = ('clear_site_of_the_day',)
+
+    @admin.action(description='Clear site of the day of selected projects')
+    def clear_site_of_the_day(self, request, queryset):
+        """Withdraw the site of the day title with one UPDATE"""
+        cleared = clear_sites_of_the_day(queryset)
+        self.message_user(request, f'Cleared site of the day of {cleared} projects.', messages.SUCCESS)
+
+
+@admin.register(Review)
+class ReviewAdmin(LargeTableAdmin):
+    """Reviews, searched by the exact username of the reviewer or a project id"""
+    list_display = ('id', 'user', 'submitted_website', 'overall', 'average', 'created_at')
+    list_select_related = ('user', 'submitted_website')
+    list_filter = ('overall', 'created_at')
+    autocomplete_fields = ('user',)
+    raw_id_fields = ('submitted_website',)
+    readonly_fields = ('average',)
+    search_fields = ('=user__username',)
+    search_help_text = 'Exact username of the reviewer, or a review or project id.'
+    actions = ('delete_selected_reviews',)
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if search_term.isdigit():
+            return queryset.filter(Q(pk=search_term) | Q(submitted_website_id=search_term)), False
+        # Equality on the unique username index, where iexact would scan
+        return queryset.filter(user__username=search_term), False
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # Deletes and updates the ratings one review at a time
+        actions.pop('delete_selected', None)
+        return actions
+
+    @admin.action(description='Delete selected reviews', permissions=['delete'])
+    def delete_selected_reviews(self, request, queryset):
+        """Delete spam reviews in batches, updating the ratings once per batch"""
+        deleted = delete_reviews(queryset)
+        self.message_user(request, f'Deleted {deleted} reviews.', messages.SUCCESS)
+
+
+@admin.register(Profile)
+class ProfileAdmin(FullTextSearchAdmin):
+    """Profiles, searched by username, names, profession, location and bio"""
+    list_display = ('id', 'user', 'profession', 'location')
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
+    search_kind = SearchDocument.PROFILE
+    search_document_field = 'profile_id'
+    search_help_text = 'Username, names, profession, location or bio, or a profile id.'
+
+
+@admin.register(Contact)
+class ContactAdmin(LargeTableAdmin):
+    """Messages of the contact form"""
+    list_display = ('id', 'email', 'subject')
+    search_fields = ('=email',)
+    search_help_text = 'Exact email address.'
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        # Equality on the email index, where iexact would scan
+        return queryset.filter(email=search_term), False
+
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdmin):
+    """Background jobs, to inspect the failed ones and their timings"""
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at', 'wait_ms', 'duration_ms', 'locked_by')
+    list_filter = ('status', 'name')
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'wait_ms', 'duration_ms', 'last_error')
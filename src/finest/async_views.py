@@ -0,0 +1,71 @@
+""" Async versions of the read-heavy finest views, served under ASGI """
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.http import Http404
+from django.shortcuts import render
+from .concurrency import gather_queries
+from .instrumentation import query_budget
+from .leaderboards import aget_leaderboards
+from .snapshots import get_featured_snapshot
+from .summaries import aget_dashboard_summary
+from .views import (custom_login_required, explore_context, featured_context,
+                    recent_sites_of_the_day, time_of_day_greeting, user_page_queries)
+from .watermarks import conditional_on, user_page_key
+
+# Templates may still touch the ORM (user, profile), render off the event loop
+arender = sync_to_async(render)
+
+
+async def home(request):
+    """Homepage, loading the featured site and recent picks concurrently"""
+    featured, recent_sites = await gather_queries(get_featured_snapshot, recent_sites_of_the_day)
+
+    context = featured_context(featured)
+    context['recent_sites'] = recent_sites
+
+    return await arender(request, 'home.html', context)
+
+
+@conditional_on(user_page_key, per_user=True)
+async def user_project_detail(request, username):
+    """Public user page, loading stats, activity and projects concurrently"""
+    user = await User.objects.select_related('profile').filter(username=username).afirst()
+    if user is None:
+        raise Http404('No User matches the given query.')
+
+    queries = user_page_queries(user, request)
+    results = await gather_queries(*queries.values())
+
+    context = {
+        "title": username.upper(),
+        "user_profile": user,
+        **dict(zip(queries, results)),
+    }
+
+    return await arender(request, 'personal_info.html', context)
+
+
+@query_budget(8)
+@custom_login_required
+async def dashboard(request):
+    """User dashboard, computing a missing summary with concurrent queries"""
+    user = await request.auser()
+
+    context = {
+        'title': 'USER DASHBOARD',
+        'greeting': time_of_day_greeting(),
+        **await aget_dashboard_summary(user),
+    }
+
+    return await arender(request, 'user/dashboard.html', context)
+
+
+@custom_login_required
+async def explore(request):
+    """Explore page, rebuilding missing leaderboards concurrently"""
+    context = {
+        'title': 'EXPLORE',
+        **explore_context(await aget_leaderboards()),
+    }
+
+    return await arender(request, 'user/explore.html', context)
@@ -0,0 +1,141 @@
+""" Bulk creation of reviews and submissions for the batch API """
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from .forms import ReviewForm, SubmittedWebsiteForm
+from .models import SubmittedWebsite, Review
+from .signals import reviews_created, websites_created
+
+MAX_BATCH_SIZE = 500
+ALREADY_REVIEWED = 'You have already reviewed this project.'
+
+
+def batch_upload_max_size():
+    """Largest request body of the batch projects endpoint, in bytes"""
+    return getattr(settings, 'FINEST_BATCH_UPLOAD_MAX_SIZE', 50 * 1024 * 1024)
+
+
+def create_reviews(user, items):
+    """
+    Validate review dicts with ReviewForm and insert the valid ones in bulk.
+
+    Returns one result per item: {'index', 'id'} or {'index', 'errors'}.
+    Derived rating data is updated once for the whole batch.
+    """
+    results = [{'index': index} for index in range(len(items))]
+
+    website_ids = set()
+    for item in items:
+        try:
+            website_ids.add(int(item.get('website')))
+        except (TypeError, ValueError, AttributeError):
+            pass
+    owner_ids = dict(
+        SubmittedWebsite.objects.filter(id__in=website_ids).values_list('id', 'user_id')
+    )
+    reviewed = set(
+        Review.objects.filter(user=user, submitted_website_id__in=owner_ids)
+        .values_list('submitted_website_id', flat=True)
+    )
+
+    pending = []
+    for result, item in zip(results, items):
+        if not isinstance(item, dict):
+            result['errors'] = {'__all__': ['Each review must be an object.']}
+            continue
+        try:
+            website_id = int(item.get('website'))
+        except (TypeError, ValueError):
+            website_id = None
+
+        if website_id not in owner_ids:
+            result['errors'] = {'website': ['Website not found.']}
+            continue
+        if owner_ids[website_id] == user.pk:
+            result['errors'] = {'website': ['You cannot review your own project.']}
+            continue
+        if website_id in reviewed:
+            result['errors'] = {'website': [ALREADY_REVIEWED]}
+            continue
+
+        form = ReviewForm(item)
+        if not form.is_valid():
+            result['errors'] = form.errors.get_json_data()
+            continue
+
+        review = form.save(commit=False)
+        review.submitted_website_id = website_id
+        review.user = user
+        review.average = review.compute_average()
+        reviewed.add(website_id)
+        pending.append((result, review))
+
+    _insert_reviews(pending, owner_ids)
+    return results
+
+
+def _insert_reviews(pending, owner_ids):
+    """
+    Insert the reviews with one statement. When a concurrent request reviewed
+    some of the projects since the check, insert them one savepoint at a time
+    and report the conflicting ones.
+    """
+    if not pending:
+        return
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                Review.objects.bulk_create([review for _, review in pending])
+            inserted = pending
+        except IntegrityError:
+            inserted = []
+            for result, review in pending:
+                try:
+                    with transaction.atomic():
+                        Review.objects.bulk_create([review])
+                except IntegrityError:
+                    result['errors'] = {'website': [ALREADY_REVIEWED]}
+                else:
+                    inserted.append((result, review))
+        if inserted:
+            reviews_created([review for _, review in inserted], owner_ids)
+    for result, review in inserted:
+        result['id'] = review.pk
+
+
+def create_submissions(user, items, files, upload_errors=None):
+    """
+    Validate project dicts with SubmittedWebsiteForm and insert the valid ones
+    in bulk. The screenshot of item ``i`` is read from the ``file_<i>`` upload;
+    ``upload_errors`` are the files ImageUploadHandler dropped, by field name.
+    """
+    results = [{'index': index} for index in range(len(items))]
+    upload_errors = upload_errors or {}
+
+    pending = []
+    for result, item in zip(results, items):
+        if not isinstance(item, dict):
+            result['errors'] = {'__all__': ['Each project must be an object.']}
+            continue
+        upload_error = upload_errors.get(f"file_{result['index']}")
+        if upload_error:
+            result['errors'] = {'file': [upload_error]}
+            continue
+        form = SubmittedWebsiteForm(item, {'file': files.get(f"file_{result['index']}")})
+        if not form.is_valid():
+            result['errors'] = form.errors.get_json_data()
+            continue
+
+        submitted_website = form.save(commit=False)
+        submitted_website.user = user
+        pending.append((result, submitted_website))
+
+    if pending:
+        with transaction.atomic():
+            created = SubmittedWebsite.objects.bulk_create(
+                [submitted_website for _, submitted_website in pending]
+            )
+            websites_created(created)
+        for (result, _), submitted_website in zip(pending, created):
+            result['id'] = submitted_website.pk
+
+    return results
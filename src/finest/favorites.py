@@ -0,0 +1,62 @@
+""" Per-user favorites and the denormalized favorite count of each project """
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from .models import Favorite, SubmittedWebsite
+from .watermarks import PROFILES, PROJECTS, bump_watermarks
+
+
+def toggle_favorites(user_id, website_ids):
+    """
+    Favorite the given projects the user has not favorited yet and
+    unfavorite the others. Returns {website_id: is_favorite} for the
+    projects that exist; unknown ids are left out.
+
+    The user row is locked so concurrent toggles of one user apply one
+    after the other; counts change with single UPDATE ... SET count = count
+    +/- 1 statements, so toggles of different users never lose an update.
+    """
+    with transaction.atomic():
+        list(User.objects.select_for_update().filter(pk=user_id).values_list('pk', flat=True))
+        website_ids = set(
+            SubmittedWebsite.objects.filter(pk__in=website_ids).values_list('pk', flat=True)
+        )
+        favorites = Favorite.objects.filter(user_id=user_id, submitted_website_id__in=website_ids)
+        removed = set(favorites.values_list('submitted_website_id', flat=True))
+        added = website_ids - removed
+
+        if removed:
+            favorites.filter(submitted_website_id__in=removed).delete()
+            (SubmittedWebsite.objects.filter(pk__in=removed)
+             .update(favorite_count=F('favorite_count') - 1))
+        if added:
+            Favorite.objects.bulk_create([
+                Favorite(user_id=user_id, submitted_website_id=website_id)
+                for website_id in added
+            ])
+            (SubmittedWebsite.objects.filter(pk__in=added)
+             .update(favorite_count=F('favorite_count') + 1))
+        if removed or added:
+            # favorite_count is part of the projects and profiles APIs
+            bump_watermarks(PROJECTS, PROFILES)
+
+    return {website_id: website_id in added for website_id in website_ids}
+
+
+def user_deleted(user_id):
+    """Uncount the favorites of a user before they are deleted with it"""
+    if (SubmittedWebsite.objects.filter(favorites__user_id=user_id)
+            .update(favorite_count=F('favorite_count') - 1)):
+        bump_watermarks(PROJECTS, PROFILES)
+
+
+def rebuild_favorite_counts():
+    """Recompute every favorite count from the Favorite table, for drift repair"""
+    counts = (
+        Favorite.objects.filter(submitted_website=OuterRef('pk')).order_by()
+        .values('submitted_website').annotate(total=Count('id')).values('total')
+    )
+    return SubmittedWebsite.objects.update(
+        favorite_count=Coalesce(Subquery(counts), Value(0))
+    )
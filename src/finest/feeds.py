@@ -0,0 +1,163 @@
+""" Follower feeds: fan-out on write, merged on read for popular authors """
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Window
+from django.db.models.functions import Greatest, RowNumber
+from .models import FeedAuthor, Follow, SubmittedWebsite, TimelineEntry
+from .pagination import decode_keyset_cursor, encode_keyset_cursor, keyset_after
+
+FEED_PAGE_SIZE = 20
+# Latest projects of an author copied into a new follower's feed
+BACKFILL_SIZE = 50
+
+
+def fanout_limit():
+    """Authors with more followers are not fanned out but merged on read"""
+    return getattr(settings, 'FINEST_FEED_FANOUT_LIMIT', 1000)
+
+
+def _pulled_author_ids(user):
+    return list(
+        FeedAuthor.objects.filter(
+            follower_count__gt=fanout_limit(),
+            user_id__in=Follow.objects.filter(follower=user).values('followed_id'),
+        ).values_list('user_id', flat=True)
+    )
+
+
+def get_feed(user, cursor=None, limit=FEED_PAGE_SIZE):
+    """
+    One page of the projects of the accounts ``user`` follows, newest first.
+    Returns (projects, next_cursor); next_cursor is None on the last page.
+
+    Fanned-out projects are one range scan of the owner's timeline index.
+    Projects of authors above the fan-out limit are read from their own
+    (user, submitted_at) index and merged in.
+    """
+    position = decode_keyset_cursor(cursor)
+
+    keys = list(
+        keyset_after(TimelineEntry.objects.filter(owner=user), position,
+                     'submitted_at', 'submitted_website_id')
+        .order_by('-submitted_at', '-submitted_website_id')
+        .values_list('submitted_at', 'submitted_website_id')[:limit + 1]
+    )
+    pulled = _pulled_author_ids(user)
+    if pulled:
+        keys += (
+            keyset_after(SubmittedWebsite.objects.filter(user_id__in=pulled), position,
+                         'submitted_at', 'id')
+            .order_by('-submitted_at', '-id')
+            .values_list('submitted_at', 'id')[:limit + 1]
+        )
+        # Entries fanned out before an author grew popular appear twice
+        keys = sorted(set(keys), reverse=True)
+
+    page = keys[:limit]
+    websites = (
+        SubmittedWebsite.objects.select_related('user__profile', 'rating_stats')
+        .in_bulk([website_id for _, website_id in page])
+    )
+    projects = [websites[website_id] for _, website_id in page if website_id in websites]
+    next_cursor = encode_keyset_cursor(*page[-1]) if len(keys) > limit else None
+    return projects, next_cursor
+
+
+def _entries(owner_ids_by_website):
+    return [
+        TimelineEntry(owner_id=owner_id, submitted_website_id=website.pk,
+                      author_id=website.user_id, submitted_at=website.submitted_at)
+        for website, owner_ids in owner_ids_by_website
+        for owner_id in owner_ids
+    ]
+
+
+def fan_out(websites, batch_size=1000):
+    """Copy new projects into the feeds of their authors' followers"""
+    author_ids = {website.user_id for website in websites}
+    pulled = set(
+        FeedAuthor.objects.filter(user_id__in=author_ids, follower_count__gt=fanout_limit())
+        .values_list('user_id', flat=True)
+    )
+    followers = defaultdict(list)
+    for followed_id, follower_id in (
+        Follow.objects.filter(followed_id__in=author_ids - pulled, follower__isnull=False)
+        .values_list('followed_id', 'follower_id')
+    ):
+        followers[followed_id].append(follower_id)
+
+    TimelineEntry.objects.bulk_create(
+        _entries((website, followers[website.user_id]) for website in websites),
+        batch_size=batch_size, ignore_conflicts=True,
+    )
+
+
+def _change_follower_count(user_id, delta):
+    updated = FeedAuthor.objects.filter(pk=user_id).update(
+        follower_count=Greatest(F('follower_count') + delta, 0)
+    )
+    # Never create rows on removal, the account may be being deleted
+    if not updated and delta > 0:
+        FeedAuthor.objects.get_or_create(
+            pk=user_id,
+            defaults={'follower_count': Follow.objects.filter(followed_id=user_id).count()},
+        )
+    return FeedAuthor.objects.filter(pk=user_id).values_list('follower_count', flat=True).first()
+
+
+def follow_added(follower_id, followed_id):
+    """Count the follower and backfill the feed with the author's latest projects"""
+    if (_change_follower_count(followed_id, 1) or 0) > fanout_limit():
+        return
+    latest = (
+        SubmittedWebsite.objects.filter(user_id=followed_id)
+        .only('id', 'user_id', 'submitted_at')
+        .order_by('-submitted_at')[:BACKFILL_SIZE]
+    )
+    TimelineEntry.objects.bulk_create(
+        _entries((website, [follower_id]) for website in latest), ignore_conflicts=True
+    )
+
+
+def follow_removed(follower_id, followed_id):
+    """Uncount the follower and drop the author's projects from the feed"""
+    _change_follower_count(followed_id, -1)
+    TimelineEntry.objects.filter(owner_id=follower_id, author_id=followed_id).delete()
+
+
+def rebuild_timelines(batch_size=1000):
+    """
+    Recompute follower counts and every feed from Follow and SubmittedWebsite:
+    each follower gets the latest BACKFILL_SIZE projects of every author
+    below the fan-out limit. Returns the number of timeline entries.
+    """
+    with transaction.atomic():
+        counts = (
+            Follow.objects.filter(followed__isnull=False).values('followed')
+            .annotate(follower_count=Count('id'))
+        )
+        FeedAuthor.objects.all().delete()
+        FeedAuthor.objects.bulk_create(
+            [FeedAuthor(user_id=row['followed'], follower_count=row['follower_count']) for row in counts],
+            batch_size=batch_size,
+        )
+
+        followers = defaultdict(list)
+        for followed_id, follower_id in (
+            Follow.objects.filter(follower__isnull=False, followed__isnull=False)
+            .exclude(followed__feed_author__follower_count__gt=fanout_limit())
+            .values_list('followed_id', 'follower_id')
+        ):
+            followers[followed_id].append(follower_id)
+
+        latest = (
+            SubmittedWebsite.objects.filter(user_id__in=list(followers))
+            .only('id', 'user_id', 'submitted_at')
+            .annotate(rank=Window(RowNumber(), partition_by='user', order_by='-submitted_at'))
+            .filter(rank__lte=BACKFILL_SIZE)
+        )
+        TimelineEntry.objects.all().delete()
+        entries = _entries((website, followers[website.user_id]) for website in latest)
+        TimelineEntry.objects.bulk_create(entries, batch_size=batch_size)
+        return len(entries)
@@ -7,7 +7,9 @@ from django.core.exceptions import ValidationError
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
-from .models import Contact, SubmittedWebsite, Review, Profile
+from .models import Contact, SubmittedWebsite, Review, Profile, SearchDocument
+from .search import MAX_SEARCH_PAGE
+from .uploadhandlers import ALLOWED_EXTENSIONS, MAX_IMAGE_UPLOAD_SIZE, SIZE_ERROR, TYPE_ERROR
 
 class RegisterUserForm(UserCreationForm):
     """ Adding user registration form fields """
@@ -86,14 +88,12 @@ class SubmittedWebsiteForm(forms.ModelForm):
     def clean_file(self):
         """ File validation """
         file = self.cleaned_data.get('file')
-        max_size_kb = 5000
-        allowed_extensions = ['.jpg', '.jpeg', '.png', '.webp']
         ext = os.path.splitext(file.name)[1].lower()
 
-        if file.size > max_size_kb * 1024:
-            raise forms.ValidationError("File size cannot exceed 5 MB.")
-        if ext not in allowed_extensions:
-            raise forms.ValidationError("Only .jpg, .jpeg, .png, .webp files are allowed.")
+        if file.size > MAX_IMAGE_UPLOAD_SIZE:
+            raise forms.ValidationError(SIZE_ERROR)
+        if ext not in ALLOWED_EXTENSIONS:
+            raise forms.ValidationError(TYPE_ERROR)
         return file
 
 
@@ -119,11 +119,11 @@ class ReviewForm(forms.ModelForm):
         usability = cleaned_data.get("usability")
         content = cleaned_data.get("content")
 
-        if not 1 <= design <= 10:
+        if design is not None and not 1 <= design <= 10:
             self.add_error('design', 'Rating should be between 1 and 10.')
-        if not 1 <= usability <= 10:
+        if usability is not None and not 1 <= usability <= 10:
             self.add_error('usability', 'Rating should be between 1 and 10.')
-        if not 1 <= content <= 10:
+        if content is not None and not 1 <= content <= 10:
             self.add_error('content', 'Rating should be between 1 and 10.')
 
         return cleaned_data
@@ -145,6 +145,19 @@ class ProfileForm(forms.ModelForm):
     facebook = forms.URLField(required=False)
     instagram = forms.URLField(required=False)
 
+    def clean_profile_picture(self):
+        """ Profile picture validation """
+        picture = self.cleaned_data.get('profile_picture')
+        if not picture or not hasattr(picture, 'size'):
+            return picture
+        ext = os.path.splitext(picture.name)[1].lower()
+
+        if picture.size > MAX_IMAGE_UPLOAD_SIZE:
+            raise forms.ValidationError(SIZE_ERROR)
+        if ext not in ALLOWED_EXTENSIONS:
+            raise forms.ValidationError(TYPE_ERROR)
+        return picture
+
     def clean_github(self):
         """ URL validation """
         github = self.cleaned_data.get('github')
@@ -239,3 +252,46 @@ class ContactForm(forms.ModelForm):
                 {'message': "Message must not exceed a length 255 characters."})
 
         return cleaned_data
+
+
+class SearchForm(forms.Form):
+    """ Search query and filters, shared by the search page and API """
+    q = forms.CharField(max_length=200, required=False)
+    kind = forms.ChoiceField(
+        choices=[('', 'Everything')] + SearchDocument.KIND_CHOICES, required=False
+    )
+    user = forms.CharField(max_length=150, required=False)
+    min_rating = forms.FloatField(min_value=0, max_value=10, required=False)
+    page = forms.IntegerField(min_value=1, max_value=MAX_SEARCH_PAGE, required=False)
+
+    def clean_page(self):
+        """ First page by default """
+        return self.cleaned_data.get('page') or 1
+
+
+class MyReviewsFilterForm(forms.Form):
+    """ Rating and date filters and sort order of the My Reviews page """
+    rating = forms.TypedChoiceField(
+        choices=[('', 'All reviews')] + [(i, f"{i} star{'s' if i > 1 else ''}") for i in range(5, 0, -1)],
+        coerce=int, empty_value=None, required=False,
+    )
+    date_from = forms.DateField(required=False)
+    date_to = forms.DateField(required=False)
+    sort = forms.ChoiceField(
+        choices=[('newest', 'Newest first'), ('oldest', 'Oldest first'),
+                 ('highest', 'Highest rated'), ('lowest', 'Lowest rated')],
+        required=False,
+    )
+    cursor = forms.CharField(max_length=200, required=False)
+
+    def clean_sort(self):
+        """ Newest first by default """
+        return self.cleaned_data.get('sort') or 'newest'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get('date_from')
+        date_to = cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise ValidationError({'date_to': "End date must not be before the start date."})
+        return cleaned_data
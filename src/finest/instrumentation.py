@@ -0,0 +1,221 @@
+""" Per-request SQL, cache and template instrumentation """
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+logger = logging.getLogger(__name__)
+
+_current_metrics = ContextVar('finest_request_metrics', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    """A request issued more SQL queries than its view allows"""
+
+
+class RequestMetrics:
+    """Counters of a single request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.template_time = 0.0
+        # Async views run queries from several threads at once
+        self.lock = threading.Lock()
+
+    def add_query(self, duration):
+        with self.lock:
+            self.queries += 1
+            self.db_time += duration
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Value of the Server-Timing header, durations in milliseconds"""
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'total;dur={self.total_time * 1000:.1f}',
+        ])
+
+
+def _time_query(execute, sql, params, many, context):
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(time.perf_counter() - started)
+
+
+def instrument_connection(connection):
+    """
+    Time the queries of a connection for whichever request runs them. The
+    metrics are found through a context variable, which follows a request
+    into the threads its async views hand their queries to.
+    """
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+@receiver(connection_created)
+def _instrument_new_connection(sender, connection, **kwargs):
+    instrument_connection(connection)
+
+
+def current_metrics():
+    """Metrics of the request being handled, or None outside of a request"""
+    return _current_metrics.get()
+
+
+def record_cache_lookup(hits=0, misses=0):
+    """Count cache hits and misses of the current request"""
+    metrics = _current_metrics.get()
+    if metrics is not None:
+        with metrics.lock:
+            metrics.cache_hits += hits
+            metrics.cache_misses += misses
+
+
+def query_budget(max_queries):
+    """
+    Declare the most SQL queries a request to the view may issue, counting
+    the session and user lookups of the middleware. Use with
+    method_decorator(..., name='dispatch') on class-based views.
+    """
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+class TimedTemplate(Template):
+    """Template adding its render time to the current request"""
+
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics = _current_metrics.get()
+            if metrics is not None:
+                with metrics.lock:
+                    metrics.template_time += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """
+    Django template backend timing every render. Included templates are
+    rendered inside their parent and counted once, with it.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Count the queries, database time, cache hits and template render time of
+    every request. They are sent back as a Server-Timing header and logged
+    as one line per request.
+
+    A view exceeding its query budget, declared with @query_budget or in the
+    FINEST_QUERY_BUDGETS setting by URL name, raises QueryBudgetExceeded when
+    FINEST_QUERY_BUDGET_STRICT is on (tests) and logs a warning otherwise.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        for connection in connections.all(initialized_only=True):
+            instrument_connection(connection)
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        """Attach the header, log the request and enforce the budget"""
+        response['Server-Timing'] = metrics.server_timing()
+        self.log(request, response, metrics)
+        self.check_budget(request, metrics)
+        return response
+
+    def log(self, request, response, metrics):
+        """Write the structured request line"""
+        resolver_match = getattr(request, 'resolver_match', None)
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'view': resolver_match.url_name if resolver_match else None,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'db_ms': round(metrics.db_time * 1000, 1),
+            'cache_hits': metrics.cache_hits,
+            'cache_misses': metrics.cache_misses,
+            'template_ms': round(metrics.template_time * 1000, 1),
+            'total_ms': round(metrics.total_time * 1000, 1),
+        }
+        logger.info(
+            ' '.join(f'{name}=%s' for name in fields), *fields.values(),
+            extra={'request_metrics': fields},
+        )
+
+    def check_budget(self, request, metrics):
+        """Raise or warn when the view issued more queries than allowed"""
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match is None:
+            return
+        budget = getattr(resolver_match.func, 'query_budget', None)
+        if budget is None:
+            budget = getattr(settings, 'FINEST_QUERY_BUDGETS', {}).get(resolver_match.url_name)
+        if budget is None or metrics.queries <= budget:
+            return
+        message = (
+            f'{request.method} {request.path} issued {metrics.queries} queries, '
+            f'the budget is {budget}'
+        )
+        if getattr(settings, 'FINEST_QUERY_BUDGET_STRICT', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
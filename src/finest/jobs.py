@@ -0,0 +1,190 @@
+""" Durable background jobs stored in the database, run by manage.py run_jobs """
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+from functools import partial
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Job name -> function called with the payload as keyword arguments
+TASKS = {
+    'generate_variants': 'finest.thumbnails.generate_variants',
+    'fan_out': 'finest.tasks.fan_out_websites',
+    'site_snapshots': 'finest.tasks.compute_site_snapshots',
+    'save_contact': 'finest.tasks.save_contact',
+}
+# Retry delays double from BACKOFF_BASE up to BACKOFF_MAX seconds
+BACKOFF_BASE = 10
+BACKOFF_MAX = 3600
+
+
+class JobLost(Exception):
+    """A job was taken back from its worker while it ran, its changes are rolled back"""
+
+
+def jobs_eager():
+    """
+    Run jobs in the enqueuing process once its transaction commits instead
+    of in a worker (tests, development); their exceptions propagate.
+    """
+    return getattr(settings, 'FINEST_JOBS_EAGER', False)
+
+
+def job_timeout():
+    """Seconds after which a running job is considered lost with its worker and retried"""
+    return getattr(settings, 'FINEST_JOB_TIMEOUT', 600)
+
+
+def enqueue(name, payload=None, key=None, delay=0, max_attempts=5):
+    """
+    Queue a job. The row is written in the current transaction, so workers
+    see it once the request commits and never if it rolls back. With a
+    ``key``, a job is not queued again while one with the same key waits.
+    """
+    enqueue_many(name, [payload or {}], keys=[key], delay=delay, max_attempts=max_attempts)
+
+
+def enqueue_many(name, payloads, keys=None, delay=0, max_attempts=5):
+    """Queue one job per payload with a single INSERT, see enqueue"""
+    if name not in TASKS:
+        raise ValueError(f'Unknown job {name}')
+    keys = keys or [None] * len(payloads)
+    if jobs_eager():
+        for payload in payloads:
+            transaction.on_commit(partial(import_string(TASKS[name]), **payload))
+        return
+    run_at = timezone.now() + timedelta(seconds=delay)
+    Job.objects.bulk_create(
+        [Job(name=name, payload=payload, key=key, max_attempts=max_attempts, run_at=run_at)
+         for payload, key in zip(payloads, keys)],
+        ignore_conflicts=any(key is not None for key in keys),
+    )
+
+
+def backoff(attempts):
+    """Seconds before retrying a job which failed ``attempts`` times, with jitter"""
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def worker_name():
+    """Host, process and thread of the caller, to tell workers apart in locked_by"""
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def claim_jobs(worker, limit):
+    """
+    Mark up to ``limit`` due jobs as running for ``worker`` and return them.
+    On PostgreSQL workers skip the rows others are claiming; the
+    conditional UPDATE makes the claim safe on any database.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        candidates = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.QUEUED, run_at__lte=now)
+            .order_by('run_at', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        claimed = [
+            job_id for job_id in candidates
+            if Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+                # Retries must not collide with a newer job queued under the key
+                status=Job.RUNNING, locked_by=worker, started_at=now, attempts=F('attempts') + 1,
+                key=None,
+            )
+        ]
+    return list(Job.objects.filter(pk__in=claimed).order_by('run_at', 'id'))
+
+
+def run_job(job):
+    """
+    Run a job returned by claim_jobs and record its outcome and timing;
+    returns the job.
+
+    The task and the job's completion commit together, so a task that only
+    writes to the database takes effect exactly once even when retried.
+    """
+    started = time.perf_counter()
+    try:
+        with transaction.atomic():
+            import_string(TASKS[job.name])(**job.payload)
+            job.status = Job.DONE
+            job.last_error = ''
+            _finish(job, started)
+    except JobLost:
+        logger.warning('Job %s #%s was taken back from this worker', job.name, job.pk)
+        return job
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + timedelta(seconds=backoff(job.attempts))
+        else:
+            job.status = Job.FAILED
+        try:
+            _finish(job, started)
+        except JobLost:
+            pass
+
+    logger.info(
+        'job=%s id=%s status=%s attempt=%s wait_ms=%.1f run_ms=%.1f',
+        job.name, job.pk, job.status, job.attempts, job.wait_ms, job.duration_ms,
+        extra={'job_metrics': {'name': job.name, 'status': job.status, 'attempt': job.attempts,
+                               'wait_ms': job.wait_ms, 'run_ms': job.duration_ms}},
+    )
+    return job
+
+
+def run_job_in_worker(job):
+    """run_job for pool threads and processes, which manage their own connections"""
+    close_old_connections()
+    try:
+        return run_job(job)
+    finally:
+        close_old_connections()
+
+
+def _finish(job, started):
+    """Store the outcome of the attempt, only if the job is still this worker's"""
+    job.finished_at = timezone.now()
+    job.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+    job.wait_ms = round((job.started_at - job.created_at).total_seconds() * 1000, 1)
+    updated = Job.objects.filter(
+        pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by, attempts=job.attempts,
+    ).update(
+        status=job.status, run_at=job.run_at, finished_at=job.finished_at,
+        duration_ms=job.duration_ms, wait_ms=job.wait_ms, last_error=job.last_error,
+    )
+    if not updated:
+        raise JobLost(job.pk)
+
+
+def requeue_lost_jobs():
+    """
+    Queue again the jobs running for longer than the timeout, their worker
+    died or hangs; those out of attempts fail. Returns the number requeued.
+    """
+    now = timezone.now()
+    lost = Job.objects.filter(status=Job.RUNNING, started_at__lt=now - timedelta(seconds=job_timeout()))
+    lost.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=now, locked_by='', last_error='Timed out',
+    )
+    return lost.update(status=Job.QUEUED, run_at=now, locked_by='')
+
+
+def prune_jobs(days):
+    """Delete the jobs done more than ``days`` ago; failed jobs are kept for inspection"""
+    cutoff = timezone.now() - timedelta(days=days)
+    return Job.objects.filter(status=Job.DONE, started_at__lt=cutoff).delete()[0]
@@ -0,0 +1,87 @@
+""" Cached top-N project lists used by Explore and elsewhere """
+from functools import partial
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from .concurrency import gather_queries
+from .instrumentation import record_cache_lookup
+from .models import SubmittedWebsite
+
+LEADERBOARD_SIZE = 5
+CACHE_TIMEOUT = 60 * 60
+CACHE_PREFIX = 'finest:leaderboard:'
+
+# name -> (rating dimension or None, annotation used by the templates)
+LEADERBOARDS = {
+    'recent': (None, None),
+    'top_rated': ('average', 'avg_user_score'),
+    'design': ('design', 'avg_design_score'),
+    'content': ('content', 'avg_content_score'),
+    'usability': ('usability', 'avg_usability_score'),
+}
+RATING_LEADERBOARDS = [name for name, (dimension, _) in LEADERBOARDS.items() if dimension]
+
+
+def _cache_key(name):
+    return f'{CACHE_PREFIX}{name}'
+
+
+def build_leaderboard(name, limit=LEADERBOARD_SIZE):
+    """
+    Query the top projects of a leaderboard straight from the database.
+    Rated lists are ordered by the stored Bayesian score, an index scan of
+    rating_score_<dimension>_idx, and show the plain average.
+    """
+    dimension, annotation = LEADERBOARDS[name]
+    if dimension is None:
+        projects = SubmittedWebsite.objects.order_by('-submitted_at', '-id')
+    else:
+        projects = (
+            SubmittedWebsite.objects.filter(rating_stats__review_count__gt=0)
+            .annotate(**{annotation: F(f'rating_stats__avg_{dimension}')})
+            .order_by(f'-rating_stats__score_{dimension}', '-rating_stats__submitted_website')
+        )
+    return list(projects.select_related('user')[:limit])
+
+
+def _missing(names, cached):
+    return [name for name in names if _cache_key(name) not in cached]
+
+
+def _merge(names, cached, missing):
+    record_cache_lookup(hits=len(names) - len(missing), misses=len(missing))
+    found = {**cached, **missing}
+    return {name: found[_cache_key(name)] for name in names}
+
+
+def get_leaderboards(*names):
+    """Return {name: [projects]}, rebuilding and caching only the missing lists"""
+    names = names or tuple(LEADERBOARDS)
+    cached = cache.get_many([_cache_key(name) for name in names])
+    missing = {_cache_key(name): build_leaderboard(name) for name in _missing(names, cached)}
+    if missing:
+        cache.set_many(missing, CACHE_TIMEOUT)
+    return _merge(names, cached, missing)
+
+
+async def aget_leaderboards(*names):
+    """get_leaderboards rebuilding the missing lists concurrently"""
+    names = names or tuple(LEADERBOARDS)
+    cached = await cache.aget_many([_cache_key(name) for name in names])
+    missing_names = _missing(names, cached)
+    built = await gather_queries(*[partial(build_leaderboard, name) for name in missing_names])
+    missing = {_cache_key(name): board for name, board in zip(missing_names, built)}
+    if missing:
+        await cache.aset_many(missing, CACHE_TIMEOUT)
+    return _merge(names, cached, missing)
+
+
+def get_leaderboard(name):
+    """Top projects for a single leaderboard"""
+    return get_leaderboards(name)[name]
+
+
+def invalidate_leaderboards(*names):
+    """Drop cached lists once the current transaction commits"""
+    keys = [_cache_key(name) for name in (names or LEADERBOARDS)]
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,194 @@
+""" Benchmark every finest URL """
+import asyncio
+import json
+import re
+import statistics
+import time
+import tracemalloc
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client, override_settings
+from django.urls import NoReverseMatch, URLPattern, reverse
+from finest import urls as finest_urls
+from finest.models import SubmittedWebsite
+from .seed_finest import SEED_PREFIX
+
+# Views that change state on GET
+SKIPPED_URLS = {'logout', 'follow_toggle'}
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+class Command(BaseCommand):
+    """Measure wall time, query count and peak allocated memory per URL.
+
+    Run it against a database seeded with seed_finest. Results are written
+    as JSON; with --baseline the run fails when a URL got slower, heavier or
+    issues more queries than the stored baseline.
+
+    --asgi sends the requests through the ASGI handler. To compare the async
+    views with the sync path, store a baseline of a plain run and compare a
+    FINEST_ASYNC_VIEWS=True run with --asgi against it. A local SQLite file
+    answers in microseconds; --latency adds a network round trip per query
+    to model a database server.
+    """
+    help = 'Benchmark every URL of finest/urls.py and compare against a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username to log in as (default: first seeded user).')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument('--baseline', help='JSON file of a previous run to compare with.')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed relative slowdown / memory growth (default 0.25).')
+        parser.add_argument('--asgi', action='store_true',
+                            help='Request through the ASGI handler instead of WSGI.')
+        parser.add_argument('--latency', type=float, default=0,
+                            help='Simulated database round trip per query, in ms.')
+        parser.add_argument('--cold-cache', action='store_true',
+                            help='Clear the cache before every request.')
+
+    def get_user(self, username):
+        """User the benchmark logs in as"""
+        users = User.objects.all()
+        if username:
+            user = users.filter(username=username).first()
+        else:
+            user = users.filter(username__startswith=SEED_PREFIX).order_by('id').first()
+        if user is None:
+            raise CommandError('No user to benchmark with, run seed_finest or pass --user.')
+        return user
+
+    def get_urls(self, user):
+        """Resolve every named finest URL with sample arguments"""
+        own_website = SubmittedWebsite.objects.filter(user=user).order_by('id').first()
+        any_website = own_website or SubmittedWebsite.objects.order_by('id').first()
+        other_user = User.objects.exclude(pk=user.pk).order_by('id').first() or user
+        profile = getattr(user, 'profile', None)
+
+        sample_kwargs = {
+            'my_post_detail': {'pk': own_website.pk if own_website else 0},
+            'all_post_details': {'pk': any_website.pk if any_website else 0},
+            'add_review': {'pk': any_website.pk if any_website else 0},
+            'user_detail': {'username': other_user.username},
+            'edit_profile': {'username': user.username},
+            'api_profile_projects': {'pk': profile.pk if profile else 0},
+        }
+
+        urls = {}
+        for pattern in finest_urls.urlpatterns:
+            if not isinstance(pattern, URLPattern) or not pattern.name:
+                continue
+            if pattern.name in SKIPPED_URLS:
+                continue
+            try:
+                urls[pattern.name] = reverse(pattern.name, kwargs=sample_kwargs.get(pattern.name))
+            except NoReverseMatch as exc:
+                self.stderr.write(f'Skipping {pattern.name}: {exc}')
+        return urls
+
+    def get(self, client, url):
+        """GET url and return the response and its query count"""
+        if self.cold_cache:
+            cache.clear()
+        if isinstance(client, AsyncClient):
+            response = self.loop.run_until_complete(client.get(url, secure=True))
+        else:
+            response = client.get(url, secure=True)
+        # Counted by the instrumentation middleware, including the queries
+        # async views run in worker threads
+        match = SERVER_TIMING_QUERIES.search(response.get('Server-Timing', ''))
+        if match is None:
+            raise CommandError('No Server-Timing header, is RequestInstrumentationMiddleware enabled?')
+        return response, int(match.group(1))
+
+    def measure(self, client, url, repeat):
+        """Median wall time, query count and peak memory of GET url"""
+        self.get(client, url)  # warm up caches and connections
+
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response, query_count = self.get(client, url)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        tracemalloc.start()
+        self.get(client, url)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {
+            'url': url,
+            'status': response.status_code,
+            'time_ms': round(statistics.median(timings), 3),
+            'queries': query_count,
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    def compare(self, results, baseline, tolerance):
+        """List of human readable regressions against the baseline"""
+        regressions = []
+        for name, result in results.items():
+            base = baseline.get(name)
+            if not base:
+                continue
+            if result['queries'] > base['queries']:
+                regressions.append(f"{name}: {base['queries']} -> {result['queries']} queries")
+            if result['time_ms'] > base['time_ms'] * (1 + tolerance):
+                regressions.append(f"{name}: {base['time_ms']} -> {result['time_ms']} ms")
+            if result['peak_kb'] > base['peak_kb'] * (1 + tolerance):
+                regressions.append(f"{name}: {base['peak_kb']} -> {result['peak_kb']} KB peak")
+        return regressions
+
+    def simulate_latency(self, latency):
+        """Delay every query of every connection, including ones opened later"""
+        def delay(execute, sql, params, many, context):
+            time.sleep(latency / 1000)
+            return execute(sql, params, many, context)
+
+        def add_delay(connection, **kwargs):
+            if delay not in connection.execute_wrappers:
+                connection.execute_wrappers.append(delay)
+
+        for connection in connections.all(initialized_only=True):
+            add_delay(connection)
+        connection_created.connect(add_delay, weak=False)
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        self.cold_cache = options['cold_cache']
+        if options['asgi']:
+            client = AsyncClient()
+            self.loop = asyncio.new_event_loop()
+        else:
+            client = Client()
+        client.force_login(user)
+        if options['latency']:
+            self.simulate_latency(options['latency'])
+
+        results = {}
+        # The test clients send "Host: testserver"
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name, url in self.get_urls(user).items():
+                results[name] = result = self.measure(client, url, options['repeat'])
+                self.stdout.write(
+                    f"{name:<24} {result['status']:>3} {result['time_ms']:>10.2f} ms "
+                    f"{result['queries']:>4} queries {result['peak_kb']:>10.1f} KB"
+                )
+        if options['asgi']:
+            self.loop.close()
+
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+        self.stdout.write(f"Results written to {options['output']}")
+
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as baseline_file:
+                baseline = json.load(baseline_file)
+            regressions = self.compare(results, baseline, options['tolerance'])
+            if regressions:
+                raise CommandError('Regressions against the baseline:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
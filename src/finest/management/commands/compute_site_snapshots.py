@@ -0,0 +1,30 @@
+""" Compute featured site and site of the day snapshots """
+from django.core.management.base import BaseCommand
+from finest.snapshots import compute_featured_site, compute_sites_of_the_day
+
+
+class Command(BaseCommand):
+    """Precompute the homepage picks so home() only reads them.
+
+    Meant to be scheduled (e.g. cron) shortly after midnight.
+    """
+    help = 'Compute the featured site and site of the day snapshots for the homepage'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=6,
+            help='Number of previous days to backfill site of the day picks for.'
+        )
+
+    def handle(self, *args, **options):
+        featured = compute_featured_site()
+        if featured:
+            self.stdout.write(f'Featured site: {featured.submitted_website_id} ({featured.score})')
+        else:
+            self.stdout.write('No reviews available yet, no featured site computed.')
+
+        picked = compute_sites_of_the_day(days=options['days'])
+        for snapshot in picked:
+            self.stdout.write(f'Site of the day {snapshot.date}: {snapshot.submitted_website_id}')
+
+        self.stdout.write(self.style.SUCCESS(f'Computed {len(picked)} site of the day picks.'))
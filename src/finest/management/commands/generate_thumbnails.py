@@ -0,0 +1,26 @@
+""" Generate resized screenshot variants """
+from django.core.management.base import BaseCommand
+from finest.models import SubmittedWebsite
+from finest.thumbnails import generate_variants, needs_variants
+
+
+class Command(BaseCommand):
+    """Backfill thumbnails and WebP / AVIF variants of uploaded screenshots"""
+    help = 'Generate missing resized variants of project screenshots'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Regenerate variants even when they are up to date.')
+
+    def handle(self, *args, **options):
+        generated = 0
+        websites = SubmittedWebsite.objects.exclude(file='').only('id', 'file', 'variants')
+        for website in websites.iterator(chunk_size=500):
+            if not options['all'] and not needs_variants(website):
+                continue
+            try:
+                generate_variants(website.pk)
+                generated += 1
+            except (OSError, ValueError) as exc:
+                self.stderr.write(f'Website {website.pk}: {exc}')
+        self.stdout.write(self.style.SUCCESS(f'Generated variants for {generated} websites.'))
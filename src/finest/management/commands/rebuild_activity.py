@@ -0,0 +1,18 @@
+""" Rebuild the daily activity rollups """
+from django.core.management.base import BaseCommand
+from finest.activity import rebuild_activity
+
+
+class Command(BaseCommand):
+    """Backfill DailyActivity or repair drift from the raw tables"""
+    help = 'Recompute the per-user daily activity rollups from reviews and submissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='Only rebuild the given user id (can be repeated).'
+        )
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_activity(user_ids=options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} daily activity rows.'))
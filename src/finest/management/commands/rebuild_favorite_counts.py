@@ -0,0 +1,12 @@
+""" Rebuild the favorite counts """
+from django.core.management.base import BaseCommand
+from finest.favorites import rebuild_favorite_counts
+
+
+class Command(BaseCommand):
+    """Repair drift of SubmittedWebsite.favorite_count from the Favorite table"""
+    help = 'Recompute the favorite count of every project'
+
+    def handle(self, *args, **options):
+        websites = rebuild_favorite_counts()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt favorite counts for {websites} websites.'))
@@ -0,0 +1,22 @@
+""" Rebuild the per-website rating aggregates """
+from django.core.management.base import BaseCommand
+from finest.ratings import rebuild_rating_stats
+
+
+class Command(BaseCommand):
+    """Backfill WebsiteRatingStats or repair drift from the Review table"""
+    help = 'Recompute the per-website rating aggregates from all reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--website', type=int, action='append', dest='website_ids',
+            help='Only rebuild the given website id (can be repeated).'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_rating_stats(
+            website_ids=options['website_ids'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating stats for {rebuilt} websites.'))
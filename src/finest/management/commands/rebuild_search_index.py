@@ -0,0 +1,15 @@
+""" Rebuild the full-text search index """
+from django.core.management.base import BaseCommand
+from finest.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    """Backfill SearchDocument or repair drift from projects and profiles"""
+    help = 'Recompute the search documents of every project and profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        documents = rebuild_search_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the search index with {documents} documents.'))
@@ -0,0 +1,15 @@
+""" Rebuild the follower feeds """
+from django.core.management.base import BaseCommand
+from finest.feeds import rebuild_timelines
+
+
+class Command(BaseCommand):
+    """Backfill TimelineEntry and FeedAuthor or repair drift from the Follow table"""
+    help = 'Recompute follower counts and every follower feed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        entries = rebuild_timelines(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt follower feeds with {entries} entries.'))
@@ -0,0 +1,111 @@
+""" Run background jobs """
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from django.utils.timezone import now
+from finest.jobs import claim_jobs, prune_jobs, requeue_lost_jobs, run_job_in_worker, worker_name
+from finest.models import Job
+from finest.snapshots import schedule_site_snapshots
+
+# Seconds between requeueing lost jobs, pruning old ones and scheduling the daily picks
+MAINTENANCE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    """Claim due jobs from the jobs table and run them in a thread or process pool.
+
+    Run one or more of these next to the web servers; SIGINT or SIGTERM stop
+    claiming jobs and exit once the running ones finish. Each worker also
+    queues the featured site and site of the day picks once a day.
+    """
+    help = 'Run queued background jobs in a pool of worker threads or processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=getattr(settings, 'FINEST_JOB_WORKERS', 2),
+            help='Number of jobs run at the same time.'
+        )
+        parser.add_argument(
+            '--pool', choices=['thread', 'process'], default='thread',
+            help='Run jobs in threads, or in processes for CPU-bound work such as thumbnails.'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Seconds to wait for new jobs when the queue is empty.'
+        )
+        parser.add_argument(
+            '--keep-days', type=int, default=7,
+            help='Days to keep done jobs and their timings before deleting them.'
+        )
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no job is due instead of waiting for more.')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        workers = max(options['workers'], 1)
+        if options['pool'] == 'process':
+            # Forked processes must not share the parent's connections
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
+        else:
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='finest-jobs')
+
+        name = worker_name()
+        running = {}
+        counts = {Job.DONE: 0, Job.QUEUED: 0, Job.FAILED: 0}
+        maintained_at = 0
+        scheduled_day = None
+        with pool:
+            while not self.stopping:
+                if time.monotonic() - maintained_at > MAINTENANCE_INTERVAL:
+                    requeue_lost_jobs()
+                    prune_jobs(options['keep_days'])
+                    if scheduled_day != now().date():
+                        scheduled_day = now().date()
+                        schedule_site_snapshots(scheduled_day)
+                    maintained_at = time.monotonic()
+
+                free = workers - len(running)
+                jobs = claim_jobs(name, free) if free else []
+                for job in jobs:
+                    running[pool.submit(run_job_in_worker, job)] = job
+                close_old_connections()
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                finished, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                for future in finished:
+                    self.report(running.pop(future), future, counts)
+
+            for future in wait(running).done:
+                self.report(running.pop(future), future, counts)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Ran jobs: {counts[Job.DONE]} done, {counts[Job.QUEUED]} to retry, '
+            f'{counts[Job.FAILED]} failed.'
+        ))
+
+    def stop(self, signum, frame):
+        """Stop claiming jobs, the running ones still finish"""
+        self.stopping = True
+
+    def report(self, job, future, counts):
+        """Count the outcome of a finished job"""
+        try:
+            status = future.result().status
+        except Exception as exc:  # the worker process died or the job vanished
+            self.stderr.write(f'Job {job.name} #{job.pk}: {exc}')
+            return
+        counts[status] = counts.get(status, 0) + 1
+        if status != Job.DONE:
+            self.stderr.write(f'Job {job.name} #{job.pk} {status}')
@@ -0,0 +1,113 @@
+""" Seed a reproducible synthetic dataset """
+import random
+from datetime import timedelta
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from finest.activity import rebuild_activity
+from finest.feeds import rebuild_timelines
+from finest.leaderboards import invalidate_leaderboards
+from finest.models import SubmittedWebsite, Review, Profile, Follow
+from finest.ratings import rebuild_rating_stats
+from finest.search import rebuild_search_index
+
+SEED_PREFIX = 'seed-user-'
+SEED_PASSWORD = 'seed-password'
+
+
+class Command(BaseCommand):
+    """Generate users, profiles, projects, reviews and follows for benchmarks.
+
+    The same --seed and sizes always produce the same dataset. Seeded users
+    are named seed-user-<n> and share the password "seed-password".
+    """
+    help = 'Seed a reproducible synthetic dataset at a configurable scale'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--sites', type=int, default=500)
+        parser.add_argument('--reviews', type=int, default=5000)
+        parser.add_argument('--follows', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete previously seeded users and their data first.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        now = timezone.now()
+
+        with transaction.atomic():
+            if options['clear']:
+                deleted, _ = User.objects.filter(username__startswith=SEED_PREFIX).delete()
+                self.stdout.write(f'Deleted {deleted} previously seeded rows.')
+
+            password = make_password(SEED_PASSWORD)
+            users = User.objects.bulk_create([
+                User(username=f'{SEED_PREFIX}{i}', email=f'{SEED_PREFIX}{i}@example.com',
+                     first_name='Seed', last_name=str(i), password=password)
+                for i in range(options['users'])
+            ], batch_size=batch_size)
+
+            Profile.objects.bulk_create([
+                Profile(user=user, bio=f'Synthetic profile {i}', location='Nairobi',
+                        profession=rng.choice(['Designer', 'Developer', 'Writer']))
+                for i, user in enumerate(users)
+            ], batch_size=batch_size)
+
+            websites = SubmittedWebsite.objects.bulk_create([
+                SubmittedWebsite(
+                    user=rng.choice(users), title=f'Seed site {i}',
+                    url=f'https://seed-site-{i}.example.com',
+                    description=f'Synthetic project number {i}.',
+                    file='uploads/websites/seed.png',
+                )
+                for i in range(options['sites'])
+            ], batch_size=batch_size)
+
+            reviews = []
+            pairs = set()
+            attempts = 0
+            while websites and len(reviews) < options['reviews'] and attempts < options['reviews'] * 5:
+                attempts += 1
+                website = rng.choice(websites)
+                user = rng.choice(users)
+                if user.pk == website.user_id or (website.pk, user.pk) in pairs:
+                    continue
+                pairs.add((website.pk, user.pk))
+                review = Review(
+                    submitted_website=website, user=user,
+                    design=rng.randint(1, 10), usability=rng.randint(1, 10),
+                    content=rng.randint(1, 10), overall=rng.randint(1, 5),
+                    description='Synthetic review.',
+                    created_at=now - timedelta(minutes=rng.randint(0, 365 * 24 * 60)),
+                )
+                review.average = review.compute_average()
+                reviews.append(review)
+            Review.objects.bulk_create(reviews, batch_size=batch_size)
+
+            follows = set()
+            attempts = 0
+            while len(users) > 1 and len(follows) < options['follows'] and attempts < options['follows'] * 5:
+                attempts += 1
+                follower, followed = rng.sample(users, 2)
+                follows.add((follower.pk, followed.pk))
+            Follow.objects.bulk_create(
+                [Follow(follower_id=follower, followed_id=followed) for follower, followed in follows],
+                batch_size=batch_size,
+            )
+
+            # Bulk inserts send no signals, rebuild the derived tables once
+            rebuild_rating_stats(batch_size=batch_size)
+            rebuild_activity()
+            rebuild_timelines(batch_size=batch_size)
+            rebuild_search_index(batch_size=batch_size)
+            invalidate_leaderboards()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(users)} users, {len(websites)} sites, '
+            f'{len(reviews)} reviews and {len(follows)} follows.'
+        ))
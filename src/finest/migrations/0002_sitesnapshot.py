@@ -0,0 +1,28 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finest', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('featured', 'Featured site'), ('site_of_the_day', 'Site of the day')], max_length=20)),
+                ('date', models.DateField()),
+                ('score', models.DecimalField(decimal_places=2, max_digits=4)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('submitted_website', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='finest.submittedwebsite')),
+            ],
+            options={
+                'unique_together': {('kind', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finest', '0002_sitesnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebsiteRatingStats',
+            fields=[
+                ('submitted_website', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_stats', serialize=False, to='finest.submittedwebsite')),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('sum_average', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('sum_overall', models.PositiveBigIntegerField(default=0)),
+                ('sum_design', models.PositiveBigIntegerField(default=0)),
+                ('sum_content', models.PositiveBigIntegerField(default=0)),
+                ('sum_usability', models.PositiveBigIntegerField(default=0)),
+                ('avg_average', models.FloatField(default=0)),
+                ('avg_overall', models.FloatField(default=0)),
+                ('avg_design', models.FloatField(default=0)),
+                ('avg_content', models.FloatField(default=0)),
+                ('avg_usability', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
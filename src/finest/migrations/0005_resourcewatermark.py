@@ -0,0 +1,22 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:14
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finest', '0004_dailyactivity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceWatermark',
+            fields=[
+                ('key', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
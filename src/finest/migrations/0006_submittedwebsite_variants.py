@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finest', '0005_resourcewatermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submittedwebsite',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finest', '0006_submittedwebsite_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['followed'], name='follow_followed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['user', '-created_at'], name='review_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['submitted_website', 'user'], name='review_website_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['created_at'], name='review_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submittedwebsite',
+            index=models.Index(fields=['user', '-submitted_at'], name='website_user_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submittedwebsite',
+            index=models.Index(fields=['-submitted_at', '-id'], name='website_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submittedwebsite',
+            index=models.Index(condition=models.Q(('date_site_of_the_day__isnull', False)), fields=['-date_site_of_the_day'], name='website_site_of_the_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='websiteratingstats',
+            index=models.Index(condition=models.Q(('review_count__gt', 0)), fields=['-avg_average'], name='rating_stats_average_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='websiteratingstats',
+            index=models.Index(condition=models.Q(('review_count__gt', 0)), fields=['-avg_design'], name='rating_stats_design_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='websiteratingstats',
+            index=models.Index(condition=models.Q(('review_count__gt', 0)), fields=['-avg_content'], name='rating_stats_content_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='websiteratingstats',
+            index=models.Index(condition=models.Q(('review_count__gt', 0)), fields=['-avg_usability'], name='rating_stats_usability_idx'),
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:42
+
+from django.db import migrations, models
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+
+# Frozen copies of WebsiteRatingStats.PRIOR_MEANS and the default prior weight
+PRIOR_MEANS = {'average': 4.875, 'overall': 3, 'design': 5.5, 'content': 5.5, 'usability': 5.5}
+PRIOR_REVIEWS = 5
+
+
+def fill_scores(apps, schema_editor):
+    """Compute the scores of the existing rows from their running sums"""
+    WebsiteRatingStats = apps.get_model('finest', 'WebsiteRatingStats')
+    WebsiteRatingStats.objects.update(**{
+        f'score_{dimension}': (
+            (Cast(f'sum_{dimension}', FloatField()) + PRIOR_REVIEWS * prior)
+            / (Cast('review_count', FloatField()) + PRIOR_REVIEWS)
+        )
+        for dimension, prior in PRIOR_MEANS.items()
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finest', '0009_searchdocument'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='websiteratingstats',
+            name='rating_stats_average_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='websiteratingstats',
+            name='rating_stats_design_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='websiteratingstats',
+            name='rating_stats_content_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='websiteratingstats',
+            name='rating_stats_usability_idx',
+        ),
+        migrations.AddField(
+            model_name='websiteratingstats',
+            name='score_average',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='websiteratingstats',
+            name='score_content',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='websiteratingstats',
+            name='score_design',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='websiteratingstats',
+            name='score_overall',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='websiteratingstats',
+            name='score_usability',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(fill_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='websiteratingstats',
+            index=models.Index(condition=models.Q(('review_count__gt', 0)), fields=['-score_average', '-submitted_website'], name='rating_score_average_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='websiteratingstats',
+            index=models.Index(condition=models.Q(('review_count__gt', 0)), fields=['-score_design', '-submitted_website'], name='rating_score_design_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='websiteratingstats',
+            index=models.Index(condition=models.Q(('review_count__gt', 0)), fields=['-score_content', '-submitted_website'], name='rating_score_content_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='websiteratingstats',
+            index=models.Index(condition=models.Q(('review_count__gt', 0)), fields=['-score_usability', '-submitted_website'], name='rating_score_usability_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def favorites_from_flags(apps, schema_editor):
+    """The shared is_favorite flag was only listed to the owner: make it theirs"""
+    SubmittedWebsite = apps.get_model('finest', 'SubmittedWebsite')
+    Favorite = apps.get_model('finest', 'Favorite')
+    flagged = SubmittedWebsite.objects.filter(is_favorite=True)
+    Favorite.objects.bulk_create(
+        [Favorite(user_id=user_id, submitted_website_id=website_id)
+         for website_id, user_id in flagged.values_list('id', 'user_id').iterator()],
+        batch_size=1000,
+    )
+    flagged.update(favorite_count=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finest', '0010_rating_scores'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submittedwebsite',
+            name='favorite_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='Favorite',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('submitted_website', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorites', to='finest.submittedwebsite')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorites', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-created_at'], name='favorite_user_created_idx')],
+                'unique_together': {('user', 'submitted_website')},
+            },
+        ),
+        migrations.RunPython(favorites_from_flags, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='submittedwebsite',
+            name='is_favorite',
+        ),
+    ]
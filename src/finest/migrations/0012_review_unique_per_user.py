@@ -0,0 +1,101 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:45
+
+from collections import defaultdict
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, F, Min, Sum
+from django.db.models.functions import TruncDate
+
+# Frozen copies of WebsiteRatingStats.DIMENSIONS, PRIOR_MEANS and the default prior weight
+DIMENSIONS = ('average', 'overall', 'design', 'content', 'usability')
+PRIOR_MEANS = {'average': 4.875, 'overall': 3, 'design': 5.5, 'content': 5.5, 'usability': 5.5}
+PRIOR_REVIEWS = 5
+
+
+def rebuild_rating_stats(apps, website_ids):
+    """Frozen copy of ratings.rebuild_rating_stats for the given websites"""
+    Review = apps.get_model('finest', 'Review')
+    WebsiteRatingStats = apps.get_model('finest', 'WebsiteRatingStats')
+    totals = {
+        row['submitted_website_id']: row for row in
+        Review.objects.filter(submitted_website_id__in=website_ids).order_by()
+        .values('submitted_website_id')
+        .annotate(review_count=Count('id'), **{f'sum_{dimension}': Sum(dimension) for dimension in DIMENSIONS})
+    }
+    for stats in WebsiteRatingStats.objects.filter(submitted_website_id__in=website_ids):
+        row = totals.get(stats.submitted_website_id, {})
+        stats.review_count = row.get('review_count', 0)
+        for dimension in DIMENSIONS:
+            total = row.get(f'sum_{dimension}') or 0
+            setattr(stats, f'sum_{dimension}', total)
+            setattr(stats, f'avg_{dimension}', float(total) / stats.review_count if stats.review_count else 0)
+            setattr(stats, f'score_{dimension}', (
+                (float(total) + PRIOR_REVIEWS * PRIOR_MEANS[dimension])
+                / (stats.review_count + PRIOR_REVIEWS)
+            ))
+        stats.save()
+
+
+def rebuild_review_activity(apps, user_ids):
+    """Frozen copy of activity.rebuild_activity for the review counters of the given users"""
+    Review = apps.get_model('finest', 'Review')
+    DailyActivity = apps.get_model('finest', 'DailyActivity')
+    rows = defaultdict(lambda: {'reviews_written': 0, 'reviews_received': 0})
+    for metric, user_field in (('reviews_written', 'user_id'),
+                               ('reviews_received', 'submitted_website__user_id')):
+        counts = (
+            Review.objects.filter(**{f'{user_field}__in': user_ids}).order_by()
+            .annotate(activity_user=F(user_field), activity_day=TruncDate('created_at'))
+            .values('activity_user', 'activity_day')
+            .annotate(total=Count('id'))
+        )
+        for row in counts:
+            rows[(row['activity_user'], row['activity_day'])][metric] += row['total']
+
+    DailyActivity.objects.filter(user_id__in=user_ids).update(reviews_written=0, reviews_received=0)
+    for (user_id, day), metrics in rows.items():
+        DailyActivity.objects.update_or_create(user_id=user_id, date=day, defaults=metrics)
+
+
+def delete_duplicate_reviews(apps, schema_editor):
+    """
+    Keep the first review of each user for a project, then recompute the
+    rating stats and review activity the deleted duplicates were counted in.
+    """
+    Review = apps.get_model('finest', 'Review')
+    SubmittedWebsite = apps.get_model('finest', 'SubmittedWebsite')
+    first_ids = (
+        Review.objects.values('submitted_website', 'user')
+        .annotate(first_id=Min('id')).values('first_id')
+    )
+    duplicates = list(
+        Review.objects.exclude(id__in=first_ids).values_list('id', 'submitted_website_id', 'user_id')
+    )
+    if not duplicates:
+        return
+    Review.objects.filter(id__in=[review_id for review_id, _, _ in duplicates]).delete()
+
+    website_ids = {website_id for _, website_id, _ in duplicates}
+    owner_ids = set(SubmittedWebsite.objects.filter(pk__in=website_ids).values_list('user_id', flat=True))
+    rebuild_rating_stats(apps, website_ids)
+    rebuild_review_activity(apps, owner_ids | {user_id for _, _, user_id in duplicates})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finest', '0011_favorite'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_reviews, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='review',
+            unique_together={('submitted_website', 'user')},
+        ),
+        migrations.RemoveIndex(
+            model_name='review',
+            name='review_website_user_idx',
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finest', '0012_review_unique_per_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['submitted_website', '-created_at', '-id'], name='review_website_created_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finest', '0013_review_website_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['user', 'overall', 'created_at', 'id'], name='review_user_overall_idx'),
+        ),
+    ]
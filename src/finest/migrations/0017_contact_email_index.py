@@ -0,0 +1,17 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finest', '0016_cache_table'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['email'], name='contact_email_idx'),
+        ),
+    ]
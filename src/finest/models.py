@@ -1,6 +1,8 @@
 """ Models creation """
 from decimal import Decimal
+from django.conf import settings
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.core.exceptions import ValidationError
@@ -16,11 +18,65 @@ class SubmittedWebsite(models.Model):
     description = models.TextField(blank=True, null=True)
     file = models.FileField(upload_to='uploads/websites/')
     submitted_at = models.DateTimeField(auto_now_add=True)
-    is_favorite = models.BooleanField(default=False)
+    # Number of Favorite rows, kept in step by finest.favorites
+    favorite_count = models.PositiveIntegerField(default=0)
     date_site_of_the_day = models.DateField(blank=True, null=True)
+    variants = models.JSONField(default=dict, blank=True)
 
     objects = models.Manager()
 
+    class Meta:
+        """meta class"""
+        indexes = [
+            models.Index(fields=['user', '-submitted_at'], name='website_user_submitted_idx'),
+            models.Index(fields=['-submitted_at', '-id'], name='website_submitted_idx'),
+            models.Index(
+                fields=['-date_site_of_the_day'], name='website_site_of_the_day_idx',
+                condition=models.Q(date_site_of_the_day__isnull=False),
+            ),
+        ]
+
+    def variant_url(self, size, image_format='webp'):
+        """URL of a resized screenshot, or the original until it is generated"""
+        name = self.variants.get(size, {}).get(image_format)
+        if name:
+            return self.file.storage.url(name)
+        return self.file.url if self.file else None
+
+    def __str__(self):
+        return self.title
+
+    @property
+    def thumbnail_url(self):
+        """Small screenshot for lists and tables"""
+        return self.variant_url('thumb')
+
+    @property
+    def card_url(self):
+        """Medium screenshot for cards"""
+        return self.variant_url('card')
+
+# Favorite Model
+class Favorite(models.Model):
+    """A project marked as favorite by a user"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='favorites')
+    submitted_website = models.ForeignKey(
+        SubmittedWebsite, on_delete=models.CASCADE, related_name='favorites'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = models.Manager()
+
+    class Meta:
+        """meta class"""
+        unique_together = ('user', 'submitted_website')
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='favorite_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.submitted_website_id} favorited by {self.user_id}"
+
 # Profile Model
 class Profile(models.Model):
     """User Profile model"""
@@ -45,6 +101,12 @@ class Contact(models.Model):
     subject = models.CharField(max_length=255, blank=False, null=False)
     message = models.TextField(blank=False, null=False)
 
+    class Meta:
+        """meta class"""
+        indexes = [
+            models.Index(fields=['email'], name='contact_email_idx'),
+        ]
+
 # Review Model
 class Review(models.Model):
     """Review model"""
@@ -60,10 +122,27 @@ class Review(models.Model):
 
     objects = models.Manager()
 
-    def save(self, *args, **kwargs):
-        self.average = round(
+    class Meta:
+        """meta class"""
+        # One review per user and project, also the index of the duplicate check
+        unique_together = ('submitted_website', 'user')
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='review_user_created_idx'),
+            # My Reviews: rating filter and rating sorts, scanned either way
+            models.Index(fields=['user', 'overall', 'created_at', 'id'], name='review_user_overall_idx'),
+            models.Index(fields=['submitted_website', '-created_at', '-id'],
+                         name='review_website_created_idx'),
+            models.Index(fields=['created_at'], name='review_created_idx'),
+        ]
+
+    def compute_average(self):
+        """Average of the four ratings, also needed by bulk inserts that skip save()"""
+        return round(
             Decimal((self.design + self.usability + self.content + self.overall) / 4), 2
         )
+
+    def save(self, *args, **kwargs):
+        self.average = self.compute_average()
         super().save(*args, **kwargs)
 
     def clean(self):
@@ -73,10 +152,76 @@ class Review(models.Model):
                 raise ValidationError({field: "Rating must be between 1 and 10."})
 
     def __str__(self):
-        username = self.user.username if self.user and hasattr(self.user, 'username') else "Unknown User"
-        website = self.submitted_website or "Unknown Website"
+        # Only use related objects already loaded, admin pages print many reviews
+        username = self.user.username if Review.user.is_cached(self) else f"user {self.user_id}"
+        website = (self.submitted_website if Review.submitted_website.is_cached(self)
+                   else f"website {self.submitted_website_id}")
         return f"Review by {username} for {website} ({self.average}/5)"
 
+# Website Rating Stats Model
+class WebsiteRatingStats(models.Model):
+    """Per-website review aggregates, maintained on every review write"""
+    DIMENSIONS = ('average', 'overall', 'design', 'content', 'usability')
+    # Middle of each scale: 1-10, overall 1-5, and the average of the four
+    PRIOR_MEANS = {'average': 4.875, 'overall': 3, 'design': 5.5, 'content': 5.5, 'usability': 5.5}
+
+    submitted_website = models.OneToOneField(
+        SubmittedWebsite, on_delete=models.CASCADE,
+        related_name='rating_stats', primary_key=True
+    )
+    review_count = models.PositiveIntegerField(default=0)
+    sum_average = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    sum_overall = models.PositiveBigIntegerField(default=0)
+    sum_design = models.PositiveBigIntegerField(default=0)
+    sum_content = models.PositiveBigIntegerField(default=0)
+    sum_usability = models.PositiveBigIntegerField(default=0)
+    avg_average = models.FloatField(default=0)
+    avg_overall = models.FloatField(default=0)
+    avg_design = models.FloatField(default=0)
+    avg_content = models.FloatField(default=0)
+    avg_usability = models.FloatField(default=0)
+    # Bayesian averages used for ranking: each site starts with prior_reviews()
+    # virtual reviews at the middle of every scale, so one 10/10 review does
+    # not outrank hundreds of 9.6s
+    score_average = models.FloatField(default=0)
+    score_overall = models.FloatField(default=0)
+    score_design = models.FloatField(default=0)
+    score_content = models.FloatField(default=0)
+    score_usability = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = models.Manager()
+
+    class Meta:
+        """meta class"""
+        indexes = [
+            models.Index(
+                fields=[f'-score_{dimension}', '-submitted_website'],
+                name=f'rating_score_{dimension}_idx',
+                condition=models.Q(review_count__gt=0),
+            )
+            for dimension in ('average', 'design', 'content', 'usability')
+        ]
+
+    @staticmethod
+    def prior_reviews():
+        """Weight of the prior, in reviews; change it with rebuild_rating_stats"""
+        return getattr(settings, 'FINEST_RATING_PRIOR_REVIEWS', 5)
+
+    def refresh_averages(self):
+        """Recompute the stored averages and ranking scores from the running sums"""
+        prior_reviews = self.prior_reviews()
+        for dimension in self.DIMENSIONS:
+            total = float(getattr(self, f'sum_{dimension}'))
+            average = total / self.review_count if self.review_count else 0
+            setattr(self, f'avg_{dimension}', average)
+            score = ((total + prior_reviews * self.PRIOR_MEANS[dimension])
+                     / (self.review_count + prior_reviews))
+            setattr(self, f'score_{dimension}', score)
+
+    def __str__(self):
+        return f"Rating stats for {self.submitted_website_id} ({self.review_count} reviews)"
+
 class Follow(models.Model):
     """Followers Model to track follow relationships"""
     follower = models.ForeignKey(
@@ -93,3 +238,192 @@ class Follow(models.Model):
     class Meta:
         """meta class"""
         unique_together = ('follower', 'followed')
+        indexes = [
+            models.Index(fields=['followed'], name='follow_followed_idx'),
+        ]
+
+# Site Snapshot Model
+class SiteSnapshot(models.Model):
+    """Precomputed featured site and site of the day picks"""
+    FEATURED = 'featured'
+    SITE_OF_THE_DAY = 'site_of_the_day'
+    KIND_CHOICES = [
+        (FEATURED, 'Featured site'),
+        (SITE_OF_THE_DAY, 'Site of the day'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    date = models.DateField()
+    submitted_website = models.ForeignKey(
+        SubmittedWebsite, on_delete=models.CASCADE, related_name='snapshots'
+    )
+    score = models.DecimalField(max_digits=4, decimal_places=2)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    objects = models.Manager()
+
+    class Meta:
+        """meta class"""
+        unique_together = ('kind', 'date')
+
+    def __str__(self):
+        return f"{self.get_kind_display()} for {self.date}"
+
+# Daily Activity Model
+class DailyActivity(models.Model):
+    """Per-user daily activity counters used by the charts"""
+    METRICS = ('reviews_written', 'sites_submitted', 'reviews_received', 'site_of_the_day_wins')
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_activity')
+    date = models.DateField()
+    reviews_written = models.PositiveIntegerField(default=0)
+    sites_submitted = models.PositiveIntegerField(default=0)
+    reviews_received = models.PositiveIntegerField(default=0)
+    site_of_the_day_wins = models.PositiveIntegerField(default=0)
+
+    objects = models.Manager()
+
+    class Meta:
+        """meta class"""
+        unique_together = ('user', 'date')
+
+    def __str__(self):
+        return f"Activity of {self.user_id} on {self.date}"
+
+# Resource Watermark Model
+class ResourceWatermark(models.Model):
+    """Last change of a cacheable resource, used for ETag / Last-Modified"""
+    key = models.CharField(max_length=100, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    objects = models.Manager()
+
+    def __str__(self):
+        return f"{self.key} v{self.version}"
+
+# Feed Author Model
+class FeedAuthor(models.Model):
+    """Follower count of an account, deciding how its projects reach feeds"""
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name='feed_author'
+    )
+    follower_count = models.PositiveIntegerField(default=0)
+
+    objects = models.Manager()
+
+    def __str__(self):
+        return f"{self.user_id}: {self.follower_count} followers"
+
+# Timeline Entry Model
+class TimelineEntry(models.Model):
+    """A project fanned out into the feed of one of its author's followers"""
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline_entries')
+    submitted_website = models.ForeignKey(
+        SubmittedWebsite, on_delete=models.CASCADE, related_name='timeline_entries'
+    )
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    # Copied from the project so a feed page is one range scan of the index
+    submitted_at = models.DateTimeField()
+
+    objects = models.Manager()
+
+    class Meta:
+        """meta class"""
+        unique_together = ('owner', 'submitted_website')
+        indexes = [
+            models.Index(fields=['owner', '-submitted_at', '-submitted_website'],
+                         name='timeline_owner_submitted_idx'),
+            models.Index(fields=['owner', 'author'], name='timeline_owner_author_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.submitted_website_id} in the feed of {self.owner_id}"
+
+
+# Search Document Model
+class SearchDocument(models.Model):
+    """Searchable text of a project or a profile, maintained on every write"""
+    PROJECT = 'project'
+    PROFILE = 'profile'
+    KIND_CHOICES = [
+        (PROJECT, 'Project'),
+        (PROFILE, 'Profile'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    submitted_website = models.OneToOneField(
+        SubmittedWebsite, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='search_document'
+    )
+    profile = models.OneToOneField(
+        Profile, on_delete=models.CASCADE, null=True, blank=True, related_name='search_document'
+    )
+    # Author of the project or owner of the profile
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True, default='')
+    # Weighted title and body, only filled on PostgreSQL where it is GIN indexed
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = models.Manager()
+
+    class Meta:
+        """meta class"""
+        indexes = [
+            models.Index(fields=['user', 'kind'], name='search_user_kind_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.title}"
+
+
+# Job Model
+class Job(models.Model):
+    """A unit of background work, run by the run_jobs worker"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    # Key of finest.jobs.TASKS
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    # At most one queued job per key, later duplicates are dropped
+    key = models.CharField(max_length=255, blank=True, null=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    # Run time of the last attempt, and time between queueing and its start
+    duration_ms = models.FloatField(blank=True, null=True)
+    wait_ms = models.FloatField(blank=True, null=True)
+    last_error = models.TextField(blank=True, default='')
+
+    objects = models.Manager()
+
+    class Meta:
+        """meta class"""
+        constraints = [
+            models.UniqueConstraint(fields=['key'], condition=models.Q(status='queued'),
+                                    name='job_queued_key_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['run_at', 'id'], condition=models.Q(status='queued'),
+                         name='job_queued_run_at_idx'),
+            models.Index(fields=['status', 'started_at'], name='job_status_started_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
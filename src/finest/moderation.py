@@ -0,0 +1,61 @@
+""" Set-based moderation actions of the admin """
+from django.db import transaction
+from .models import Review, SubmittedWebsite
+from .activity import record_activity
+from .ratings import DIMENSIONS
+from .signals import review_deletes_muted, reviews_deleted
+from .summaries import invalidate_dashboard_summary
+from .watermarks import PROFILES, PROJECTS, bump_watermarks, user_key
+
+
+def delete_reviews(queryset, batch_size=1000):
+    """
+    Delete the reviews of a queryset, batch by batch. Returns the number
+    of deleted reviews.
+
+    Each batch is one DELETE ... WHERE id IN (...) and one update of the
+    derived rating and activity data: the post_delete handler, and its
+    queries per review, is muted while the batch is deleted.
+    """
+    ids = list(queryset.order_by().values_list('pk', flat=True))
+    deleted = 0
+    for start in range(0, len(ids), batch_size):
+        with transaction.atomic():
+            reviews = list(
+                Review.objects.filter(pk__in=ids[start:start + batch_size])
+                .only('id', 'user_id', 'submitted_website_id', 'created_at', *DIMENSIONS)
+            )
+            if not reviews:
+                continue
+            owner_ids = dict(
+                SubmittedWebsite.objects.filter(pk__in={review.submitted_website_id for review in reviews})
+                .values_list('id', 'user_id')
+            )
+            with review_deletes_muted():
+                Review.objects.filter(pk__in=[review.pk for review in reviews]).delete()
+            reviews_deleted(reviews, owner_ids)
+            deleted += len(reviews)
+    return deleted
+
+
+def clear_sites_of_the_day(queryset):
+    """
+    Withdraw the site of the day title of the projects of a queryset with
+    one UPDATE, and uncount the wins. Returns the number of projects.
+
+    The SiteSnapshot rows stay, so the days are not picked again.
+    """
+    with transaction.atomic():
+        wins = list(
+            queryset.filter(date_site_of_the_day__isnull=False).order_by()
+            .values_list('id', 'user_id', 'date_site_of_the_day')
+        )
+        SubmittedWebsite.objects.filter(pk__in=[website_id for website_id, _, _ in wins]).update(
+            date_site_of_the_day=None
+        )
+        record_activity([(user_id, day, 'site_of_the_day_wins', -1) for _, user_id, day in wins])
+        user_ids = {user_id for _, user_id, _ in wins}
+        invalidate_dashboard_summary(*user_ids)
+        if wins:
+            bump_watermarks(PROJECTS, PROFILES, *[user_key(user_id) for user_id in user_ids])
+    return len(wins)
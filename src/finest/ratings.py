@@ -0,0 +1,102 @@
+""" Per-website rating aggregates """
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Sum
+from django.utils import timezone
+from .models import Review, WebsiteRatingStats
+
+DIMENSIONS = WebsiteRatingStats.DIMENSIONS
+# Columns written by the incremental updates and the rebuild
+STATS_FIELDS = ['review_count', 'updated_at'] + [
+    f'{prefix}_{dimension}' for prefix in ('sum', 'avg', 'score') for dimension in DIMENSIONS
+]
+
+
+def review_values(review):
+    """Rating values of a review, as used by update_rating_stats"""
+    values = {dimension: getattr(review, dimension) for dimension in DIMENSIONS}
+    values['submitted_website_id'] = review.submitted_website_id
+    return values
+
+
+def update_rating_stats(added=(), removed=()):
+    """Apply created and deleted review values to the per-website aggregates.
+
+    An edited review is passed as its old values in ``removed`` and its new
+    values in ``added``. The website rows are created, locked and written
+    with one statement each, however many reviews and websites the call
+    covers.
+    """
+    deltas = defaultdict(lambda: {'count': 0, **{dimension: 0 for dimension in DIMENSIONS}})
+    for sign, items in ((1, added), (-1, removed)):
+        for values in items:
+            delta = deltas[values['submitted_website_id']]
+            delta['count'] += sign
+            for dimension in DIMENSIONS:
+                delta[dimension] += sign * Decimal(str(values[dimension]))
+
+    with transaction.atomic():
+        # Deletes may come from a cascading website delete, only increments create rows
+        WebsiteRatingStats.objects.bulk_create(
+            [WebsiteRatingStats(submitted_website_id=website_id)
+             for website_id, delta in deltas.items() if delta['count'] > 0],
+            ignore_conflicts=True,
+        )
+        rows = list(WebsiteRatingStats.objects.select_for_update()
+                    .filter(submitted_website_id__in=deltas).order_by('submitted_website_id'))
+        for stats in rows:
+            delta = deltas[stats.submitted_website_id]
+            stats.review_count = max(stats.review_count + delta['count'], 0)
+            for dimension in DIMENSIONS:
+                field = f'sum_{dimension}'
+                total = Decimal(str(getattr(stats, field))) + delta[dimension]
+                setattr(stats, field, total if dimension == 'average' else int(total))
+            stats.refresh_averages()
+            stats.updated_at = timezone.now()
+        WebsiteRatingStats.objects.bulk_update(rows, STATS_FIELDS)
+
+
+def rebuild_rating_stats(website_ids=None, batch_size=1000):
+    """Recompute aggregates from the Review table, for backfill and drift repair"""
+    reviews = Review.objects.all()
+    stale = WebsiteRatingStats.objects.all()
+    if website_ids is not None:
+        reviews = reviews.filter(submitted_website_id__in=website_ids)
+        stale = stale.filter(submitted_website_id__in=website_ids)
+
+    totals = (
+        reviews.order_by().values('submitted_website_id')
+        .annotate(
+            review_count=Count('id'),
+            **{f'sum_{dimension}': Sum(dimension) for dimension in DIMENSIONS}
+        )
+    )
+
+    rebuilt = 0
+    batch = []
+    with transaction.atomic():
+        for row in totals.iterator(chunk_size=batch_size):
+            stats = WebsiteRatingStats(**row)
+            stats.refresh_averages()
+            batch.append(stats)
+            rebuilt += 1
+            if len(batch) >= batch_size:
+                _upsert_stats(batch)
+                batch = []
+        if batch:
+            _upsert_stats(batch)
+        stale.exclude(
+            Exists(Review.objects.filter(submitted_website_id=OuterRef('submitted_website_id')))
+        ).delete()
+
+    return rebuilt
+
+
+def _upsert_stats(batch):
+    WebsiteRatingStats.objects.bulk_create(
+        batch,
+        update_conflicts=True,
+        unique_fields=['submitted_website'],
+        update_fields=STATS_FIELDS,
+    )
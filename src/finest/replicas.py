@@ -0,0 +1,129 @@
+""" Read replica routing: safe requests read from a replica, writes and their reads from the primary """
+import random
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Set on responses to requests that wrote, sends the next requests to the primary
+PIN_COOKIE = 'finest_primary'
+
+_current_routing = ContextVar('finest_db_routing', default=None)
+
+
+class RequestRouting:
+    """Database choice of a single request"""
+
+    def __init__(self, replica):
+        # Alias of the replica serving the reads, None for the primary
+        self.replica = replica
+        self.wrote = False
+
+
+def replica_aliases():
+    """Database aliases of the read replicas, see DATABASE_REPLICA_HOSTS"""
+    return getattr(settings, 'FINEST_DATABASE_REPLICAS', [])
+
+
+def pin_seconds():
+    """How long a user reads from the primary after writing, to see their writes"""
+    return getattr(settings, 'FINEST_REPLICA_PIN_SECONDS', 10)
+
+
+def use_primary_database(view_func):
+    """
+    Serve a view from the primary even for GET requests, for views which
+    write on GET or whose reads must never lag behind.
+    Use with method_decorator(..., name='dispatch') on class-based views.
+    """
+    view_func.use_primary_database = True
+    return view_func
+
+
+class ReplicaRouter:
+    """
+    Send the reads of replica-routed requests to their replica and
+    everything else to the primary: writes, reads after a write in the
+    same request, reads inside transactions, and code running outside of
+    requests such as management commands and workers.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = _current_routing.get()
+        if routing is None or routing.replica is None or routing.wrote:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = _current_routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Route GET, HEAD and OPTIONS requests to a random replica unless the
+    view is marked with @use_primary_database or the user wrote within
+    FINEST_REPLICA_PIN_SECONDS. A request which writes pins the user to the
+    primary for that long with a short-lived cookie, so they read their own
+    writes while the replicas catch up. Must come before the session
+    middleware, whose writes count.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        routing = self.routing_for(request)
+        token = _current_routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_routing.reset(token)
+        return self.finish(response, routing)
+
+    async def __acall__(self, request):
+        routing = self.routing_for(request)
+        token = _current_routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_routing.reset(token)
+        return self.finish(response, routing)
+
+    def routing_for(self, request):
+        """Pick the replica of a request, None when it must use the primary"""
+        replicas = replica_aliases()
+        if replicas and request.method in SAFE_METHODS and PIN_COOKIE not in request.COOKIES:
+            return RequestRouting(random.choice(replicas))
+        return RequestRouting(None)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Views marked with @use_primary_database never read from a replica"""
+        routing = _current_routing.get()
+        if routing is not None and getattr(view_func, 'use_primary_database', False):
+            routing.replica = None
+
+    def finish(self, response, routing):
+        """Pin the user to the primary after a write"""
+        if routing.wrote and replica_aliases():
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=pin_seconds(), httponly=True,
+                secure=settings.SESSION_COOKIE_SECURE, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,100 @@
+""" Keyset-paged reviews of the website detail pages and the My Reviews page """
+from django.db.models import Q
+from .models import Review
+from .pagination import decode_keyset_cursor, encode_keyset_cursor, keyset_after
+
+REVIEW_PAGE_SIZE = 10
+
+
+def get_reviews(website_id, cursor=None, limit=REVIEW_PAGE_SIZE):
+    """
+    One page of the reviews of a project, newest first, with their authors
+    joined. Returns (reviews, next_cursor); next_cursor is None on the last
+    page. Raises ValueError on an invalid cursor.
+
+    Every page is a range scan of the (submitted_website, created_at, id)
+    index, however deep it is.
+    """
+    reviews = list(
+        keyset_after(Review.objects.filter(submitted_website_id=website_id),
+                     decode_keyset_cursor(cursor), 'created_at', 'id')
+        .select_related('user')
+        .order_by('-created_at', '-id')[:limit + 1]
+    )
+    next_cursor = None
+    if len(reviews) > limit:
+        reviews = reviews[:limit]
+        next_cursor = encode_keyset_cursor(reviews[-1].created_at, reviews[-1].pk)
+    return reviews, next_cursor
+
+
+MY_REVIEWS_PAGE_SIZE = 20
+# Orderings of the My Reviews page, each ending in the id as a tiebreak
+MY_REVIEW_ORDERINGS = {
+    'newest': ('-created_at', '-id'),
+    'oldest': ('created_at', 'id'),
+    'highest': ('-overall', '-created_at', '-id'),
+    'lowest': ('overall', 'created_at', 'id'),
+}
+
+
+def _encode_user_review_cursor(review):
+    return f'{review.overall}.{encode_keyset_cursor(review.created_at, review.pk)}'
+
+
+def _decode_user_review_cursor(cursor):
+    """(overall, created_at, id) of a My Reviews cursor; ValueError if invalid"""
+    overall, _, position = cursor.partition('.')
+    timestamp, pk = decode_keyset_cursor(position) or (None, None)
+    if timestamp is None:
+        raise ValueError('Invalid cursor')
+    return int(overall), timestamp, pk
+
+
+def _after(queryset, ordering, values):
+    """Rows after ``values`` in ``ordering``, as (a > x) OR (a = x AND b > y) ..."""
+    condition, equal = Q(), {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return queryset.filter(condition)
+
+
+def get_user_reviews(user_id, rating=None, created_from=None, created_to=None,
+                     sort='newest', cursor=None, limit=MY_REVIEWS_PAGE_SIZE):
+    """
+    One page of the reviews written by a user, with their projects joined.
+    ``rating`` keeps one overall rating, ``created_from`` and ``created_to``
+    bound created_at (inclusive, exclusive) and ``sort`` is a key of
+    MY_REVIEW_ORDERINGS. Returns (reviews, next_cursor); next_cursor is
+    None on the last page. Raises ValueError on an invalid cursor.
+
+    Every page is a range scan of the (user, overall, created_at, id) or
+    (user, created_at) index, so heavy reviewers cost the same as anyone.
+    """
+    ordering = MY_REVIEW_ORDERINGS[sort]
+    reviews = Review.objects.filter(user_id=user_id)
+    if rating is not None:
+        reviews = reviews.filter(overall=rating)
+    if created_from is not None:
+        reviews = reviews.filter(created_at__gte=created_from)
+    if created_to is not None:
+        reviews = reviews.filter(created_at__lt=created_to)
+    if cursor:
+        overall, timestamp, pk = _decode_user_review_cursor(cursor)
+        values = {'overall': overall, 'created_at': timestamp, 'id': pk}
+        reviews = _after(reviews, ordering, [values[field.lstrip('-')] for field in ordering])
+
+    reviews = list(
+        reviews.select_related('submitted_website')
+        .only('id', 'overall', 'description', 'created_at', 'user_id',
+              'submitted_website__id', 'submitted_website__title')
+        .order_by(*ordering)[:limit + 1]
+    )
+    next_cursor = None
+    if len(reviews) > limit:
+        reviews = reviews[:limit]
+        next_cursor = _encode_user_review_cursor(reviews[-1])
+    return reviews, next_cursor
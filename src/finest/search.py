@@ -0,0 +1,220 @@
+""" Full-text search over projects and profiles """
+import re
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db import connection, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from .models import Profile, SearchDocument, SubmittedWebsite
+
+SEARCH_PAGE_SIZE = 20
+# Deeper pages rank every match again, stop at a thousand results
+MAX_SEARCH_PAGE = 50
+SEARCH_CONFIG = 'english'
+# Same weights as ts_rank: a title match counts 1, a body match 0.4
+TITLE_WEIGHT = 1.0
+BODY_WEIGHT = 0.4
+DOCUMENT_VECTOR = (
+    SearchVector('title', weight='A', config=SEARCH_CONFIG)
+    + SearchVector('body', weight='B', config=SEARCH_CONFIG)
+)
+MAX_TERMS = 10
+EXCERPT_LENGTH = 200
+HIGHLIGHT_TAGS = ('<mark>', '</mark>')
+
+
+def uses_full_text_index():
+    """Whether the database has the tsvector column and its GIN index"""
+    return connection.vendor == 'postgresql'
+
+
+def website_document(website):
+    """Search document of a project"""
+    return SearchDocument(
+        kind=SearchDocument.PROJECT, submitted_website_id=website.pk, user_id=website.user_id,
+        title=website.title, body=website.description or '',
+    )
+
+
+def profile_document(profile):
+    """Search document of a profile, titled with the username and full name"""
+    user = profile.user
+    title = ' '.join(filter(None, [user.username, user.first_name, user.last_name]))
+    body = '\n'.join(filter(None, [profile.profession, profile.location, profile.bio]))
+    return SearchDocument(
+        kind=SearchDocument.PROFILE, profile_id=profile.pk, user_id=profile.user_id,
+        title=title[:255], body=body,
+    )
+
+
+def _upsert(documents, unique_field, batch_size):
+    SearchDocument.objects.bulk_create(
+        documents, batch_size=batch_size, update_conflicts=True,
+        unique_fields=[unique_field], update_fields=['user', 'title', 'body', 'updated_at'],
+    )
+    if uses_full_text_index():
+        ids = [getattr(document, f'{unique_field}_id') for document in documents]
+        (SearchDocument.objects.filter(**{f'{unique_field}_id__in': ids})
+         .update(search_vector=DOCUMENT_VECTOR))
+
+
+def index_websites(websites, batch_size=1000):
+    """Create or refresh the search documents of projects"""
+    if websites:
+        _upsert([website_document(website) for website in websites], 'submitted_website', batch_size)
+
+
+def index_profiles(profiles, batch_size=1000):
+    """Create or refresh the search documents of profiles (with their user loaded)"""
+    if profiles:
+        _upsert([profile_document(profile) for profile in profiles], 'profile', batch_size)
+
+
+def rebuild_search_index(batch_size=1000):
+    """
+    Recompute every search document from SubmittedWebsite and Profile,
+    for backfill after bulk inserts and drift repair. Returns the number
+    of documents.
+    """
+    websites = SubmittedWebsite.objects.only('id', 'user_id', 'title', 'description')
+    profiles = Profile.objects.select_related('user')
+    with transaction.atomic():
+        SearchDocument.objects.all().delete()
+        documents = [website_document(website) for website in websites.iterator(chunk_size=batch_size)]
+        documents += [profile_document(profile) for profile in profiles.iterator(chunk_size=batch_size)]
+        SearchDocument.objects.bulk_create(documents, batch_size=batch_size)
+        if uses_full_text_index():
+            SearchDocument.objects.update(search_vector=DOCUMENT_VECTOR)
+    return len(documents)
+
+
+def search_terms(query):
+    """Words of a query, as used by the fallback search and highlighter"""
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def _marked_html(text):
+    """Escape highlighted text, keeping only the highlight tags as markup"""
+    return mark_safe(''.join(
+        part if part in HIGHLIGHT_TAGS else escape(part)
+        for part in re.split('(</?mark>)', text or '')
+    ))
+
+
+def highlight(text, terms, length=None):
+    """Mark the terms in text, cut to an excerpt around the first match"""
+    if not terms or not text:
+        return _marked_html(text)
+    pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+    if length and len(text) > length:
+        match = pattern.search(text)
+        start = max(match.start() - length // 4, 0) if match else 0
+        excerpt = text[start:start + length]
+        text = ('… ' if start else '') + excerpt + (' …' if start + length < len(text) else '')
+    start_tag, stop_tag = HIGHLIGHT_TAGS
+    return _marked_html(pattern.sub(lambda match: f'{start_tag}{match.group(0)}{stop_tag}', text))
+
+
+def _full_text_matches(documents, query):
+    search_query = SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG)
+    matches = (
+        documents.filter(search_vector=search_query)
+        .annotate(rank=SearchRank(F('search_vector'), search_query))
+    )
+    return matches, search_query
+
+
+def _fallback_filter(documents, terms):
+    for term in terms:
+        documents = documents.filter(Q(title__icontains=term) | Q(body__icontains=term))
+    return documents
+
+
+def _fallback_matches(documents, terms):
+    """LIKE scan for databases without full-text indexes, e.g. SQLite test runs"""
+    documents = _fallback_filter(documents, terms)
+    rank = Value(0.0)
+    for term in terms:
+        rank += Case(When(title__icontains=term, then=Value(TITLE_WEIGHT)), default=Value(0.0))
+        rank += Case(When(body__icontains=term, then=Value(BODY_WEIGHT)), default=Value(0.0))
+    return documents.annotate(rank=rank)
+
+
+def _add_headlines(results, search_query):
+    headlines = (
+        SearchDocument.objects.filter(pk__in=[document.pk for document in results])
+        .annotate(
+            title_headline=SearchHeadline(
+                'title', search_query, config=SEARCH_CONFIG, highlight_all=True,
+                start_sel=HIGHLIGHT_TAGS[0], stop_sel=HIGHLIGHT_TAGS[1],
+            ),
+            body_headline=SearchHeadline(
+                'body', search_query, config=SEARCH_CONFIG, max_words=35, min_words=15,
+                max_fragments=2, fragment_delimiter=' … ',
+                start_sel=HIGHLIGHT_TAGS[0], stop_sel=HIGHLIGHT_TAGS[1],
+            ),
+        )
+        .values_list('pk', 'title_headline', 'body_headline')
+    )
+    by_id = {pk: (title, body) for pk, title, body in headlines}
+    for document in results:
+        title, body = by_id[document.pk]
+        document.title_highlight = _marked_html(title)
+        document.body_highlight = _marked_html(body)
+
+
+def matching_documents(query, kind):
+    """Unranked search documents of one kind matching ``query``, to filter other querysets by"""
+    documents = SearchDocument.objects.filter(kind=kind)
+    if uses_full_text_index():
+        return documents.filter(
+            search_vector=SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG)
+        )
+    return _fallback_filter(documents, search_terms(query))
+
+
+def search(query, kind='', username='', min_rating=None, page=1, limit=SEARCH_PAGE_SIZE):
+    """
+    One page of the projects and profiles matching ``query``, best first.
+    Returns (documents, has_next); each document carries ``rank``,
+    ``rating`` (projects only) and HTML-safe ``title_highlight`` and
+    ``body_highlight`` with the matches wrapped in <mark>.
+
+    On PostgreSQL the match is a GIN index scan of the weighted tsvector
+    (websearch syntax: quotes, OR, -word) and headlines are computed for
+    the page rows only. Other databases fall back to a LIKE scan.
+    """
+    terms = search_terms(query)
+    if not terms or page > MAX_SEARCH_PAGE:
+        return [], False
+
+    documents = SearchDocument.objects.select_related('user').annotate(
+        rating=F('submitted_website__rating_stats__avg_average')
+    )
+    if kind:
+        documents = documents.filter(kind=kind)
+    if username:
+        documents = documents.filter(user__username=username)
+    if min_rating is not None:
+        documents = documents.filter(submitted_website__rating_stats__avg_average__gte=min_rating)
+
+    search_query = None
+    if uses_full_text_index():
+        documents, search_query = _full_text_matches(documents, query)
+    else:
+        documents = _fallback_matches(documents, terms)
+
+    offset = (page - 1) * limit
+    results = list(
+        documents.defer('search_vector').order_by('-rank', '-id')[offset:offset + limit + 1]
+    )
+    has_next = len(results) > limit
+    results = results[:limit]
+
+    if search_query is not None:
+        _add_headlines(results, search_query)
+    else:
+        for document in results:
+            document.title_highlight = highlight(document.title, terms)
+            document.body_highlight = highlight(document.body, terms, EXCERPT_LENGTH)
+    return results, has_next
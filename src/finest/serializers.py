@@ -1,21 +1,52 @@
-""" Serializer for Profile and SubmittedWebsite """
+""" Serializer for Profile, SubmittedWebsite, Review and search results """
 from rest_framework import serializers
-from .models import Profile, SubmittedWebsite
+from .models import Profile, Review, SearchDocument, SubmittedWebsite
 
 class SubmittedWebsiteSerializer(serializers.ModelSerializer):
     """
     Serializer for the SubmittedWebsite model.
 
     This serializer handles the representation of submitted websites, 
-    including fields such as title, URL, description, file, submission date, 
-    and whether the website is marked as a favorite.
+    including fields such as title, URL, description, file, its resized 
+    variants, submission date, and how many users marked it as a favorite.
     """
     class Meta:
         """
         Class Meta
         """
         model = SubmittedWebsite
-        fields = ['id', 'title', 'url', 'description', 'file', 'submitted_at', 'is_favorite']
+        fields = ['id', 'title', 'url', 'description', 'file', 'variants',
+                  'submitted_at', 'favorite_count']
+
+    variants = serializers.SerializerMethodField()
+
+    def get_variants(self, obj):
+        """Absolute URLs of the resized screenshots, by size and format"""
+        request = self.context.get('request')
+        urls = {}
+        for size, formats in obj.variants.items():
+            if size == 'source':
+                continue
+            urls[size] = {}
+            for image_format in formats:
+                url = obj.variant_url(size, image_format)
+                urls[size][image_format] = request.build_absolute_uri(url) if request else url
+        return urls
+
+
+class SubmittedWebsiteListSerializer(SubmittedWebsiteSerializer):
+    """
+    Serializer of the projects list, with the deprecated is_favorite flag:
+    whether the owner marked the project as a favorite, which is what the
+    flag meant before favorites became per user. Use favorite_count instead.
+    """
+    is_favorite = serializers.BooleanField(read_only=True)
+
+    class Meta(SubmittedWebsiteSerializer.Meta):
+        """
+        Class Meta
+        """
+        fields = SubmittedWebsiteSerializer.Meta.fields + ['is_favorite']
 
 
 class ProfileSerializer(serializers.ModelSerializer):
@@ -23,14 +54,58 @@ class ProfileSerializer(serializers.ModelSerializer):
     Serializer for the Profile model.
 
     This serializer includes user profile details such as profile picture, bio, 
-    and contact information. It also includes related projects posted by the user 
-    through the SubmittedWebsite model.
+    and contact information. It also includes the most recent projects posted by 
+    the user (see ProfileListAPIView); the full list is paged by ProfileProjectsAPIView.
     """
-    projects = SubmittedWebsiteSerializer(source='user.submittedwebsite_set', many=True, read_only=True)
+    projects = SubmittedWebsiteSerializer(source='user.recent_projects', many=True, read_only=True)
+    projects_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         """
         Class Meta
         """
         model = Profile
-        fields = ['id', 'user', 'profile_picture', 'bio', 'contact_info', 'projects']
+        fields = ['id', 'user', 'profile_picture', 'bio', 'contact_info',
+                  'projects', 'projects_count']
+
+
+class ReviewSerializer(serializers.ModelSerializer):
+    """
+    Serializer for a review of a project, with the username of its author.
+    """
+    username = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        """
+        Class Meta
+        """
+        model = Review
+        fields = ['id', 'username', 'design', 'usability', 'content', 'overall',
+                  'average', 'description', 'created_at']
+
+
+class SearchResultSerializer(serializers.ModelSerializer):
+    """
+    Serializer for a search hit, a project or a profile.
+
+    ``object_id`` is the id of the project or profile. The highlights are
+    HTML, escaped except for the <mark> tags around the matched words.
+    """
+    object_id = serializers.SerializerMethodField()
+    username = serializers.CharField(source='user.username', read_only=True)
+    title_highlight = serializers.CharField(read_only=True)
+    body_highlight = serializers.CharField(read_only=True)
+    rank = serializers.FloatField(read_only=True)
+    rating = serializers.FloatField(read_only=True)
+
+    class Meta:
+        """
+        Class Meta
+        """
+        model = SearchDocument
+        fields = ['kind', 'object_id', 'username', 'title', 'title_highlight',
+                  'body_highlight', 'rank', 'rating']
+
+    def get_object_id(self, obj):
+        """Id of the project or of the profile"""
+        return obj.submitted_website_id or obj.profile_id
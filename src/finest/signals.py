@@ -0,0 +1,211 @@
+""" Signal handlers keeping derived data in sync """
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.contrib.auth.models import User
+from django.dispatch import receiver
+from .models import SubmittedWebsite, Review, Profile, Follow
+from .activity import local_day, record_activity
+from .favorites import user_deleted
+from .feeds import follow_added, follow_removed
+from .jobs import enqueue
+from .leaderboards import RATING_LEADERBOARDS, invalidate_leaderboards
+from .ratings import DIMENSIONS, review_values, update_rating_stats
+from .search import index_profiles, index_websites
+from .summaries import invalidate_dashboard_summary
+from .thumbnails import needs_variants, schedule_variants
+from .watermarks import PROFILES, PROJECTS, bump_watermarks, user_key
+
+# User fields copied into the search document of the profile
+SEARCHED_USER_FIELDS = {'username', 'first_name', 'last_name'}
+
+# Set by set-based deletes which call reviews_deleted themselves
+_review_deletes_muted = ContextVar('finest_review_deletes_muted', default=False)
+
+
+def _website_owner_id(review):
+    if Review.submitted_website.is_cached(review):
+        return review.submitted_website.user_id
+    return (SubmittedWebsite.objects.filter(pk=review.submitted_website_id)
+            .values_list('user_id', flat=True).first())
+
+
+def _review_activity(review, owner_id, delta):
+    day = local_day(review.created_at)
+    return [
+        (review.user_id, day, 'reviews_written', delta),
+        (owner_id, day, 'reviews_received', delta),
+    ]
+
+
+def reviews_created(reviews, owner_ids):
+    """
+    Update everything derived from reviews after they were inserted.
+
+    ``owner_ids`` maps each reviewed website id to its owner. Used by the
+    post_save handler for single reviews and directly by bulk inserts,
+    which send no signals.
+    """
+    user_ids = {review.user_id for review in reviews} | set(owner_ids.values())
+    update_rating_stats(added=[review_values(review) for review in reviews])
+    changes = []
+    for review in reviews:
+        changes += _review_activity(review, owner_ids[review.submitted_website_id], 1)
+    record_activity(changes)
+    invalidate_leaderboards(*RATING_LEADERBOARDS)
+    invalidate_dashboard_summary(*user_ids)
+
+
+@contextmanager
+def review_deletes_muted():
+    """
+    Skip the post_delete handler of reviews in the current thread or task,
+    for set-based deletes which call reviews_deleted once per batch.
+    Unlike disconnecting the handler, deletes elsewhere keep it.
+    """
+    token = _review_deletes_muted.set(True)
+    try:
+        yield
+    finally:
+        _review_deletes_muted.reset(token)
+
+
+def reviews_deleted(reviews, owner_ids):
+    """
+    Update everything derived from reviews after they were deleted.
+
+    The counterpart of reviews_created, used by the post_delete handler
+    and directly by set-based deletes, see review_deletes_muted.
+    """
+    user_ids = {review.user_id for review in reviews} | set(owner_ids.values())
+    update_rating_stats(removed=[review_values(review) for review in reviews])
+    changes = []
+    for review in reviews:
+        changes += _review_activity(review, owner_ids[review.submitted_website_id], -1)
+    record_activity(changes)
+    invalidate_leaderboards(*RATING_LEADERBOARDS)
+    invalidate_dashboard_summary(*user_ids)
+
+
+def websites_created(websites):
+    """
+    Update everything derived from projects after they were inserted.
+
+    Used by the post_save handler and directly by bulk inserts.
+    """
+    record_activity([
+        (website.user_id, local_day(website.submitted_at), 'sites_submitted', 1)
+        for website in websites
+    ])
+    user_ids = {website.user_id for website in websites}
+    enqueue('fan_out', {'website_ids': [website.pk for website in websites]})
+    index_websites(websites)
+    schedule_variants(*[website.pk for website in websites if needs_variants(website)])
+    invalidate_leaderboards()
+    invalidate_dashboard_summary(*user_ids)
+    bump_watermarks(PROJECTS, PROFILES, *[user_key(user_id) for user_id in user_ids])
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_rating(sender, instance, **kwargs):
+    """Keep the stored rating of an edited review to subtract it afterwards"""
+    instance._previous_rating = None
+    if instance.pk:
+        previous = (
+            Review.objects.filter(pk=instance.pk)
+            .only('submitted_website_id', *DIMENSIONS)
+            .first()
+        )
+        instance._previous_rating = review_values(previous) if previous else None
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    """Update the website rating aggregates after a review is created or edited"""
+    owner_id = _website_owner_id(instance)
+    if created:
+        reviews_created([instance], {instance.submitted_website_id: owner_id})
+        return
+
+    previous = getattr(instance, '_previous_rating', None)
+    update_rating_stats(
+        added=[review_values(instance)],
+        removed=[previous] if previous else [],
+    )
+    invalidate_leaderboards(*RATING_LEADERBOARDS)
+    invalidate_dashboard_summary(instance.user_id, owner_id)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    """Update the website rating aggregates after a review is deleted"""
+    if _review_deletes_muted.get():
+        return
+    reviews_deleted([instance], {instance.submitted_website_id: _website_owner_id(instance)})
+
+
+@receiver(post_save, sender=SubmittedWebsite)
+def website_saved(sender, instance, created, **kwargs):
+    """New or edited projects change every leaderboard and the owner dashboard"""
+    if created:
+        websites_created([instance])
+        return
+    index_websites([instance])
+    if needs_variants(instance):
+        schedule_variants(instance.pk)
+    invalidate_leaderboards()
+    invalidate_dashboard_summary(instance.user_id)
+    bump_watermarks(PROJECTS, PROFILES, user_key(instance.user_id))
+
+
+@receiver(post_delete, sender=SubmittedWebsite)
+def website_deleted(sender, instance, **kwargs):
+    """Removed projects change every leaderboard and the owner dashboard"""
+    changes = [(instance.user_id, local_day(instance.submitted_at), 'sites_submitted', -1)]
+    if instance.date_site_of_the_day:
+        changes.append((instance.user_id, instance.date_site_of_the_day, 'site_of_the_day_wins', -1))
+    record_activity(changes)
+    invalidate_leaderboards()
+    invalidate_dashboard_summary(instance.user_id)
+    bump_watermarks(PROJECTS, PROFILES, user_key(instance.user_id))
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    """A new follower gets the author's latest projects in their feed"""
+    if created and instance.follower_id and instance.followed_id:
+        follow_added(instance.follower_id, instance.followed_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    """An unfollow removes the author's projects from the feed"""
+    if instance.follower_id and instance.followed_id:
+        follow_removed(instance.follower_id, instance.followed_id)
+
+
+@receiver(post_save, sender=Profile)
+def profile_saved(sender, instance, **kwargs):
+    """Profiles are searchable, and part of the profiles API and the public user page"""
+    index_profiles([instance])
+    bump_watermarks(PROFILES, user_key(instance.user_id))
+
+
+@receiver(post_delete, sender=Profile)
+def profile_deleted(sender, instance, **kwargs):
+    """Profiles are part of the profiles API and the public user page"""
+    bump_watermarks(PROFILES, user_key(instance.user_id))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Usernames and names are shown on the public user page and searched"""
+    bump_watermarks(user_key(instance.pk))
+    if not created and (update_fields is None or SEARCHED_USER_FIELDS & set(update_fields)):
+        index_profiles(list(Profile.objects.select_related('user').filter(user=instance)))
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    """Favorites are deleted with the user, uncount them while they still exist"""
+    user_deleted(instance.pk)
@@ -0,0 +1,92 @@
+""" Featured site and site of the day snapshots """
+from datetime import datetime, time, timedelta
+from django.db import transaction
+from django.db.models import Avg
+from django.utils import timezone
+from django.utils.timezone import now
+from .activity import record_activity
+from .jobs import enqueue
+from .watermarks import bump_watermarks, user_key
+from .models import SubmittedWebsite, Review, SiteSnapshot, WebsiteRatingStats
+
+
+def compute_featured_site(day=None):
+    """Store the best scored website as the featured site for the given day"""
+    day = day or now().date()
+    highest_rated = (
+        WebsiteRatingStats.objects.filter(review_count__gt=0)
+        .order_by('-score_average', '-submitted_website')
+        .first()
+    )
+    if not highest_rated:
+        return None
+
+    snapshot, _ = SiteSnapshot.objects.update_or_create(
+        kind=SiteSnapshot.FEATURED,
+        date=day,
+        defaults={
+            'submitted_website_id': highest_rated.submitted_website_id,
+            'score': round(highest_rated.avg_average, 2),
+        },
+    )
+    return snapshot
+
+
+def compute_sites_of_the_day(days=6, today=None):
+    """Pick a site of the day for each of the previous days that has none yet"""
+    today = today or now().date()
+    picked = []
+
+    for i in range(1, days + 1):
+        day = today - timedelta(days=i)
+        if SiteSnapshot.objects.filter(kind=SiteSnapshot.SITE_OF_THE_DAY, date=day).exists():
+            continue
+
+        day_start = timezone.make_aware(datetime.combine(day, time.min))
+        highest_rating_for_day = (
+            Review.objects.filter(created_at__gte=day_start,
+                                  created_at__lt=day_start + timedelta(days=1))
+            .values('submitted_website')
+            .annotate(average_per_user=Avg('average'))
+            .order_by('-average_per_user')
+            .first()
+        )
+        if not highest_rating_for_day:
+            continue
+
+        website_id = highest_rating_for_day['submitted_website']
+        with transaction.atomic():
+            snapshot, created = SiteSnapshot.objects.get_or_create(
+                kind=SiteSnapshot.SITE_OF_THE_DAY,
+                date=day,
+                defaults={
+                    'submitted_website_id': website_id,
+                    'score': highest_rating_for_day['average_per_user'],
+                },
+            )
+            if created:
+                SubmittedWebsite.objects.filter(id=website_id).update(date_site_of_the_day=day)
+                owner_id = (SubmittedWebsite.objects.filter(id=website_id)
+                            .values_list('user_id', flat=True).first())
+                record_activity([(owner_id, day, 'site_of_the_day_wins', 1)])
+                bump_watermarks(user_key(owner_id))
+                picked.append(snapshot)
+
+    return picked
+
+
+def schedule_site_snapshots(today=None):
+    """Queue the computation of today's picks unless the featured site is already picked"""
+    today = today or now().date()
+    if not SiteSnapshot.objects.filter(kind=SiteSnapshot.FEATURED, date=today).exists():
+        enqueue('site_snapshots', key=f'site_snapshots:{today}')
+
+
+def get_featured_snapshot():
+    """Latest featured site snapshot with its author preloaded"""
+    return (
+        SiteSnapshot.objects.filter(kind=SiteSnapshot.FEATURED)
+        .select_related('submitted_website__user__profile')
+        .order_by('-date')
+        .first()
+    )
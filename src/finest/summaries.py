@@ -0,0 +1,123 @@
+""" Cached per-user dashboard summary """
+import json
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from .activity import chart_series, current_year_range
+from .concurrency import gather_queries
+from .instrumentation import record_cache_lookup
+from .models import SubmittedWebsite, Review
+
+CACHE_TIMEOUT = 60 * 15
+CACHE_PREFIX = 'finest:dashboard:'
+
+
+def _cache_key(user_id):
+    return f'{CACHE_PREFIX}{user_id}'
+
+
+def _summary_queries(user):
+    """The independent queries of a dashboard summary, by name"""
+    projects = SubmittedWebsite.objects.filter(user=user)
+    own_reviews = (
+        Review.objects.filter(user=user, submitted_website__user=user)
+        .values('description', 'submitted_website_id')
+    )
+    return {
+        'totals': lambda: projects.aggregate(
+            total_projects=Count('id'),
+            reviewed_projects_count=Count('id', filter=Q(rating_stats__review_count__gt=0)),
+            received_reviews=Sum('rating_stats__review_count'),
+            received_overall=Sum('rating_stats__sum_overall'),
+        ),
+        'recent_projects': lambda: list(
+            projects.annotate(review_count=Coalesce('rating_stats__review_count', Value(0)))
+            .order_by('-submitted_at')[:4]
+        ),
+        'top_review': lambda: own_reviews.order_by('-average').first(),
+        'lowest_review': lambda: own_reviews.order_by('average').first(),
+        'chart': lambda: chart_series(user, 'sites_submitted', *current_year_range()),
+    }
+
+
+def _assemble_summary(totals, recent_projects, top_review, lowest_review, chart):
+    received_reviews = totals['received_reviews'] or 0
+    average_review_score = (
+        totals['received_overall'] / received_reviews if received_reviews else 0
+    )
+
+    if top_review:
+        top_feedback = top_review['description'] or "No feedback available yet."
+        top_feedback_id = top_review['submitted_website_id']
+    else:
+        top_feedback = "No feedback available yet."
+        top_feedback_id = None
+
+    if lowest_review:
+        improvement_tip = lowest_review['description'] or "No improvement tips available yet."
+        improvement_project_id = lowest_review['submitted_website_id']
+    else:
+        improvement_tip = "No improvement tips available yet."
+        improvement_project_id = None
+
+    filtered_labels, filtered_data = chart
+
+    return {
+        'total_projects': totals['total_projects'],
+        'reviewed_projects_count': totals['reviewed_projects_count'],
+        'non_reviewed_projects_count': (
+            totals['total_projects'] - totals['reviewed_projects_count']
+        ),
+        'average_review_score': round(average_review_score, 1),
+        'recent_projects': recent_projects,
+        'recent_submissions': recent_projects[:2],
+        'top_feedback': top_feedback,
+        'top_feedback_id': top_feedback_id,
+        'improvement_tip': improvement_tip,
+        'improvement_project_id': improvement_project_id,
+        'labels': json.dumps(filtered_labels),
+        'data': json.dumps(filtered_data),
+    }
+
+
+def build_dashboard_summary(user):
+    """Compute the dashboard statistics of a user in as few queries as possible"""
+    queries = _summary_queries(user)
+    return _assemble_summary(**{name: query() for name, query in queries.items()})
+
+
+async def abuild_dashboard_summary(user):
+    """build_dashboard_summary running its queries concurrently"""
+    queries = _summary_queries(user)
+    results = await gather_queries(*queries.values())
+    return _assemble_summary(**dict(zip(queries, results)))
+
+
+def get_dashboard_summary(user):
+    """Cached dashboard statistics of a user"""
+    key = _cache_key(user.pk)
+    summary = cache.get(key)
+    record_cache_lookup(hits=int(summary is not None), misses=int(summary is None))
+    if summary is None:
+        summary = build_dashboard_summary(user)
+        cache.set(key, summary, CACHE_TIMEOUT)
+    return summary
+
+
+async def aget_dashboard_summary(user):
+    """Cached dashboard statistics of a user, for async views"""
+    key = _cache_key(user.pk)
+    summary = await cache.aget(key)
+    record_cache_lookup(hits=int(summary is not None), misses=int(summary is None))
+    if summary is None:
+        summary = await abuild_dashboard_summary(user)
+        await cache.aset(key, summary, CACHE_TIMEOUT)
+    return summary
+
+
+def invalidate_dashboard_summary(*user_ids):
+    """Drop the cached summaries once the current transaction commits"""
+    keys = [_cache_key(user_id) for user_id in user_ids if user_id]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
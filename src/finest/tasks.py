@@ -0,0 +1,20 @@
+""" Functions run by the background jobs of finest.jobs """
+from .feeds import fan_out
+from .models import Contact, SubmittedWebsite
+from .snapshots import compute_featured_site, compute_sites_of_the_day
+
+
+def fan_out_websites(website_ids):
+    """Copy new projects into the feeds of their authors' followers"""
+    fan_out(list(SubmittedWebsite.objects.filter(pk__in=website_ids).only('id', 'user_id', 'submitted_at')))
+
+
+def compute_site_snapshots(days=6):
+    """Pick today's featured site and the missing sites of the previous days"""
+    compute_featured_site()
+    compute_sites_of_the_day(days=days)
+
+
+def save_contact(email, subject, message):
+    """Store a message of the contact form"""
+    Contact.objects.create(email=email, subject=subject, message=message)
@@ -1,3 +1,1257 @@
-from django.test import TestCase
+""" Finest app tests """
+import json
+import re
+import shutil
+import tempfile
+from unittest import mock
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from io import BytesIO, StringIO
+from django.contrib.admin import site
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+                          override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from rest_framework.authtoken.models import Token
+from django.utils import timezone
+from PIL import Image
+from .activity import activity_series, chart_series, rebuild_activity, record_activity
+from .admin import ContactAdmin
+from .batch import ALREADY_REVIEWED, MAX_BATCH_SIZE, _insert_reviews, create_reviews
+from .feeds import FEED_PAGE_SIZE, get_feed
+from .favorites import toggle_favorites
+from .instrumentation import QueryBudgetExceeded
+from .jobs import claim_jobs, enqueue, run_job
+from .ratings import rebuild_rating_stats
+from .replicas import (PIN_COOKIE, ReplicaRouter, ReplicaRoutingMiddleware, pin_seconds,
+                       use_primary_database)
+from .reviews import MY_REVIEWS_PAGE_SIZE, REVIEW_PAGE_SIZE
+from .search import search
+from .snapshots import compute_featured_site, compute_sites_of_the_day, schedule_site_snapshots
+from .leaderboards import aget_leaderboards, build_leaderboard
+from .summaries import abuild_dashboard_summary, build_dashboard_summary
+from .thumbnails import generate_variants
+from .uploadhandlers import SIZE_ERROR, TYPE_ERROR
+from .views import PROFILE_PROJECTS_LIMIT
+from .models import (SubmittedWebsite, Review, Follow, DailyActivity, SiteSnapshot,
+                     WebsiteRatingStats, FeedAuthor, TimelineEntry, Profile, SearchDocument,
+                     Favorite, Contact, Job)
 
-# Create your tests here.
+# Eager jobs generate real screenshot variants, written here
+TEST_MEDIA_ROOT = tempfile.mkdtemp(prefix='finest-tests-')
+
+
+def tearDownModule():
+    shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+
+
+def screenshot(name='site.png'):
+    """A small PNG upload, for projects whose variant jobs run in the test"""
+    buffer = BytesIO()
+    Image.new('RGB', (8, 8), 'white').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+# Plan fragments meaning "read the whole table" per database vendor
+FULL_SCAN_PATTERNS = {
+    'postgresql': r'Seq Scan on (?P<table>\w+)',
+    'sqlite': r'\bSCAN (?P<table>\w+)(?! USING)(?:\s|$)',
+}
+
+
+class SiteSnapshotTests(TestCase):
+    """The featured site and the sites of the day are picked once into snapshots"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='snapshot-owner')
+        reviewers = User.objects.bulk_create(
+            [User(username=f'snapshot-reviewer-{i}') for i in range(4)]
+        )
+        cls.websites = SubmittedWebsite.objects.bulk_create([
+            SubmittedWebsite(user=cls.owner, title=f'Site {i}', url=f'https://site{i}.example.com',
+                             file='uploads/websites/site.png')
+            for i in range(3)
+        ])
+        cls.today = timezone.now().date()
+        noon = timezone.make_aware(datetime.combine(cls.today, time(12)))
+        # (website, reviewer, rating, days ago)
+        ratings = [(0, 0, 9, 1), (1, 1, 6, 1), (1, 2, 10, 2), (2, 3, 3, 2)]
+        reviews = [
+            Review(submitted_website=cls.websites[website], user=reviewers[reviewer],
+                   design=rating, usability=rating, content=rating, overall=rating // 2,
+                   created_at=noon - timedelta(days=days))
+            for website, reviewer, rating, days in ratings
+        ]
+        for review in reviews:
+            review.average = review.compute_average()
+        Review.objects.bulk_create(reviews)
+        rebuild_rating_stats()
+
+    def test_featured_site_is_read_by_home(self):
+        snapshot = compute_featured_site(self.today)
+        self.assertEqual(snapshot.submitted_website_id, self.websites[1].pk)
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['website_title'], 'Site 1')
+
+    def test_sites_of_the_day_are_picked_once(self):
+        picked = compute_sites_of_the_day(days=3, today=self.today)
+        self.assertEqual(
+            [(snapshot.date, snapshot.submitted_website_id) for snapshot in picked],
+            [(self.today - timedelta(days=1), self.websites[0].pk),
+             (self.today - timedelta(days=2), self.websites[1].pk)],
+        )
+        self.assertEqual(compute_sites_of_the_day(days=3, today=self.today), [])
+        self.assertEqual(SubmittedWebsite.objects.get(pk=self.websites[1].pk).date_site_of_the_day,
+                         self.today - timedelta(days=2))
+        self.assertEqual(
+            sum(DailyActivity.objects.filter(user=self.owner)
+                .values_list('site_of_the_day_wins', flat=True)), 2
+        )
+
+
+@override_settings(FINEST_JOBS_EAGER=True, MEDIA_ROOT=TEST_MEDIA_ROOT)
+class RatingStatsTests(TestCase):
+    """Rating aggregates follow every review write and match a rebuild from the reviews"""
+
+    FIELDS = ['review_count'] + [
+        f'{prefix}_{dimension}'
+        for prefix in ('sum', 'avg') for dimension in WebsiteRatingStats.DIMENSIONS
+    ]
+
+    def stats(self):
+        return {
+            row['submitted_website']: row for row in
+            WebsiteRatingStats.objects.filter(review_count__gt=0)
+            .values('submitted_website', *self.FIELDS)
+        }
+
+    def test_incremental_updates_match_rebuild(self):
+        owner = User.objects.create_user(username='stats-owner')
+        reviewers = User.objects.bulk_create(
+            [User(username=f'stats-reviewer-{i}') for i in range(3)]
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            websites = [
+                SubmittedWebsite.objects.create(user=owner, title=f'Site {i}',
+                                                url=f'https://site{i}.example.com', file=screenshot())
+                for i in range(3)
+            ]
+            reviews = [
+                Review.objects.create(submitted_website=website, user=reviewer, design=i + 2,
+                                      usability=j + 3, content=i + j + 1, overall=j + 1)
+                for i, website in enumerate(websites)
+                for j, reviewer in enumerate(reviewers)
+            ]
+            reviews[0].design = 10
+            reviews[0].save()
+            reviews[1].delete()
+            Review.objects.filter(submitted_website=websites[2]).delete()
+
+        incremental = self.stats()
+        self.assertEqual([incremental[website.pk]['review_count'] for website in websites[:2]], [2, 3])
+        self.assertNotIn(websites[2].pk, incremental)
+        self.assertEqual(incremental[websites[0].pk]['sum_design'], 10 + 2)
+        rebuild_rating_stats()
+        self.assertEqual(self.stats(), incremental)
+
+    @override_settings(FINEST_JOBS_EAGER=False)
+    def test_updated_in_the_review_transaction(self):
+        owner, reviewer = User.objects.bulk_create(
+            [User(username='stats-owner'), User(username='stats-reviewer')]
+        )
+        website = SubmittedWebsite.objects.create(user=owner, title='Site', url='https://site.example.com',
+                                                  file='uploads/websites/site.png')
+        with self.assertRaises(ValueError), transaction.atomic():
+            Review.objects.create(submitted_website=website, user=reviewer,
+                                  design=4, usability=4, content=4, overall=4)
+            self.assertEqual(WebsiteRatingStats.objects.get(submitted_website=website).review_count, 1)
+            raise ValueError
+        self.assertFalse(WebsiteRatingStats.objects.filter(review_count__gt=0).exists())
+
+
+class ActivityRollupTests(TestCase):
+    """Daily activity rollups follow every write, match a rebuild and serve any date range"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='activity-owner')
+        self.reviewer = User.objects.create_user(username='activity-reviewer')
+
+    def rows(self):
+        """Non-empty rollups; deletes leave zeroed rows which a rebuild does not create"""
+        metrics = ['reviews_written', 'reviews_received', 'sites_submitted', 'site_of_the_day_wins']
+        return list(
+            DailyActivity.objects.exclude(**{metric: 0 for metric in metrics})
+            .order_by('user', 'date').values('user', 'date', *metrics)
+        )
+
+    def test_incremental_rollups_match_rebuild(self):
+        websites = [
+            SubmittedWebsite.objects.create(user=self.owner, title=f'Site {i}',
+                                            url=f'https://site{i}.example.com',
+                                            file='uploads/websites/site.png')
+            for i in range(2)
+        ]
+        reviews = [
+            Review.objects.create(submitted_website=website, user=self.reviewer, design=5,
+                                  usability=5, content=5, overall=3,
+                                  created_at=timezone.now() - timedelta(days=40 * i))
+            for i, website in enumerate(websites)
+        ]
+        reviews[0].delete()
+
+        incremental = self.rows()
+        self.assertEqual(sum(row['reviews_written'] for row in incremental), 1)
+        self.assertEqual(sum(row['sites_submitted'] for row in incremental), 2)
+        rebuild_activity()
+        self.assertEqual(self.rows(), incremental)
+
+    def test_month_and_day_buckets_over_any_range(self):
+        record_activity([
+            (self.reviewer.pk, date(2023, 12, 30), 'reviews_written', 2),
+            (self.reviewer.pk, date(2024, 1, 2), 'reviews_written', 1),
+            (self.reviewer.pk, date(2024, 1, 20), 'reviews_written', 4),
+        ])
+        self.assertEqual(activity_series(self.reviewer, 'reviews_written'),
+                         [(date(2023, 12, 1), 2), (date(2024, 1, 1), 5)])
+        self.assertEqual(chart_series(self.reviewer, 'reviews_written')[0], ['Dec 2023', 'Jan 2024'])
+
+        record_activity([
+            (self.owner.pk, date(2024, 1, 2), 'site_of_the_day_wins', 1),
+            (self.owner.pk, date(2024, 3, 5), 'site_of_the_day_wins', 1),
+        ])
+        response = self.client.get(reverse('user_detail', kwargs={'username': self.owner.username}), {
+            'start': '2024-01-01', 'end': '2024-01-31', 'bucket': 'day',
+        })
+        self.assertEqual(response.context['site_of_the_day_by_month'],
+                         [{'month': date(2024, 1, 2), 'month_count': 1}])
+
+
+class ProfileAPITests(TestCase):
+    """The profiles API reads a fixed number of queries and caps the nested projects"""
+
+    def add_profiles(self, prefix, count):
+        users = User.objects.bulk_create([User(username=f'{prefix}-{i}') for i in range(count)])
+        Profile.objects.bulk_create([Profile(user=user) for user in users])
+        SubmittedWebsite.objects.bulk_create([
+            SubmittedWebsite(user=user, title=f'Site {i}', url=f'https://site{i}.example.com',
+                             file='uploads/websites/site.png')
+            for user in users for i in range(PROFILE_PROJECTS_LIMIT + 2)
+        ])
+
+    def list_queries(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('api_profiles'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.json()
+
+    def test_constant_queries_and_capped_projects(self):
+        self.add_profiles('few', 2)
+        queries, _ = self.list_queries()
+        self.add_profiles('many', 6)
+        # watermark, count, page of profiles with users, their latest projects
+        self.assertEqual(self.list_queries()[0], queries)
+        self.assertEqual(queries, 4)
+
+        profile = self.list_queries()[1]['results'][0]
+        self.assertEqual(len(profile['projects']), PROFILE_PROJECTS_LIMIT)
+        self.assertEqual(profile['projects_count'], PROFILE_PROJECTS_LIMIT + 2)
+        url = reverse('api_profile_projects', kwargs={'pk': profile['id']})
+        self.assertEqual(self.client.get(url).json()['count'], PROFILE_PROJECTS_LIMIT + 2)
+
+    def test_cursor_pages_keep_the_page_number_order(self):
+        self.add_profiles('ordered', 3)
+        numbered = self.client.get(reverse('api_profiles')).json()['results']
+        cursor = self.client.get(reverse('api_profiles'), {'pagination': 'cursor'}).json()['results']
+        self.assertEqual([profile['id'] for profile in cursor],
+                         [profile['id'] for profile in numbered])
+
+
+class ConditionalGetTests(TestCase):
+    """Unchanged lists and user pages answer 304 until a write moves their watermark"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='watermark-user')
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.website = SubmittedWebsite.objects.create(
+                user=cls.user, title='Watched', url='https://watched.example.com',
+                file='uploads/websites/site.png',
+            )
+            cls.profile = Profile.objects.create(user=cls.user)
+
+    def assertRevalidates(self, url, change):
+        """304 for the ETag of a first response, 200 with a new one once ``change`` committed"""
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def rename_website(self):
+        self.website.title = 'Renamed'
+        self.website.save()
+
+    def edit_bio(self):
+        self.profile.bio = 'New bio'
+        self.profile.save()
+
+    def toggle_favorite(self):
+        toggle_favorites(self.user.pk, [self.website.pk])
+
+    def test_projects_api(self):
+        self.assertRevalidates(reverse('api_projects'), self.rename_website)
+
+    def test_profiles_api(self):
+        self.assertRevalidates(reverse('api_profiles'), self.edit_bio)
+
+    def test_user_page(self):
+        url = reverse('user_detail', kwargs={'username': self.user.username})
+        self.assertRevalidates(url, self.rename_website)
+        self.assertRevalidates(url, self.edit_bio)
+
+    @override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+    def test_generated_variants(self):
+        website = SubmittedWebsite.objects.create(user=self.user, title='Screenshot',
+                                                  url='https://screenshot.example.com',
+                                                  file=screenshot())
+        self.assertRevalidates(reverse('api_projects'), lambda: generate_variants(website.pk))
+        website.refresh_from_db()
+        self.assertEqual(website.variants['source'], website.file.name)
+
+    def test_favorite_counts(self):
+        for url in (reverse('api_projects'), reverse('api_profiles')):
+            with self.subTest(url):
+                self.assertRevalidates(url, self.toggle_favorite)
+                self.assertRevalidates(url, self.toggle_favorite)
+
+
+class ScreenshotVariantTests(TestCase):
+    """Pages pick the smallest variant that fills their images"""
+
+    def test_explore_avatars_use_thumbnails(self):
+        user = User.objects.create_user(username='variant-user')
+        SubmittedWebsite.objects.create(
+            user=user, title='Variants', url='https://variants.example.com', file='uploads/websites/site.png',
+            variants={'thumb': {'webp': 'uploads/variants/site-thumb.webp'},
+                      'card': {'webp': 'uploads/variants/site-card.webp'}},
+        )
+        cache.clear()
+        self.client.force_login(user)
+        content = self.client.get(reverse('explore')).content.decode()
+        self.assertIn('site-thumb.webp', content)
+        self.assertNotIn('site-card.webp', content)
+
+
+class BatchAPITests(TestCase):
+    """Batch endpoints validate per item, insert in bulk and report conflicts per item"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='batch-owner')
+        cls.reviewer = User.objects.create_user(username='batch-reviewer')
+        cls.websites = SubmittedWebsite.objects.bulk_create([
+            SubmittedWebsite(user=cls.owner, title=f'Site {i}', url=f'https://site{i}.example.com',
+                             file='uploads/websites/site.png')
+            for i in range(3)
+        ])
+
+    def setUp(self):
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=self.reviewer).key}'}
+
+    def review(self, website, **values):
+        return Review(submitted_website=website, user=self.reviewer, design=5, usability=5,
+                      content=5, overall=3, **values)
+
+    def post_reviews(self, reviews, **headers):
+        return self.client.post(reverse('api_reviews_batch'), {'reviews': reviews},
+                                content_type='application/json', **headers)
+
+    def test_token_required(self):
+        response = self.post_reviews([{'website': self.websites[0].pk}])
+        self.assertEqual(response.status_code, 401)
+
+    def test_partial_failures_are_reported_per_item(self):
+        own = SubmittedWebsite.objects.create(user=self.reviewer, title='Own',
+                                              url='https://own.example.com',
+                                              file='uploads/websites/site.png')
+        rating = {'design': 8, 'usability': 7, 'content': 9, 'overall': 4}
+        response = self.post_reviews([
+            {'website': self.websites[0].pk, **rating},
+            {'website': self.websites[0].pk, **rating},
+            {'website': own.pk, **rating},
+            {'website': self.websites[1].pk, **rating, 'overall': 9},
+            {'website': 0, **rating},
+        ], **self.auth)
+
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual((data['created'], data['failed']), (1, 4))
+        self.assertEqual(data['results'][0]['id'], Review.objects.get(user=self.reviewer).pk)
+        self.assertEqual([list(result['errors']) for result in data['results'][1:]],
+                         [['website'], ['website'], ['overall'], ['website']])
+
+    def test_batch_size_limit(self):
+        response = self.post_reviews([{'website': self.websites[0].pk}] * (MAX_BATCH_SIZE + 1),
+                                     **self.auth)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Review.objects.exists())
+
+    @override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+    def test_project_screenshots_are_checked_while_streaming(self):
+        projects = [
+            {'title': f'Batch {i}', 'url': f'https://batch{i}.example.com', 'description': 'Batch'}
+            for i in range(3)
+        ]
+        response = self.client.post(reverse('api_projects_batch'), {
+            'projects': json.dumps(projects),
+            'file_0': screenshot('batch.png'),
+            'file_1': SimpleUploadedFile('fake.png', b'not an image', content_type='image/png'),
+        }, **self.auth)
+
+        self.assertEqual(response.status_code, 201)
+        results = response.json()['results']
+        self.assertEqual(SubmittedWebsite.objects.get(title='Batch 0').pk, results[0]['id'])
+        self.assertEqual(results[1]['errors'], {'file': [TYPE_ERROR]})
+        self.assertIn('file', results[2]['errors'])
+
+    @override_settings(FINEST_BATCH_UPLOAD_MAX_SIZE=1024)
+    def test_project_body_limit(self):
+        response = self.client.post(reverse('api_projects_batch'), {
+            'projects': json.dumps([{'title': 'Large', 'url': 'https://large.example.com'}]),
+            'file_0': SimpleUploadedFile('large.png', b'\x89PNG\r\n\x1a\n' + bytes(2048)),
+        }, **self.auth)
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(SubmittedWebsite.objects.filter(title='Large').exists())
+
+    def test_concurrent_duplicates_are_reported(self):
+        # Reviewed by another request between the duplicate check and the insert
+        self.review(self.websites[1]).save()
+        results = [{'index': index} for index in range(3)]
+        pending = [(result, self.review(website)) for result, website in zip(results, self.websites)]
+        _insert_reviews(pending, {website.pk: self.owner.pk for website in self.websites})
+
+        self.assertEqual(results[1], {'index': 1, 'errors': {'website': [ALREADY_REVIEWED]}})
+        self.assertEqual([result.get('id') for result in results[::2]],
+                         list(Review.objects.filter(submitted_website__in=self.websites[::2])
+                              .order_by('submitted_website').values_list('id', flat=True)))
+
+    def test_batch_cost_does_not_grow_with_the_batch(self):
+        owners = User.objects.bulk_create([User(username=f'batch-owner-{i}') for i in range(12)])
+        websites = SubmittedWebsite.objects.bulk_create([
+            SubmittedWebsite(user=owner, title=owner.username, url=f'https://{owner.username}.example.com',
+                             file='uploads/websites/site.png')
+            for owner in owners
+        ])
+        rating = {'design': 8, 'usability': 7, 'content': 9, 'overall': 4}
+
+        def create(websites):
+            with CaptureQueriesContext(connection) as queries:
+                results = create_reviews(self.reviewer, [{'website': website.pk, **rating}
+                                                          for website in websites])
+            self.assertTrue(all('id' in result for result in results))
+            return len(queries)
+
+        self.assertEqual(create(websites[:2]), create(websites[2:]))
+        self.assertEqual(
+            sorted(DailyActivity.objects.filter(user__in=owners).values_list('reviews_received', flat=True)),
+            [1] * len(owners)
+        )
+        self.assertEqual(DailyActivity.objects.get(user=self.reviewer).reviews_written, len(owners))
+
+
+class UploadLimitTests(TestCase):
+    """Oversized or fake screenshots become form errors, with the CSRF check intact"""
+
+    def setUp(self):
+        self.client = Client(enforce_csrf_checks=True)
+        self.client.force_login(User.objects.create_user(username='upload-user'))
+        self.client.get(reverse('submit_website'))
+
+    def submit(self, file):
+        return self.client.post(reverse('submit_website'), {
+            'csrfmiddlewaretoken': self.client.cookies['csrftoken'].value,
+            'title': 'Uploaded', 'url': 'https://uploaded.example.com', 'description': 'Upload',
+            'file': file,
+        })
+
+    def test_oversized_body(self):
+        response = self.submit(SimpleUploadedFile(
+            'large.png', b'\x89PNG\r\n\x1a\n' + bytes(6 * 1024 * 1024), content_type='image/png',
+        ))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['form'].errors['file'], [SIZE_ERROR])
+        self.assertFalse(SubmittedWebsite.objects.exists())
+
+    def test_file_which_is_not_an_image(self):
+        response = self.submit(
+            SimpleUploadedFile('fake.png', b'not an image', content_type='image/png')
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['form'].errors['file'], [TYPE_ERROR])
+
+    def test_csrf_is_still_checked(self):
+        response = self.client.post(reverse('submit_website'), {'file': screenshot()})
+        self.assertEqual(response.status_code, 403)
+
+
+class QueryPlanTests(TestCase):
+    """
+    Capture EXPLAIN output of the hot queries on a seeded dataset and fail
+    when one of them falls back to a sequential scan of a finest table.
+
+    Small test tables are cheaper to scan than to search, so on PostgreSQL
+    sequential scans are disabled: the test checks that an index *can*
+    serve the query, not the planner's choice for this data size.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        users = User.objects.bulk_create(
+            [User(username=f'plan-user-{i}') for i in range(20)]
+        )
+        today = timezone.localdate()
+        websites = SubmittedWebsite.objects.bulk_create([
+            SubmittedWebsite(
+                user=users[i % len(users)], title=f'Site {i}', url=f'https://site{i}.example.com',
+                file='uploads/websites/site.png',
+                date_site_of_the_day=today - timedelta(days=i) if i % 10 == 0 else None,
+            )
+            for i in range(200)
+        ])
+        reviews = []
+        for i, website in enumerate(websites):
+            for offset in range(1, 6):
+                review = Review(
+                    submitted_website=website, user=users[(i + offset) % len(users)],
+                    design=offset * 2, usability=offset, content=10 - offset, overall=offset,
+                )
+                review.average = review.compute_average()
+                reviews.append(review)
+        Review.objects.bulk_create(reviews)
+        Follow.objects.bulk_create([
+            Follow(follower=users[i], followed=users[(i + step) % len(users)])
+            for i in range(len(users)) for step in (1, 2, 3)
+        ])
+        cls.user = users[0]
+        cls.website = websites[0]
+        cls.today = today
+
+    def assertNoFullScan(self, queryset):
+        """Fail if the plan of the queryset reads a finest table sequentially"""
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            self.skipTest(f'No plan patterns for {connection.vendor}')
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+            try:
+                plan = queryset.explain()
+            finally:
+                with connection.cursor() as cursor:
+                    cursor.execute('RESET enable_seqscan')
+        else:
+            plan = queryset.explain()
+
+        scanned = [
+            match.group('table') for match in re.finditer(pattern, plan)
+            if match.group('table').startswith('finest_')
+        ]
+        self.assertFalse(scanned, f'Sequential scan of {scanned} in plan:\n{plan}')
+
+    def test_user_projects(self):
+        self.assertNoFullScan(
+            SubmittedWebsite.objects.filter(user=self.user).order_by('-submitted_at')
+        )
+
+    def test_recent_projects(self):
+        self.assertNoFullScan(SubmittedWebsite.objects.order_by('-submitted_at', '-id')[:5])
+
+    def test_recent_sites_of_the_day(self):
+        self.assertNoFullScan(
+            SubmittedWebsite.objects.filter(date_site_of_the_day__lt=self.today)
+            .order_by('-date_site_of_the_day')[:6]
+        )
+
+    def test_user_reviews(self):
+        self.assertNoFullScan(Review.objects.filter(user=self.user).order_by('-created_at'))
+
+    def test_duplicate_review_check(self):
+        self.assertNoFullScan(
+            Review.objects.filter(submitted_website=self.website, user=self.user)
+        )
+
+    def test_reviews_of_a_day(self):
+        day_start = timezone.make_aware(datetime.combine(self.today, time.min))
+        self.assertNoFullScan(
+            Review.objects.filter(created_at__gte=day_start,
+                                  created_at__lt=day_start + timedelta(days=1))
+        )
+
+    def test_website_reviews_page(self):
+        self.assertNoFullScan(
+            Review.objects.filter(submitted_website=self.website)
+            .order_by('-created_at', '-id')[:REVIEW_PAGE_SIZE + 1]
+        )
+
+    def test_followers(self):
+        self.assertNoFullScan(Follow.objects.filter(followed=self.user))
+
+    def test_contact_admin_search(self):
+        queryset, _ = ContactAdmin(Contact, site).get_search_results(
+            None, Contact.objects.all(), ' visitor@example.com '
+        )
+        self.assertNoFullScan(queryset)
+
+    def test_leaderboard(self):
+        self.assertNoFullScan(
+            WebsiteRatingStats.objects.filter(review_count__gt=0)
+            .order_by('-score_average', '-submitted_website')[:5]
+        )
+
+    def test_daily_activity_range(self):
+        self.assertNoFullScan(
+            DailyActivity.objects.filter(
+                user=self.user, date__gte=self.today - timedelta(days=365), date__lte=self.today
+            ).order_by('date')
+        )
+
+    def test_featured_snapshot(self):
+        self.assertNoFullScan(
+            SiteSnapshot.objects.filter(kind=SiteSnapshot.FEATURED).order_by('-date')[:1]
+        )
+
+    def test_feed_timeline(self):
+        self.assertNoFullScan(
+            TimelineEntry.objects.filter(owner=self.user)
+            .order_by('-submitted_at', '-submitted_website_id')[:FEED_PAGE_SIZE + 1]
+        )
+
+
+@override_settings(FINEST_JOBS_EAGER=True, MEDIA_ROOT=TEST_MEDIA_ROOT)
+class RatingScoreTests(TestCase):
+    """Leaderboards rank by the Bayesian score, not the raw average"""
+
+    def test_many_good_reviews_beat_one_perfect_review(self):
+        owner = User.objects.create_user(username='score-owner')
+        reviewers = User.objects.bulk_create(
+            [User(username=f'score-reviewer-{i}') for i in range(20)]
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            perfect, popular = [
+                SubmittedWebsite.objects.create(user=owner, title=title, url='https://site.example.com',
+                                                file=screenshot())
+                for title in ('Perfect', 'Popular')
+            ]
+            Review.objects.create(submitted_website=perfect, user=reviewers[0],
+                                  design=10, usability=10, content=10, overall=5)
+            for reviewer in reviewers:
+                Review.objects.create(submitted_website=popular, user=reviewer,
+                                      design=9, usability=9, content=9, overall=5)
+
+        perfect_stats = WebsiteRatingStats.objects.get(submitted_website=perfect)
+        popular_stats = WebsiteRatingStats.objects.get(submitted_website=popular)
+        self.assertGreater(perfect_stats.avg_design, popular_stats.avg_design)
+        self.assertLess(perfect_stats.score_design, popular_stats.score_design)
+        self.assertEqual([project.pk for project in build_leaderboard('design')],
+                         [popular.pk, perfect.pk])
+
+
+@override_settings(FINEST_QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+    """Query budgets of the hot pages, checked by the instrumentation middleware"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='budget-user', password='budget-pass')
+        SubmittedWebsite.objects.bulk_create([
+            SubmittedWebsite(user=cls.user, title=f'Site {i}', url=f'https://site{i}.example.com',
+                             file='uploads/websites/site.png')
+            for i in range(10)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('cache;desc="0 hits, 1 misses"', response['Server-Timing'])
+
+    def test_pages_within_budget(self):
+        for name, kwargs in [('home', None), ('dashboard', None), ('explore', None),
+                             ('user_detail', {'username': self.user.username})]:
+            with self.subTest(name):
+                self.assertEqual(self.client.get(reverse(name, kwargs=kwargs)).status_code, 200)
+
+    @override_settings(FINEST_QUERY_BUDGETS={'explore': 1})
+    def test_exceeded_budget_raises(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('explore'))
+
+
+@override_settings(FINEST_JOBS_EAGER=True, MEDIA_ROOT=TEST_MEDIA_ROOT)
+class FeedTests(TestCase):
+    """Feeds filled on write, merged on read above the fan-out limit"""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='feed-author')
+        self.follower = User.objects.create_user(username='feed-follower')
+        Follow.objects.create(follower=self.follower, followed=self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.websites = [
+                SubmittedWebsite.objects.create(
+                    user=self.author, title=f'Site {i}', url=f'https://site{i}.example.com',
+                    file=screenshot(),
+                )
+                for i in range(5)
+            ]
+
+    def feed_ids(self, limit):
+        ids, cursor = [], None
+        while True:
+            projects, cursor = get_feed(self.follower, cursor, limit=limit)
+            ids += [project.pk for project in projects]
+            if cursor is None:
+                return ids
+
+    def test_keyset_pages(self):
+        newest_first = [website.pk for website in reversed(self.websites)]
+        self.assertEqual(self.feed_ids(limit=2), newest_first)
+
+    @override_settings(FINEST_FEED_FANOUT_LIMIT=0)
+    def test_popular_author_merged_on_read(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            website = SubmittedWebsite.objects.create(
+                user=self.author, title='Pulled', url='https://pulled.example.com',
+                file=screenshot(),
+            )
+        self.assertFalse(TimelineEntry.objects.filter(submitted_website=website).exists())
+        self.assertEqual(self.feed_ids(limit=4)[:2], [website.pk, self.websites[-1].pk])
+        self.assertEqual(len(self.feed_ids(limit=4)), 6)
+
+    def test_unfollow_clears_feed(self):
+        Follow.objects.filter(follower=self.follower).delete()
+        self.assertEqual(get_feed(self.follower), ([], None))
+        self.assertEqual(FeedAuthor.objects.get(pk=self.author.pk).follower_count, 0)
+
+
+class SearchTests(TestCase):
+    """Search documents follow their project or profile, results come ranked and escaped"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='search-user', first_name='Ada')
+        cls.website = SubmittedWebsite.objects.create(
+            user=cls.user, title='Rocket <launch> tracker', url='https://rocket.example.com',
+            file='uploads/websites/site.png',
+        )
+        SubmittedWebsite.objects.create(
+            user=cls.user, title='Bakery', url='https://bakery.example.com',
+            description='Rocket shaped bread', file='uploads/websites/site.png',
+        )
+        Profile.objects.create(user=cls.user, bio='Building rocket engines')
+
+    def test_title_matches_rank_first(self):
+        results, has_next = search('rocket')
+        self.assertEqual([result.kind for result in results], ['project', 'profile', 'project'])
+        self.assertEqual(results[0].submitted_website_id, self.website.pk)
+        self.assertEqual(results[0].title_highlight, '<mark>Rocket</mark> &lt;launch&gt; tracker')
+        self.assertFalse(has_next)
+
+    def test_filters_and_pages(self):
+        self.assertEqual(len(search('rocket', kind=SearchDocument.PROFILE)[0]), 1)
+        self.assertEqual(search('rocket', username='nobody'), ([], False))
+        self.assertEqual(search('rocket', min_rating=1), ([], False))
+        results, has_next = search('rocket', page=2, limit=2)
+        self.assertEqual(len(results), 1)
+        self.assertFalse(has_next)
+
+    def test_edits_are_reindexed(self):
+        self.website.title = 'Moon base'
+        self.website.save()
+        self.user.first_name = 'Grace'
+        self.user.save()
+        self.assertEqual(len(search('rocket')[0]), 2)
+        self.assertEqual(search('grace')[0][0].kind, SearchDocument.PROFILE)
+
+
+@override_settings(FINEST_JOBS_EAGER=True, MEDIA_ROOT=TEST_MEDIA_ROOT)
+class ReviewSubmissionTests(TestCase):
+    """Reviews are unique per user and project, enforced by the database"""
+
+    def setUp(self):
+        owner = User.objects.create_user(username='review-owner')
+        self.reviewer = User.objects.create_user(username='review-author')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.website = SubmittedWebsite.objects.create(
+                user=owner, title='Reviewed', url='https://reviewed.example.com',
+                file=screenshot(),
+            )
+        self.client.force_login(self.reviewer)
+
+    def test_double_submit_creates_one_review(self):
+        url = reverse('add_review', kwargs={'pk': self.website.pk})
+        data = {'design': 8, 'usability': 7, 'content': 9, 'overall': 4}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, data)
+            response = self.client.post(url, data)
+
+        self.assertRedirects(response, reverse('all_post_details', kwargs={'pk': self.website.pk}),
+                             fetch_redirect_response=False)
+        self.assertIn('You have already reviewed this project.',
+                      [str(message) for message in get_messages(response.wsgi_request)])
+        self.assertEqual(Review.objects.filter(submitted_website=self.website).count(), 1)
+        self.assertEqual(WebsiteRatingStats.objects.get(submitted_website=self.website).review_count, 1)
+
+
+class WebsiteDetailTests(TestCase):
+    """Detail pages read a fixed number of queries and page reviews by keyset"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(username='detail-owner')
+        cls.website = SubmittedWebsite.objects.create(
+            user=owner, title='Detailed', url='https://detailed.example.com',
+            file='uploads/websites/site.png',
+        )
+        reviewers = User.objects.bulk_create(
+            [User(username=f'detail-reviewer-{i}') for i in range(REVIEW_PAGE_SIZE * 2 + 3)]
+        )
+        reviews = [
+            Review(submitted_website=cls.website, user=reviewer, design=5, usability=5,
+                   content=5, overall=3, created_at=timezone.now() - timedelta(minutes=i // 2))
+            for i, reviewer in enumerate(reviewers)
+        ]
+        for review in reviews:
+            review.average = review.compute_average()
+        cls.review_ids = [review.pk for review in sorted(
+            Review.objects.bulk_create(reviews), key=lambda review: (review.created_at, review.pk),
+            reverse=True,
+        )]
+        cls.viewer = reviewers[0]
+
+    def setUp(self):
+        self.client.force_login(self.viewer)
+
+    def test_detail_queries(self):
+        url = reverse('all_post_details', kwargs={'pk': self.website.pk})
+        # session, user, website with stats and flags, reviews with authors, base profile
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertTrue(response.context['has_user_reviewed'])
+        self.assertEqual([review.pk for review in response.context['reviews']],
+                         self.review_ids[:REVIEW_PAGE_SIZE])
+
+    def test_load_more_walks_every_review(self):
+        response = self.client.get(reverse('all_post_details', kwargs={'pk': self.website.pk}))
+        ids = [review.pk for review in response.context['reviews']]
+        url = response.context['next_reviews_url']
+        while url:
+            data = self.client.get(url).json()
+            ids += [review['id'] for review in data['reviews']]
+            url = data['next']
+        self.assertEqual(ids, self.review_ids)
+
+    def test_invalid_cursor(self):
+        url = reverse('website_reviews', kwargs={'pk': self.website.pk})
+        self.assertEqual(self.client.get(url, {'cursor': 'nope'}).status_code, 400)
+
+    def test_unknown_project(self):
+        missing = SubmittedWebsite.objects.order_by('-pk').values_list('pk', flat=True).first() + 1
+        self.assertEqual(self.client.get(reverse('website_reviews', kwargs={'pk': missing})).status_code, 404)
+        self.assertEqual(self.client.get(reverse('all_post_details', kwargs={'pk': missing})).status_code, 404)
+
+        unreviewed = SubmittedWebsite.objects.create(user=self.website.user, title='Unreviewed',
+                                                     url='https://unreviewed.example.com',
+                                                     file='uploads/websites/site.png')
+        response = self.client.get(reverse('website_reviews', kwargs={'pk': unreviewed.pk}))
+        self.assertEqual((response.status_code, response.json()['reviews']), (200, []))
+
+
+class MyReviewsTests(TestCase):
+    """My Reviews filters, sorts and pages in SQL with the projects joined"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reviewer = User.objects.create_user(username='heavy-reviewer')
+        owner = User.objects.create_user(username='reviewed-owner')
+        websites = SubmittedWebsite.objects.bulk_create([
+            SubmittedWebsite(user=owner, title=f'Reviewed {i}', url=f'https://reviewed{i}.example.com',
+                             file='uploads/websites/site.png')
+            for i in range(MY_REVIEWS_PAGE_SIZE + 5)
+        ])
+        reviews = [
+            Review(submitted_website=website, user=cls.reviewer, design=5, usability=5, content=5,
+                   overall=i % 5 + 1, created_at=timezone.now() - timedelta(days=i))
+            for i, website in enumerate(websites)
+        ]
+        for review in reviews:
+            review.average = review.compute_average()
+        cls.reviews = Review.objects.bulk_create(reviews)
+
+    def setUp(self):
+        self.client.force_login(self.reviewer)
+
+    def walk(self, params):
+        """Ids of every review listed for ``params``, following the Next links"""
+        response = self.client.get(reverse('my_reviews'), params)
+        ids = [review.pk for review in response.context['reviews']]
+        while response.context['next_cursor']:
+            response = self.client.get(reverse('my_reviews'),
+                                       {**params, 'cursor': response.context['next_cursor']})
+            ids += [review.pk for review in response.context['reviews']]
+        return ids
+
+    def test_page_queries(self):
+        # session, user, one page of reviews with their projects, base profile
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('my_reviews'))
+        self.assertEqual(len(response.context['reviews']), MY_REVIEWS_PAGE_SIZE)
+        self.assertContains(response, 'Reviewed 0')
+
+    def test_sorts_walk_every_review(self):
+        highest = sorted(self.reviews, key=lambda review: (review.overall, review.created_at, review.pk),
+                         reverse=True)
+        self.assertEqual(self.walk({'sort': 'highest'}), [review.pk for review in highest])
+        oldest = sorted(self.reviews, key=lambda review: (review.created_at, review.pk))
+        self.assertEqual(self.walk({'sort': 'oldest'}), [review.pk for review in oldest])
+
+    def test_rating_and_date_filters(self):
+        since = timezone.localdate() - timedelta(days=10)
+        expected = [
+            review.pk for review in self.reviews
+            if review.overall == 5 and timezone.localdate(review.created_at) >= since
+        ]
+        self.assertEqual(self.walk({'rating': 5, 'date_from': since.isoformat()}), expected)
+
+
+@override_settings(FINEST_JOBS_EAGER=True, MEDIA_ROOT=TEST_MEDIA_ROOT)
+class AdminTests(TestCase):
+    """Admin changelists read a fixed number of queries and bulk actions are set-based"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin-user', password='admin-pass')
+        owner = User.objects.create_user(username='admin-owner')
+        cls.reviewers = User.objects.bulk_create(
+            [User(username=f'admin-reviewer-{i}') for i in range(6)]
+        )
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.website = SubmittedWebsite.objects.create(
+                user=owner, title='Moderated', url='https://moderated.example.com',
+                file=screenshot(),
+            )
+            for i, reviewer in enumerate(cls.reviewers):
+                Review.objects.create(submitted_website=cls.website, user=reviewer,
+                                      design=5, usability=5, content=5, overall=i % 5 + 1)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def changelist_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:finest_review_changelist'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_review_changelist_queries(self):
+        queries = self.changelist_queries()
+        other = SubmittedWebsite.objects.create(
+            user=self.reviewers[0], title='Other', url='https://other.example.com',
+            file='uploads/websites/site.png',
+        )
+        for reviewer in self.reviewers[1:]:
+            Review.objects.create(submitted_website=other, user=reviewer,
+                                  design=5, usability=5, content=5, overall=5)
+        self.assertEqual(self.changelist_queries(), queries)
+
+    def test_delete_reviews_action(self):
+        spam = Review.objects.filter(user__in=self.reviewers[:4])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('admin:finest_review_changelist'), {
+                'action': 'delete_selected_reviews',
+                '_selected_action': list(spam.values_list('pk', flat=True)),
+            })
+        self.assertEqual(Review.objects.count(), 2)
+        stats = WebsiteRatingStats.objects.get(submitted_website=self.website)
+        self.assertEqual((stats.review_count, stats.sum_overall), (2, 5 + 1))
+        self.assertEqual(
+            sum(DailyActivity.objects.filter(user__in=self.reviewers)
+                .values_list('reviews_written', flat=True)), 2
+        )
+        # The post_delete handler is only muted during the action
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.filter(user=self.reviewers[4]).delete()
+        stats.refresh_from_db()
+        self.assertEqual(stats.review_count, 1)
+
+    def test_clear_site_of_the_day_action(self):
+        today = timezone.localdate()
+        SubmittedWebsite.objects.filter(pk=self.website.pk).update(date_site_of_the_day=today)
+        record_activity([(self.website.user_id, today, 'site_of_the_day_wins', 1)])
+        self.client.post(reverse('admin:finest_submittedwebsite_changelist'), {
+            'action': 'clear_site_of_the_day', '_selected_action': [self.website.pk],
+        })
+        self.website.refresh_from_db()
+        self.assertIsNone(self.website.date_site_of_the_day)
+        self.assertEqual(DailyActivity.objects.get(user=self.website.user_id, date=today)
+                         .site_of_the_day_wins, 0)
+
+
+class FavoriteTests(TestCase):
+    """Favorites are per user and the count follows every toggle"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='favorite-owner')
+        self.fan = User.objects.create_user(username='favorite-fan')
+        self.websites = [
+            SubmittedWebsite.objects.create(
+                user=self.owner, title=f'Site {i}', url=f'https://site{i}.example.com',
+                file='uploads/websites/site.png',
+            )
+            for i in range(3)
+        ]
+
+    def counts(self):
+        return [website.favorite_count for website in
+                SubmittedWebsite.objects.filter(user=self.owner).order_by('id')]
+
+    def test_batch_toggle(self):
+        first, second, third = [website.pk for website in self.websites]
+        self.assertEqual(toggle_favorites(self.fan.pk, [first, second, 0]),
+                         {first: True, second: True})
+        toggle_favorites(self.owner.pk, [second])
+        self.assertEqual(toggle_favorites(self.fan.pk, [second, third]),
+                         {second: False, third: True})
+        self.assertEqual(self.counts(), [1, 1, 1])
+        self.assertEqual(Favorite.objects.filter(user=self.fan).count(), 2)
+
+    def test_deleted_user_is_uncounted(self):
+        toggle_favorites(self.fan.pk, [website.pk for website in self.websites])
+        self.fan.delete()
+        self.assertEqual(self.counts(), [0, 0, 0])
+
+    def test_deprecated_is_favorite_of_the_projects_api(self):
+        first, second, third = [website.pk for website in self.websites]
+        toggle_favorites(self.owner.pk, [first])
+        toggle_favorites(self.fan.pk, [second])
+        projects = self.client.get(reverse('api_projects')).json()['results']
+        self.assertEqual({project['id']: project['is_favorite'] for project in projects},
+                         {first: True, second: False, third: False})
+        response = self.client.get(reverse('api_projects'), {'is_favorite': 'true'})
+        self.assertEqual([project['id'] for project in response.json()['results']], [first])
+
+
+@override_settings(FINEST_DATABASE_REPLICAS=['replica_1'])
+class ReplicaRoutingTests(SimpleTestCase):
+    """Safe requests read from a replica until they write, writers stay on the primary"""
+
+    def route(self, request, view=None, write=False):
+        """Read databases of a request before and after an optional write, and its response"""
+        router = ReplicaRouter()
+        databases = []
+
+        def get_response(request):
+            if view is not None:
+                middleware.process_view(request, view, (), {})
+            databases.append(router.db_for_read(Review))
+            if write:
+                self.assertEqual(router.db_for_write(Review), 'default')
+                databases.append(router.db_for_read(Review))
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        return databases, middleware(request)
+
+    def test_reads_of_safe_requests_use_the_replica(self):
+        databases, response = self.route(RequestFactory().get('/'))
+        self.assertEqual(databases, ['replica_1'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(ReplicaRouter().db_for_read(Review), 'default')
+
+    def test_writes_pin_to_the_primary(self):
+        databases, response = self.route(RequestFactory().get('/'), write=True)
+        self.assertEqual(databases, ['replica_1', 'default'])
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], pin_seconds())
+
+        request = RequestFactory().get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        self.assertEqual(self.route(request)[0], ['default'])
+        self.assertEqual(self.route(RequestFactory().post('/'))[0], ['default'])
+
+    def test_primary_views(self):
+        view = use_primary_database(lambda request: HttpResponse())
+        self.assertEqual(self.route(RequestFactory().get('/'), view=view)[0], ['default'])
+        # Creates a missing profile on GET and prefills the form saved back
+        view = resolve(reverse('edit_profile', kwargs={'username': 'someone'})).func
+        self.assertEqual(self.route(RequestFactory().get('/'), view=view)[0], ['default'])
+
+
+
+class JobTests(TestCase):
+    """Jobs commit with the request, run once in a worker and retry with backoff"""
+
+    def run_due_jobs(self):
+        return [run_job(job) for job in claim_jobs('test-worker', 10)]
+
+    def test_contact_is_saved_by_a_job(self):
+        self.client.post(reverse('contact_us'), {
+            'email': 'visitor@example.com', 'subject': 'Hello', 'message': 'Nice site',
+        })
+        self.assertFalse(Contact.objects.exists())
+
+        job, = self.run_due_jobs()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(Contact.objects.get().subject, 'Hello')
+        stored = Job.objects.get(pk=job.pk)
+        self.assertEqual(stored.attempts, 1)
+        self.assertIsNotNone(stored.duration_ms)
+        self.assertIsNotNone(stored.wait_ms)
+        self.assertEqual(self.run_due_jobs(), [])
+
+    def test_rolled_back_and_duplicate_jobs(self):
+        with self.assertRaises(ValueError), transaction.atomic():
+            enqueue('site_snapshots')
+            raise ValueError
+        self.assertFalse(Job.objects.exists())
+
+        enqueue('site_snapshots', key='site_snapshots:today')
+        enqueue('site_snapshots', key='site_snapshots:today')
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_failed_jobs_retry_with_backoff(self):
+        enqueue('save_contact', {'email': 'visitor@example.com'}, max_attempts=2)
+        job, = self.run_due_jobs()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('TypeError', job.last_error)
+
+        Job.objects.update(run_at=timezone.now())
+        job, = self.run_due_jobs()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_daily_picks_are_queued_by_the_worker_not_home(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse('home')).status_code, 200)
+        self.assertEqual([query['sql'] for query in queries
+                          if not query['sql'].startswith('SELECT')], [])
+
+        today = timezone.now().date()
+        schedule_site_snapshots(today)
+        schedule_site_snapshots(today)
+        self.assertEqual(Job.objects.count(), 1)
+        owner = User.objects.create_user(username='picked-owner')
+        website = SubmittedWebsite.objects.create(user=owner, title='Picked', url='https://picked.example.com',
+                                                  file='uploads/websites/site.png')
+        SiteSnapshot.objects.create(kind=SiteSnapshot.FEATURED, date=today, submitted_website=website,
+                                    score=4)
+        Job.objects.all().delete()
+        schedule_site_snapshots(today)
+        self.assertFalse(Job.objects.exists())
+
+    def test_lost_job_changes_roll_back(self):
+        enqueue('save_contact', {'email': 'visitor@example.com', 'subject': 'Hi', 'message': 'Hi'})
+        job, = claim_jobs('test-worker', 1)
+        # Taken back and claimed again while the first worker still runs it
+        Job.objects.update(locked_by='other-worker')
+        run_job(job)
+        self.assertFalse(Contact.objects.exists())
+
+
+@override_settings(FINEST_JOBS_EAGER=True, MEDIA_ROOT=TEST_MEDIA_ROOT)
+class ConcurrentQueryTests(TransactionTestCase):
+    """The async builders run their queries on other connections: commit the data"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='async-user')
+        other = User.objects.create_user(username='async-reviewer')
+        for i in range(3):
+            website = SubmittedWebsite.objects.create(
+                user=self.user, title=f'Site {i}', url=f'https://site{i}.example.com',
+                file=screenshot(),
+            )
+            Review.objects.create(submitted_website=website, user=other, design=i + 5,
+                                  usability=i + 3, content=i + 4, overall=i + 1)
+
+    def test_dashboard_summary_matches_sync(self):
+        summary = async_to_sync(abuild_dashboard_summary)(self.user)
+        self.assertEqual(summary['reviewed_projects_count'], 3)
+        self.assertEqual(summary, build_dashboard_summary(self.user))
+
+    def test_leaderboards_match_sync(self):
+        boards = async_to_sync(aget_leaderboards)()
+        for name, projects in boards.items():
+            with self.subTest(name):
+                self.assertEqual(len(projects), 3)
+                self.assertEqual([project.pk for project in projects],
+                                 [project.pk for project in build_leaderboard(name)])
+
+
+class CommandTests(TestCase):
+    """The seed is reproducible and the benchmark reports and compares every URL"""
+
+    SCALE = ['--users', '4', '--sites', '6', '--reviews', '12', '--follows', '6', '--seed', '7']
+
+    def seed(self, *args):
+        # A fixed clock, so review days do not move between runs
+        with mock.patch('django.utils.timezone.now', return_value=datetime(2026, 3, 1, 12, tzinfo=dt_timezone.utc)):
+            call_command('seed_finest', *self.SCALE, *args, stdout=StringIO())
+
+    def dataset(self):
+        """Row counts and derived tables, keyed by names rather than ids"""
+        models = [User, Profile, SubmittedWebsite, Review, Follow, WebsiteRatingStats, DailyActivity,
+                  TimelineEntry, SearchDocument]
+        return {
+            'counts': {model.__name__: model.objects.count() for model in models},
+            'stats': sorted(WebsiteRatingStats.objects.values_list(
+                'submitted_website__title', 'review_count', 'sum_average', 'score_average')),
+            'activity': sorted(DailyActivity.objects.values_list(
+                'user__username', 'date', 'reviews_written', 'reviews_received', 'sites_submitted')),
+            'reviews': sorted(Review.objects.values_list(
+                'submitted_website__title', 'user__username', 'overall', 'created_at')),
+        }
+
+    def benchmark(self, *args):
+        call_command('benchmark_views', '--repeat', '1', *args, stdout=StringIO(), stderr=StringIO())
+
+    def test_seed_is_reproducible(self):
+        self.seed()
+        first = self.dataset()
+        self.assertEqual(first['counts']['Review'], 12)
+        self.seed('--clear')
+        self.assertEqual(self.dataset(), first)
+
+    def test_benchmark_and_baseline(self):
+        self.seed()
+        with tempfile.TemporaryDirectory() as directory:
+            output = f'{directory}/run.json'
+            self.benchmark('--output', output)
+            with open(output, encoding='utf-8') as run:
+                results = json.load(run)
+            self.assertIn('explore', results)
+            for result in results.values():
+                self.assertEqual(set(result), {'url', 'status', 'time_ms', 'queries', 'peak_kb'})
+
+            self.benchmark('--output', f'{directory}/same.json', '--baseline', output, '--tolerance', '1000')
+
+            results['explore']['queries'] = 0
+            baseline = f'{directory}/baseline.json'
+            with open(baseline, 'w', encoding='utf-8') as stored:
+                json.dump(results, stored)
+            with self.assertRaisesRegex(CommandError, r'explore: 0 -> \d+ queries'):
+                self.benchmark('--output', f'{directory}/regressed.json', '--baseline', baseline,
+                               '--tolerance', '1000')
@@ -0,0 +1,65 @@
+""" Resized WebP / AVIF variants of uploaded screenshots """
+import os
+from io import BytesIO
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+from .jobs import enqueue_many
+from .models import SubmittedWebsite
+from .watermarks import PROFILES, PROJECTS, bump_watermarks, user_key
+
+# name -> max width in pixels
+VARIANT_SIZES = {
+    'thumb': 400,
+    'card': 800,
+}
+VARIANT_FORMATS = [('webp', 'WEBP')] + ([('avif', 'AVIF')] if features.check('avif') else [])
+VARIANT_QUALITY = 80
+
+
+def needs_variants(website):
+    """Whether the stored variants were not generated from the current file"""
+    return bool(website.file) and website.variants.get('source') != website.file.name
+
+
+def schedule_variants(*website_ids):
+    """Queue a background job generating the variants of each website"""
+    if website_ids:
+        enqueue_many('generate_variants', [{'website_id': website_id} for website_id in website_ids],
+                     keys=[f'variants:{website_id}' for website_id in website_ids])
+
+
+def generate_variants(website_id):
+    """Write every size and format of a website screenshot next to the original"""
+    website = SubmittedWebsite.objects.filter(pk=website_id).only('id', 'user_id', 'file').first()
+    if website is None or not website.file:
+        return None
+
+    storage = website.file.storage
+    source = website.file.name
+    stem, _ = os.path.splitext(source)
+    directory, filename = os.path.split(stem)
+
+    with storage.open(source, 'rb') as original:
+        image = ImageOps.exif_transpose(Image.open(original))
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+    variants = {'source': source}
+    for size, width in VARIANT_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((width, width * 4))
+        variants[size] = {}
+        for extension, image_format in VARIANT_FORMATS:
+            buffer = BytesIO()
+            resized.save(buffer, image_format, quality=VARIANT_QUALITY)
+            name = os.path.join(directory, 'variants', f'{filename}_{size}.{extension}')
+            if storage.exists(name):
+                storage.delete(name)
+            variants[size][extension] = storage.save(name, ContentFile(buffer.getvalue()))
+
+    # update() rather than save(): no signals, and no race with edits of other fields
+    if SubmittedWebsite.objects.filter(pk=website_id, file=source).update(variants=variants):
+        # The variant URLs are part of the project lists and the user page
+        bump_watermarks(PROJECTS, PROFILES, user_key(website.user_id))
+    return variants
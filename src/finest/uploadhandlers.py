@@ -0,0 +1,111 @@
+""" Upload handler rejecting oversized or non-image uploads while they stream """
+import os
+from functools import wraps
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+MAX_IMAGE_UPLOAD_SIZE = 5000 * 1024
+# Room for the other form fields and multipart boundaries of the request body
+FORM_OVERHEAD = 256 * 1024
+ALLOWED_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.webp']
+SIZE_ERROR = "File size cannot exceed 5 MB."
+TYPE_ERROR = "Only .jpg, .jpeg, .png, .webp files are allowed."
+
+
+def is_allowed_image(head):
+    """Sniff JPEG, PNG and WebP from the magic bytes of the first chunk"""
+    return (
+        head.startswith(b'\xff\xd8\xff')
+        or head.startswith(b'\x89PNG\r\n\x1a\n')
+        or (head[:4] == b'RIFF' and head[8:12] == b'WEBP')
+    )
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """
+    Enforce the image size and type limits while the request body streams in.
+
+    Must run before the handlers that buffer to memory or disk. A file that
+    is too large or not an image is dropped at the first offending chunk.
+    When the body is too large to be valid, its files are dropped unread
+    while the other fields, the CSRF token among them, are still parsed so
+    the form can show the error. Rejections are recorded in
+    ``request.upload_errors`` as {field name: message}.
+    Without ``field_names`` every file of the request must be an image and
+    the caller limits the size of the body.
+    """
+
+    def __init__(self, request=None, field_names=None, max_size=MAX_IMAGE_UPLOAD_SIZE):
+        super().__init__(request)
+        self.field_names = None if field_names is None else set(field_names)
+        self.max_size = max_size
+        self.guarding = False
+        self.body_too_large = False
+        if request is not None:
+            request.upload_errors = {}
+
+    def reject(self, message):
+        """Record the error of the current file and drop the rest of it"""
+        self.request.upload_errors[self.field_name] = message
+        self.guarding = False
+        raise SkipFile()
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if self.field_names is not None:
+            limit = self.max_size * len(self.field_names) + FORM_OVERHEAD
+            self.body_too_large = bool(content_length and content_length > limit)
+        return None
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None,
+                 content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset,
+                         content_type_extra)
+        self.guarding = self.field_names is None or field_name in self.field_names
+        if not self.guarding:
+            return
+        if self.body_too_large:
+            self.reject(SIZE_ERROR)
+        if os.path.splitext(file_name)[1].lower() not in ALLOWED_EXTENSIONS:
+            self.reject(TYPE_ERROR)
+        if content_length and content_length > self.max_size:
+            self.reject(SIZE_ERROR)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.guarding:
+            if start == 0 and not is_allowed_image(raw_data[:12]):
+                self.reject(TYPE_ERROR)
+            if start + len(raw_data) > self.max_size:
+                self.reject(SIZE_ERROR)
+        return raw_data
+
+    def file_complete(self, file_size):
+        self.guarding = False
+
+
+def limit_image_uploads(*field_names, max_size=MAX_IMAGE_UPLOAD_SIZE):
+    """
+    View decorator installing ImageUploadHandler for the given file fields.
+
+    Upload handlers can only be changed before the body is read, which the
+    CSRF middleware would do first, so the check is moved inside the view.
+    """
+    def decorator(view_func):
+        protected_view = csrf_protect(view_func)
+
+        @csrf_exempt
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            request.upload_handlers.insert(
+                0, ImageUploadHandler(request, field_names, max_size)
+            )
+            return protected_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def apply_upload_errors(form, request):
+    """Show streaming rejections as field errors; returns True if there were any"""
+    upload_errors = getattr(request, 'upload_errors', {})
+    for field_name, message in upload_errors.items():
+        form.errors[field_name] = form.error_class([message])
+    return bool(upload_errors)
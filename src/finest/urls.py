@@ -2,31 +2,45 @@
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from finest import views
+from finest import async_views, views
+
+# Under ASGI the read-heavy pages are served by their async versions
+read_views = async_views if settings.FINEST_ASYNC_VIEWS else views
 
 
 urlpatterns = [
-    path('', views.home, name='home'),
+    path('', read_views.home, name='home'),
     path('accounts/', include('allauth.urls')),
     path('members/login_user/', views.login_user, name='login'),
     path('members/logout_user/', views.logout_user, name='logout'),
     path('members/register_user', views.register_user, name='register_user'),
-    path('user/<str:username>/', views.user_project_detail, name='user_detail'),
-    path('accounts/google/login/callback/dashboard/overview/', views.dashboard, name='dashboard'),
-    path('dashboard/explore/', views.explore, name='explore'),
+    path('user/<str:username>/', read_views.user_project_detail, name='user_detail'),
+    path('accounts/google/login/callback/dashboard/overview/', read_views.dashboard, name='dashboard'),
+    path('dashboard/explore/', read_views.explore, name='explore'),
     path('dashboard/my-reviews/', views.my_reviews, name='my_reviews'),
     path('dashboard/my-posts/', views.my_post, name='my_post'),
     path("dashboard/toggle-favorite/", views.toggle_favorite, name="toggle_favorite"),
     path('dashboard/favorites/', views.favorite, name='favorite'),
+    path('dashboard/feed/', views.feed, name='feed'),
+    path('dashboard/search/', views.search_page, name='search'),
     path('dashboard/submit-website/', views.submit_website, name='submit_website'),
     path('dashboard/details/<int:pk>', views.my_post_detail, name='my_post_detail'),
     path('dashboard/all/details/<int:pk>', views.all_post_details, name='all_post_details'),
+    path('dashboard/all/details/<int:pk>/reviews/', views.website_reviews, name='website_reviews'),
     path('dashboard/<int:pk>/add-review/', views.add_review, name='add_review'),
     path('dashboard/profile/<str:username>/', views.edit_profile, name='edit_profile'),
     path("follows/<str:author>/",views.follow_toggle, name="follow_toggle"),
     path('contact_us/', views.contact_us, name='contact_us'),
     path('api/profiles/', views.ProfileListAPIView.as_view(), name='api_profiles'),
+    path('api/profiles/<int:pk>/projects/', views.ProfileProjectsAPIView.as_view(),
+         name='api_profile_projects'),
     path('api/projects/', views.SubmittedWebsiteListAPIView.as_view(), name='api_projects'),
+    path('api/feed/', views.FeedAPIView.as_view(), name='api_feed'),
+    path('api/search/', views.SearchAPIView.as_view(), name='api_search'),
+    path('api/projects/batch/', views.SubmittedWebsiteBatchAPIView.as_view(), name='api_projects_batch'),
+    path('api/favorites/toggle/', views.FavoriteBatchToggleAPIView.as_view(),
+         name='api_favorites_toggle'),
+    path('api/reviews/batch/', views.ReviewBatchAPIView.as_view(), name='api_reviews_batch'),
 ]
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,23 +1,50 @@
 """ Finest app views """
 import json
-from datetime import timedelta, datetime
-from rest_framework import generics
-from django_filters.rest_framework import DjangoFilterBackend
+from urllib.parse import urlencode
+from datetime import datetime, time, timedelta
+from asgiref.sync import iscoroutinefunction
+from rest_framework import generics, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
+from django_filters.rest_framework import BooleanFilter, DjangoFilterBackend, FilterSet
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.views import redirect_to_login
 from django.urls import reverse
-from django.http import JsonResponse, HttpResponseRedirect
-from django.core.exceptions import ObjectDoesNotExist
+from django.http import Http404, JsonResponse, HttpResponseRedirect
 from django.contrib import messages
-from django.db.models import Avg, Count, Q, Value
-from django.db.models.functions import Coalesce, TruncMonth
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, F, OuterRef, Prefetch, Q
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
-from django.utils.timezone import now
-from .models import SubmittedWebsite, Review, Profile, Follow
-from .forms import ContactForm, SubmittedWebsiteForm, ReviewForm, ProfileForm, RegisterUserForm, LoginUserForm
-from .serializers import ProfileSerializer, SubmittedWebsiteSerializer
+from django.utils.decorators import method_decorator
+from django.utils.timezone import make_aware, now
+from .models import SubmittedWebsite, Review, Profile, Follow, Favorite
+from .forms import (ContactForm, SubmittedWebsiteForm, ReviewForm, ProfileForm, RegisterUserForm,
+                    LoginUserForm, MyReviewsFilterForm, SearchForm)
+from .serializers import (ProfileSerializer, ReviewSerializer, SearchResultSerializer,
+                          SubmittedWebsiteListSerializer, SubmittedWebsiteSerializer)
 from .permissions import IsAdminOrReadOnly
+from .pagination import OptInCursorPaginationMixin, ProfileCursorPagination, SubmittedAtCursorPagination
+from .snapshots import get_featured_snapshot
+from .uploadhandlers import ImageUploadHandler, apply_upload_errors, limit_image_uploads
+from .replicas import use_primary_database
+from .batch import MAX_BATCH_SIZE, batch_upload_max_size, create_reviews, create_submissions
+from .leaderboards import get_leaderboards
+from .summaries import get_dashboard_summary
+from .favorites import toggle_favorites
+from .feeds import FEED_PAGE_SIZE, get_feed
+from .reviews import get_reviews, get_user_reviews
+from .search import search
+from .watermarks import PROFILES, PROJECTS, conditional_on, user_page_key
+from .instrumentation import query_budget
+from .jobs import enqueue
+from .activity import activity_series, chart_series, current_year_range, date_range_from_request
+
+
+PROFILE_PROJECTS_LIMIT = 5
 
 
 # Create your views here.
@@ -69,299 +96,384 @@ def register_user(request):
 
     return render(request, 'auth/register.html', {'form': form})
 
-class ProfileListAPIView(generics.ListAPIView):
-    """API endpoint for retrieving all user profiles."""
-    queryset = Profile.objects.all()
+@method_decorator(conditional_on(lambda request, *args, **kwargs: PROFILES), name='get')
+class ProfileListAPIView(OptInCursorPaginationMixin, generics.ListAPIView):
+    """
+    API endpoint for retrieving all user profiles.
+
+    Each profile embeds at most PROFILE_PROJECTS_LIMIT of its latest projects,
+    loaded for the whole page in one extra query.
+    """
+    queryset = (
+        Profile.objects.select_related('user')
+        .annotate(projects_count=Count('user__submittedwebsite'))
+        .prefetch_related(Prefetch(
+            'user__submittedwebsite_set',
+            queryset=SubmittedWebsite.objects.order_by('-submitted_at')[:PROFILE_PROJECTS_LIMIT],
+            to_attr='recent_projects',
+        ))
+        .order_by('id')
+    )
     serializer_class = ProfileSerializer
+    cursor_pagination_class = ProfileCursorPagination
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['user']
 
     permission_classes = (IsAdminOrReadOnly,)
 
-class SubmittedWebsiteListAPIView(generics.ListAPIView):
+@method_decorator(conditional_on(lambda request, *args, **kwargs: PROJECTS), name='get')
+class ProfileProjectsAPIView(generics.ListAPIView):
     """
-    API endpoint for retrieving all projects.
+    API endpoint for paging through all projects of a single profile.
     """
-    queryset = SubmittedWebsite.objects.all()
     serializer_class = SubmittedWebsiteSerializer
+    permission_classes = (IsAdminOrReadOnly,)
+
+    def get_queryset(self):
+        profile = get_object_or_404(Profile, pk=self.kwargs['pk'])
+        return (SubmittedWebsite.objects
+                .filter(user_id=profile.user_id)
+                .order_by('-submitted_at', '-id'))
+
+class SubmittedWebsiteFilter(FilterSet):
+    """
+    Filters of the projects list. is_favorite is deprecated, it keeps the
+    projects their owner marked as a favorite.
+    """
+    is_favorite = BooleanFilter()
+
+    class Meta:
+        """
+        Class Meta
+        """
+        model = SubmittedWebsite
+        fields = ['user']
+
+@method_decorator(conditional_on(lambda request, *args, **kwargs: PROJECTS), name='get')
+class SubmittedWebsiteListAPIView(OptInCursorPaginationMixin, generics.ListAPIView):
+    """
+    API endpoint for retrieving all projects.
+    """
+    queryset = SubmittedWebsite.objects.annotate(
+        is_favorite=Exists(Favorite.objects.filter(submitted_website=OuterRef('pk'),
+                                                   user=OuterRef('user'))),
+    ).order_by('-submitted_at', '-id')
+    serializer_class = SubmittedWebsiteListSerializer
+    cursor_pagination_class = SubmittedAtCursorPagination
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['user', 'is_favorite']
+    filterset_class = SubmittedWebsiteFilter
+
+    permission_classes = (IsAdminOrReadOnly,)
+
+class FeedAPIView(APIView):
+    """
+    API endpoint for the feed of the authenticated user, newest first.
+
+    Pages are keyset paginated: follow "next" for the following page.
+    """
+    permission_classes = (IsAuthenticated,)
+    max_page_size = 100
+
+    def get(self, request):
+        """One page of the feed"""
+        try:
+            page_size = min(int(request.query_params.get('page_size', FEED_PAGE_SIZE)),
+                            self.max_page_size)
+            projects, next_cursor = get_feed(
+                request.user, request.query_params.get('cursor'), max(page_size, 1)
+            )
+        except ValueError:
+            return Response({'detail': 'Invalid cursor or page size.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        next_url = None
+        if next_cursor:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor)
+        serializer = SubmittedWebsiteSerializer(projects, many=True, context={'request': request})
+        return Response({'next': next_url, 'results': serializer.data})
+
+def search_results(form):
+    """(results, has_next) of a valid SearchForm"""
+    data = form.cleaned_data
+    return search(data['q'], kind=data['kind'], username=data['user'],
+                  min_rating=data['min_rating'], page=data['page'])
+
+class SearchAPIView(APIView):
+    """
+    API endpoint for full-text search over projects and profiles, best match first.
 
+    Query parameters: q, kind (project or profile), user (a username),
+    min_rating and page. Follow "next" for the following page.
+    """
     permission_classes = (IsAdminOrReadOnly,)
 
+    def get(self, request):
+        """One page of search results"""
+        form = SearchForm(request.query_params)
+        if not form.is_valid():
+            return Response(form.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        results, has_next = search_results(form)
+        next_url = None
+        if has_next:
+            next_url = replace_query_param(request.build_absolute_uri(), 'page',
+                                           form.cleaned_data['page'] + 1)
+        serializer = SearchResultSerializer(results, many=True)
+        return Response({'next': next_url, 'results': serializer.data})
+
+class BatchCreateAPIView(APIView):
+    """
+    Base for the token-authenticated batch endpoints.
+
+    Subclasses set ``items_key`` and define ``perform_batch(request, items)``,
+    which creates the items and returns one result per item. Valid items are
+    inserted, invalid ones are reported per index.
+    """
+    permission_classes = (IsAuthenticated,)
+    items_key = None
+
+    def get_items(self, request):
+        """Items of the batch, from a JSON body or a JSON encoded form field"""
+        items = request.data.get(self.items_key)
+        if isinstance(items, str):
+            try:
+                items = json.loads(items)
+            except ValueError:
+                items = None
+        return items
+
+    def post(self, request):
+        """Create a batch of items"""
+        items = self.get_items(request)
+        if not isinstance(items, list) or not items:
+            return Response({'detail': f"'{self.items_key}' must be a non-empty list."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > MAX_BATCH_SIZE:
+            return Response({'detail': f'At most {MAX_BATCH_SIZE} items per batch.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = self.perform_batch(request, items)
+        created = sum(1 for result in results if 'id' in result)
+        return Response(
+            {'created': created, 'failed': len(results) - created, 'results': results},
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+        )
+
+class FavoriteBatchToggleAPIView(APIView):
+    """
+    API endpoint for toggling many favorites of the authenticated user at once.
+
+    Body: {"website_ids": [1, 2, 3]}. Returns {"results": {"1": true, ...}}
+    with the new state of each existing project.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        """Toggle a batch of favorites"""
+        website_ids = request.data.get('website_ids')
+        if (not isinstance(website_ids, list) or not website_ids
+                or not all(isinstance(website_id, int) for website_id in website_ids)):
+            return Response({'detail': "'website_ids' must be a non-empty list of ids."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(website_ids) > MAX_BATCH_SIZE:
+            return Response({'detail': f'At most {MAX_BATCH_SIZE} items per batch.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'results': toggle_favorites(request.user.pk, website_ids)})
+
+class ReviewBatchAPIView(BatchCreateAPIView):
+    """
+    API endpoint for creating many reviews at once.
+
+    Body: {"reviews": [{"website": 1, "design": 8, "usability": 7,
+    "content": 9, "overall": 4, "description": "..."}, ...]}
+    """
+    items_key = 'reviews'
+
+    def perform_batch(self, request, items):
+        """Create the reviews of the batch"""
+        return create_reviews(request.user, items)
+
+class SubmittedWebsiteBatchAPIView(BatchCreateAPIView):
+    """
+    API endpoint for submitting many projects at once.
+
+    Multipart body: "projects" holds a JSON list of {"title", "url",
+    "description"} objects and "file_<index>" the screenshot of each one.
+    Bodies above FINEST_BATCH_UPLOAD_MAX_SIZE are refused before they are
+    read, and each screenshot is checked while it streams.
+    """
+    items_key = 'projects'
+
+    def post(self, request):
+        """Create a batch of projects"""
+        max_size = batch_upload_max_size()
+        if int(request.META.get('CONTENT_LENGTH') or 0) > max_size:
+            return Response(
+                {'detail': f'The request body cannot exceed {max_size // (1024 * 1024)} MB.'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        request.upload_handlers.insert(0, ImageUploadHandler(request))
+        return super().post(request)
+
+    def perform_batch(self, request, items):
+        """Create the projects of the batch"""
+        return create_submissions(request.user, items, request.FILES, request.upload_errors)
+
+def _login_redirect(request):
+    messages.warning(request,
+                     "You need to be logged in to access this page. Please login!")
+    login_url = reverse('login')
+    return redirect_to_login(request.get_full_path(), login_url)
+
 def custom_login_required(view_func):
     """ Custom login required decorator to add a message on redirect """
+    if iscoroutinefunction(view_func):
+        async def async_wrapper(request, *args, **kwargs):
+            user = await request.auser()
+            if not user.is_authenticated:
+                return _login_redirect(request)
+            # Share the loaded user with templates instead of fetching it again
+            request.user = user
+            return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
     def wrapper(request, *args, **kwargs):
         if not request.user.is_authenticated:
-            messages.warning(request,
-                             "You need to be logged in to access this page. Please login!")
-            login_url = reverse('login')
-            return redirect_to_login(request.get_full_path(), login_url)
+            return _login_redirect(request)
         return view_func(request, *args, **kwargs)
     return wrapper
 
 def performance_chart(request):
     """Function to display user review project"""
-    current_year = datetime.now().year
-
-    review_data = (
-        Review.objects.filter(user=request.user, created_at__year=current_year)
-        .annotate(month=TruncMonth('created_at'))
-        .values('month')
-        .annotate(total_reviews=Count('id'))
-        .order_by('month')
-    )
-
-    months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    data = {month: 0 for month in months}
-
-    for item in review_data:
-        month_index = item['month'].month - 1
-        data[months[month_index]] = item['total_reviews']
-
-    filtered_labels = [month for month, count in data.items() if count > 0]
-    filtered_data = [count for month, count in data.items() if count > 0]
+    start, end, bucket = date_range_from_request(request, *current_year_range())
+    labels, data = chart_series(request.user, 'reviews_written', start, end, bucket)
 
     return render(request, 'chart.html', {
-        'labels': filtered_labels,
-        'data': filtered_data,
+        'labels': labels,
+        'data': data,
     })
 
-def home(request):
-    """Homepage function"""
-    project_avg_reviews = (
-        Review.objects.values('submitted_website', 'submitted_website__title')
-        .annotate(average_per_user=Avg('average'))
-        .order_by('-average_per_user')
-    )
-
-    highest_avg_review = project_avg_reviews.first()
+def featured_context(featured):
+    """Context of the featured site block of the homepage"""
+    if not featured:
+        return {
+            'title': 'Project Reviews Application',
+            'message': "No reviews available yet"
+        }
 
-    if highest_avg_review:
-        website_id = highest_avg_review['submitted_website']
-        website = SubmittedWebsite.objects.get(id=website_id)
-        formatted_date = now().strftime('%b %d, %Y')
+    website = featured.submitted_website
+    formatted_date = featured.date.strftime('%b %d, %Y')
 
-        alt_name = website.title if website.title else "Website Image"
-        user = website.user
+    alt_name = website.title if website.title else "Website Image"
+    user = website.user
 
-        profile = getattr(user, 'profile', None)
-        profile_picture = (
-            profile.profile_picture.url if profile and profile.profile_picture else None
-        )
+    profile = getattr(user, 'profile', None)
+    profile_picture = (
+        profile.profile_picture.url if profile and profile.profile_picture else None
+    )
 
-        context = {
-            'title': 'FINEST',
-            'website_title': website.title,
-            'website_image': website.file.url if website.file else None,
-            'website_description': website.description,
-            'review_score': highest_avg_review['average_per_user'],
-            'formatted_date': formatted_date,
-            'alt_name': alt_name,
-            'user_username': user.username,
-            'user_avatar_url': profile_picture or f'https://robohash.org/{user.username}.png?size=96x96',
-        }
-    else:
-        context = {
-            'title': 'Project Reviews Application',
-            'message': "No reviews available yet"
-        }
+    return {
+        'title': 'FINEST',
+        'website_title': website.title,
+        'website_image': website.file.url if website.file else None,
+        'website_description': website.description,
+        'review_score': featured.score,
+        'formatted_date': formatted_date,
+        'alt_name': alt_name,
+        'user_username': user.username,
+        'user_avatar_url': profile_picture or f'https://robohash.org/{user.username}.png?size=96x96',
+    }
 
+def recent_sites_of_the_day():
+    """Previous sites of the day shown on the homepage"""
     today = now().date()
-
-    recent_sites = (
+    return list(
         SubmittedWebsite.objects.filter(date_site_of_the_day__lt=today)
+        .select_related('user__profile')
         .order_by('-date_site_of_the_day')[:6]
     )
 
-    for i in range(1, 7):
-        day = today - timedelta(days=i)
-        if not SubmittedWebsite.objects.filter(date_site_of_the_day=day).exists():
-            highest_rating_for_day = (
-                Review.objects.filter(created_at__date=day)
-                .values('submitted_website')
-                .annotate(average_per_user=Avg('average'))
-                .order_by('-average_per_user')
-                .first()
-            )
-            if highest_rating_for_day:
-                site = SubmittedWebsite.objects.get(id=highest_rating_for_day['submitted_website'])
-                site.date_site_of_the_day = day
-                site.save()
-
-    context['recent_sites'] = recent_sites
+def home(request):
+    """Homepage function"""
+    context = featured_context(get_featured_snapshot())
+    context['recent_sites'] = recent_sites_of_the_day()
 
     return render(request, 'home.html', context)
 
+def user_page_queries(user, request):
+    """The independent queries of the public user page, by context name"""
+    start, end, bucket = date_range_from_request(request)
+    projects = SubmittedWebsite.objects.filter(user=user)
+    return {
+        'user_stats': lambda: projects.aggregate(
+            total_works=Coalesce(Count('id'), 0),
+            site_of_the_day_count=Coalesce(Count('id', filter=Q(date_site_of_the_day__isnull=False)), 0)
+        ),
+        'site_of_the_day_by_month': lambda: [
+            {'month': month, 'month_count': count}
+            for month, count in activity_series(user, 'site_of_the_day_wins', start, end, bucket)
+        ],
+        'user_projects': lambda: list(
+            projects.select_related('user__profile').order_by('-submitted_at')
+        ),
+    }
+
+@conditional_on(user_page_key, per_user=True)
 def user_project_detail(request, username):
     """Getting user details"""
-    user = get_object_or_404(User, username=username)
-
-    user_stats = SubmittedWebsite.objects.filter(user=user).aggregate(
-        total_works=Coalesce(Count('id'), 0),
-        site_of_the_day_count=Coalesce(Count('id', filter=Q(date_site_of_the_day__isnull=False)), 0)
-    )
-
-    site_of_the_day_by_month = SubmittedWebsite.objects.filter(
-        user=user, 
-        date_site_of_the_day__isnull=False) \
-        .annotate(month=TruncMonth('date_site_of_the_day')) \
-        .values('month') \
-        .annotate(month_count=Coalesce(Count('id'), Value(0))) \
-        .order_by('month')
-
-    user_projects = SubmittedWebsite.objects.filter(user=user).order_by('-submitted_at')
+    user = get_object_or_404(User.objects.select_related('profile'), username=username)
 
     context = {
         "title": username.upper(),
         "user_profile": user,
-        "user_stats": user_stats,
-        "user_projects": user_projects,
-        "site_of_the_day_by_month": site_of_the_day_by_month
+        **{name: query() for name, query in user_page_queries(user, request).items()},
     }
 
     return render(request, 'personal_info.html', context)
 
 
+def time_of_day_greeting():
+    """Greeting of the dashboard for the current hour"""
+    current_hour = datetime.now().hour
+    if current_hour < 12:
+        return "Good Morning"
+    if current_hour < 18:
+        return "Good Afternoon"
+    return "Good Evening"
+
+@query_budget(8)
 @custom_login_required
 def dashboard(request):
     """ User dashboard """
     title = 'USER DASHBOARD'
-    total_projects = SubmittedWebsite.objects.filter(user=request.user).count()
-    reviewed_projects_count = (SubmittedWebsite.objects
-                               .filter(user=request.user, reviews__isnull=False)
-                               .distinct().count())
-    non_reviewed_projects_count = total_projects - reviewed_projects_count
-    average_review_score = (
-        Review.objects.filter(submitted_website__user=request.user)
-        .aggregate(avg_score=Avg('overall'))['avg_score'] or 0
-    )
-    recent_projects = (SubmittedWebsite.objects
-                       .filter(user=request.user)
-                       .order_by('-submitted_at')[:4])
-
-    top_review = Review.objects.filter(
-        user=request.user,
-        submitted_website__user=request.user
-    ).order_by('-average').first()
-
-    if top_review:
-        top_feedback = top_review.description or "No feedback available yet."
-        top_feedback_id = top_review.submitted_website.pk
-    else:
-        top_feedback = "No feedback available yet."
-        top_feedback_id = None
-
-    lowest_review = (Review.objects.filter(
-        user=request.user,
-        submitted_website__user=request.user
-    ).order_by('average').first())
-
-    if lowest_review:
-        improvement_tip = lowest_review.description or "No improvement tips available yet."
-        improvement_project_id = lowest_review.submitted_website.pk
-    else:
-        improvement_tip = "No improvement tips available yet."
-        improvement_project_id = None
-
-    current_hour = datetime.now().hour
-    if current_hour < 12:
-        greeting = "Good Morning"
-    elif current_hour < 18:
-        greeting = "Good Afternoon"
-    else:
-        greeting = "Good Evening"
-
-    current_year = datetime.now().year
-
-    review_data = (
-        SubmittedWebsite.objects.filter(user=request.user, submitted_at__year=current_year)
-        .annotate(month=TruncMonth('submitted_at'))
-        .values('month')
-        .annotate(total_reviews=Count('id'))
-        .order_by('month')
-    )
-
-    months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    data = {month: 0 for month in months}
-
-    for item in review_data:
-        month_index = item['month'].month - 1
-        data[months[month_index]] = item['total_reviews']
-
-    filtered_labels = [month for month, count in data.items() if count > 0]
-    filtered_data = [count for month, count in data.items() if count > 0]
-
-    recent_submissions = (SubmittedWebsite
-                          .objects
-                          .filter(user=request.user)
-                          .order_by('-submitted_at')[:2])
 
     context = {
         'title': title,
-        'total_projects': total_projects,
-        'reviewed_projects_count': reviewed_projects_count,
-        'non_reviewed_projects_count': non_reviewed_projects_count,
-        'average_review_score': round(average_review_score, 1),
-        'recent_projects': recent_projects,
-        'top_feedback': top_feedback,
-        'top_feedback_id': top_feedback_id,
-        'improvement_tip': improvement_tip,
-        'improvement_project_id': improvement_project_id,
-        'greeting': greeting,
-        'labels': json.dumps(filtered_labels),
-        'data': json.dumps(filtered_data),
-        'recent_submissions': recent_submissions,
+        'greeting': time_of_day_greeting(),
+        **get_dashboard_summary(request.user),
     }
 
     return render(request, 'user/dashboard.html', context)
 
+def explore_context(leaderboards):
+    """Template names of the Explore leaderboards"""
+    return {
+        "all_projects": leaderboards['recent'],
+        'top_rated_projects': leaderboards['top_rated'],
+        'highest_design': leaderboards['design'],
+        'highest_content': leaderboards['content'],
+        'highest_usability': leaderboards['usability'],
+    }
+
 @custom_login_required
 def explore(request):
     """Explore Page - Top Rated Projects"""
     title = 'EXPLORE'
 
-    all_projects = SubmittedWebsite.objects.order_by('-submitted_at')[:5]
-
-    top_rated_projects = (
-        SubmittedWebsite.objects.annotate(
-            avg_user_score=Avg('reviews__average', distinct=True)
-        )
-        .filter(reviews__isnull=False)
-        .order_by('-avg_user_score')[:5]
-    )
-
-    highest_design = (
-        SubmittedWebsite.objects.annotate(
-            avg_design_score=Avg('reviews__design', distinct=True)
-        )
-        .filter(reviews__isnull=False)
-        .order_by('-avg_design_score')[:5]
-    )
-
-    highest_content = (
-        SubmittedWebsite.objects.annotate(
-            avg_content_score=Avg('reviews__content', distinct=True)
-        )
-        .filter(reviews__isnull=False)
-        .order_by('-avg_content_score')[:5]
-    )
-
-    highest_usability = (
-        SubmittedWebsite.objects.annotate(
-            avg_usability_score=Avg('reviews__usability', distinct=True)
-        )
-        .filter(reviews__isnull=False)
-        .order_by('-avg_usability_score')[:5]
-    )
-
     context = {
         'title': title,
-        "all_projects": all_projects,
-        'top_rated_projects': top_rated_projects,
-        'highest_design': highest_design,
-        'highest_content': highest_content,
-        'highest_usability': highest_usability,
+        **explore_context(get_leaderboards()),
     }
 
     return render(request, 'user/explore.html', context)
@@ -373,109 +485,134 @@ def my_post(request):
     user_posts = (SubmittedWebsite.objects
                   .filter(user=request.user)
                   .order_by('-submitted_at')
-                  .annotate(highest_rating=Avg('reviews__overall')
-    ))
+                  .annotate(highest_rating=F('rating_stats__avg_overall')))
     context = {
       'title': title,
       'user_posts': user_posts,
     }
     return render(request, 'user/my-posts.html', context)
 
+def start_of_day(day, days=0):
+    """Aware midnight starting ``day`` (plus ``days``) in the current time zone, None if no day"""
+    if day is None:
+        return None
+    return make_aware(datetime.combine(day + timedelta(days=days), time.min))
+
 @custom_login_required
 def my_reviews(request):
     '''My Reviews Function'''
     title = 'My Reviews'
-    reviews = Review.objects.filter(user=request.user).order_by('-created_at')
+    form = MyReviewsFilterForm(request.GET)
+    reviews, next_cursor = [], None
+    if form.is_valid():
+        data = form.cleaned_data
+        try:
+            reviews, next_cursor = get_user_reviews(
+                request.user.pk, rating=data['rating'], sort=data['sort'], cursor=data['cursor'],
+                created_from=start_of_day(data['date_from']),
+                created_to=start_of_day(data['date_to'], days=1),
+            )
+        except ValueError:
+            messages.error(request, 'That page of reviews no longer exists.')
+
+    filters = {name: value for name, value in request.GET.items() if name != 'cursor' and value}
     context = {
         'title': title,
+        'form': form,
         'reviews': reviews,
+        'filter_query': urlencode(filters),
+        'next_cursor': next_cursor,
     }
     return render(request, 'user/my-reviews.html', context)
 
-@custom_login_required
-def my_post_detail(request, pk):
-    """ Posted website details """
-    title = 'WEBSITE DETAILS'
-    website = get_object_or_404(SubmittedWebsite, pk=pk, user=request.user)
-    is_submitted_by_user = website.user == request.user
-    has_user_reviewed = Review.objects.filter(
-        submitted_website=website, user=request.user
-    ).exists()
-
-    reviews = website.reviews.all()
-
-    total_reviews = reviews.count() if reviews.exists() else 0
+def website_detail(request, websites, pk):
+    """
+    Detail page of one of ``websites``: the project, its rating stats and
+    the user's review and favorite state in one query, then the first page
+    of reviews with their authors. Later pages come from website_reviews.
+    """
+    website = get_object_or_404(
+        websites.select_related('rating_stats').annotate(
+            has_user_reviewed=Exists(Review.objects.filter(
+                submitted_website=OuterRef('pk'), user=request.user
+            )),
+            is_favorite=Exists(Favorite.objects.filter(
+                submitted_website=OuterRef('pk'), user=request.user
+            )),
+        ),
+        pk=pk,
+    )
+    reviews, next_cursor = get_reviews(website.pk)
 
-    if reviews.exists():
-        overall_rating = reviews.aggregate(max_rating=Avg('overall'))['max_rating']
-    else:
-        overall_rating = 0
+    rating_stats = getattr(website, 'rating_stats', None)
+    total_reviews = rating_stats.review_count if rating_stats else 0
+    overall_rating = rating_stats.avg_overall if total_reviews else 0
 
     context = {
-      'title': title,
+      'title': 'WEBSITE DETAILS',
       'website': website,
       'reviews': reviews,
+      'next_reviews_url': reviews_page_url(website.pk, next_cursor),
       'total_reviews': total_reviews,
       'overall_rating': overall_rating,
-      'is_submitted_by_user': is_submitted_by_user,
-      'has_user_reviewed': has_user_reviewed,
+      'is_submitted_by_user': website.user_id == request.user.pk,
+      'has_user_reviewed': website.has_user_reviewed,
+      'is_favorite': website.is_favorite,
     }
     return render(request, 'user/website-detail.html', context)
 
+def reviews_page_url(website_id, cursor):
+    """URL of the reviews after ``cursor``, None past the last page"""
+    if cursor is None:
+        return None
+    return f"{reverse('website_reviews', args=[website_id])}?{urlencode({'cursor': cursor})}"
+
+@custom_login_required
+def my_post_detail(request, pk):
+    """ Posted website details """
+    return website_detail(request, SubmittedWebsite.objects.filter(user=request.user), pk)
+
 @custom_login_required
 def all_post_details(request, pk):
     """ All posted website details for all users """
-    title = 'WEBSITE DETAILS'
+    return website_detail(request, SubmittedWebsite.objects.all(), pk)
 
-    website = get_object_or_404(SubmittedWebsite, pk=pk)
-
-    is_submitted_by_user = website.user == request.user
-    has_user_reviewed = Review.objects.filter(
-        submitted_website=website, user=request.user
-    ).exists()
-
-    reviews = website.reviews.all()
-
-    total_reviews = reviews.count() if reviews.exists() else 0
-
-    if reviews.exists():
-        overall_rating = reviews.aggregate(max_rating=Avg('overall'))['max_rating']
-    else:
-        overall_rating = 0
-
-    context = {
-      'title': title,
-      'website': website,
-      'reviews': reviews,
-      'total_reviews': total_reviews,
-      'overall_rating': overall_rating,
-      'is_submitted_by_user': is_submitted_by_user,
-      'has_user_reviewed': has_user_reviewed,
-    }
-    return render(request, 'user/website-detail.html', context)
+@custom_login_required
+def website_reviews(request, pk):
+    """ Next page of the reviews of a project, as JSON for "Load more" """
+    try:
+        reviews, next_cursor = get_reviews(pk, request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({"success": False, "error": "Invalid cursor"}, status=400)
+    # An empty page is the only one which does not show that the project exists
+    if not reviews and not SubmittedWebsite.objects.filter(pk=pk).exists():
+        raise Http404("No project matches the given query.")
+
+    return JsonResponse({
+        "success": True,
+        "reviews": ReviewSerializer(reviews, many=True).data,
+        "next": reviews_page_url(pk, next_cursor),
+    })
 
 
 @custom_login_required
 def toggle_favorite(request):
     """ Toggling favorite for any website """
     if request.method == 'POST':
-        data = json.loads(request.body)
-        website_id = data.get('website_id')
-
-        if not website_id:
-            return JsonResponse({"success": False, "error": "Missing website ID"}, status=400)
-
         try:
-            website = SubmittedWebsite.objects.get(id=website_id)
-
-            is_favorite = not website.is_favorite
-            website.is_favorite = is_favorite
-            website.save()
+            website_id = int(json.loads(request.body).get('website_id'))
+        except (TypeError, ValueError, AttributeError):
+            return JsonResponse({"success": False, "error": "Missing website ID"}, status=400)
 
-            return JsonResponse({"success": True, "is_favorite": is_favorite})
-        except ObjectDoesNotExist:
+        toggled = toggle_favorites(request.user.pk, [website_id])
+        if website_id not in toggled:
             return JsonResponse({"success": False, "error": "Website not found"}, status=404)
 
+        favorite_count = (SubmittedWebsite.objects.filter(pk=website_id)
+                          .values_list('favorite_count', flat=True).first())
+        return JsonResponse({"success": True, "is_favorite": toggled[website_id],
+                             "favorite_count": favorite_count})
+
     return JsonResponse({"success": False, "error": "Invalid request method"}, status=405)
 
 @custom_login_required
@@ -483,8 +620,11 @@ def favorite(request):
     """ Favorites function """
     title = 'FAVORITES'
 
-    favorites = SubmittedWebsite.objects.filter(user=request.user, is_favorite=True).annotate(
-        highest_rating = Avg('reviews__overall')
+    favorites = (
+        SubmittedWebsite.objects.filter(favorites__user=request.user)
+        .annotate(highest_rating=F('rating_stats__avg_overall'),
+                  favorited_at=F('favorites__created_at'))
+        .order_by('-favorited_at')
     )
 
     context = {
@@ -493,43 +633,86 @@ def favorite(request):
     }
     return render(request, 'user/favorites.html', context)
 
+@custom_login_required
+def feed(request):
+    """ Projects of the members the user follows """
+    title = 'FEED'
+
+    try:
+        projects, next_cursor = get_feed(request.user, request.GET.get('cursor'))
+    except ValueError:
+        messages.error(request, "That page of your feed no longer exists.")
+        return redirect('feed')
+
+    context = {
+        'title': title,
+        'projects': projects,
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'user/feed.html', context)
+
+@custom_login_required
+def search_page(request):
+    """ Search projects and profiles """
+    title = 'SEARCH'
+    form = SearchForm(request.GET)
+    results, has_next = [], False
+    if form.is_valid():
+        results, has_next = search_results(form)
+
+    context = {
+        'title': title,
+        'form': form,
+        'results': results,
+        'page': form.cleaned_data.get('page', 1),
+        'has_next': has_next,
+    }
+    return render(request, 'user/search.html', context)
+
 @custom_login_required
 def add_review(request, pk):
-    """Allow users to add a review to a project they did not submit."""
-    submitted_website = get_object_or_404(SubmittedWebsite, id=pk)
+    """
+    Allow users to add a review to a project they did not submit.
+
+    The review and its derived rating data are written in one transaction;
+    the unique (submitted_website, user) constraint rejects double submits.
+    """
+    if request.method != 'POST':
+        messages.error(request, 'Only POST requests are allowed for adding reviews.')
+        return redirect('all_post_details', pk=pk)
+
+    submitted_website = get_object_or_404(SubmittedWebsite.objects.only('id', 'user_id'), id=pk)
 
-    if submitted_website.user == request.user:
+    if submitted_website.user_id == request.user.pk:
         messages.error(request, 'You cannot review your own project.')
         return redirect('all_post_details', pk=pk)
 
-    if Review.objects.filter(submitted_website=submitted_website, user=request.user).exists():
-        messages.error(request, 'You have already reviewed this project.')
+    form = ReviewForm(request.POST)
+    if not form.is_valid():
+        messages.error(request, 'Invalid data. Please correct the errors and try again.')
         return redirect('all_post_details', pk=pk)
 
-    if request.method == 'POST':
-        form = ReviewForm(request.POST)
-        if form.is_valid():
-            review = form.save(commit=False)
-            review.submitted_website = submitted_website
-            review.user = request.user
+    review = form.save(commit=False)
+    review.submitted_website = submitted_website
+    review.user = request.user
+    try:
+        with transaction.atomic():
             review.save()
+    except IntegrityError:
+        messages.error(request, 'You have already reviewed this project.')
+        return redirect('all_post_details', pk=pk)
 
-            messages.success(request, 'Your review has been added successfully.')
-            return redirect('all_post_details', pk=pk)
-        else:
-            messages.error(request, 'Invalid data. Please correct the errors and try again.')
-            return redirect('all_post_details', pk=pk)
-
-    messages.error(request, 'Only POST requests are allowed for adding reviews.')
+    messages.success(request, 'Your review has been added successfully.')
     return redirect('all_post_details', pk=pk)
 
 
+@limit_image_uploads('file')
 @custom_login_required
 def submit_website(request):
     """ Submitting website """
     if request.method == 'POST':
         form = SubmittedWebsiteForm(request.POST, request.FILES)
-        if form.is_valid():
+        if not apply_upload_errors(form, request) and form.is_valid():
             submitted_website = form.save(commit=False)
             submitted_website.user = request.user
             submitted_website.save()
@@ -547,6 +730,8 @@ def submit_website(request):
     }
     return render(request, 'user/submit-website.html', context)
 
+@use_primary_database
+@limit_image_uploads('profile_picture')
 @custom_login_required
 def edit_profile(request, username):
     """View to edit user profile"""
@@ -559,7 +744,7 @@ def edit_profile(request, username):
 
     if request.method == "POST":
         form = ProfileForm(request.POST, request.FILES, instance=profile)
-        if form.is_valid():
+        if not apply_upload_errors(form, request) and form.is_valid():
             form.save()
             messages.success(request, "Profile updated successfully.")
             return redirect('edit_profile', username=user.username)
@@ -581,8 +766,7 @@ def contact_us(request):
     if request.method == 'POST':
         form = ContactForm(request.POST)
         if form.is_valid():
-            contact_info = form.save(commit=False)
-            contact_info.save()
+            enqueue('save_contact', {field: form.cleaned_data[field] for field in ContactForm.Meta.fields})
             messages.success(request,
                             'We have received your message 🤝. We will contact you soon. 🤖')
         else:
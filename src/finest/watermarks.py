@@ -0,0 +1,103 @@
+""" Change watermarks and conditional GET helpers """
+import hashlib
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.views.decorators.http import condition
+from .models import ResourceWatermark
+
+PROJECTS = 'projects'
+PROFILES = 'profiles'
+
+
+def user_key(user_id):
+    """Watermark key of a user's public page"""
+    return f'user:{user_id}'
+
+
+def _bump(keys):
+    changed_at = timezone.now()
+    for key in sorted(set(keys)):
+        updated = ResourceWatermark.objects.filter(key=key).update(
+            version=F('version') + 1, changed_at=changed_at
+        )
+        if not updated:
+            ResourceWatermark.objects.get_or_create(
+                key=key, defaults={'version': 1, 'changed_at': changed_at}
+            )
+
+
+def bump_watermarks(*keys):
+    """Mark resources as changed once the current transaction commits"""
+    keys = [key for key in keys if key]
+    if keys:
+        transaction.on_commit(lambda: _bump(keys))
+
+
+def _watermark(request, key):
+    cache = request.__dict__.setdefault('_watermarks', {})
+    if key not in cache:
+        cache[key] = ResourceWatermark.objects.filter(key=key).first()
+    return cache[key]
+
+
+def conditional_on(key_func, per_user=False):
+    """
+    Answer GET/HEAD with 304 Not Modified when the watermark of the resource
+    named by ``key_func(request, *args, **kwargs)`` has not moved.
+
+    ``per_user`` adds the requesting user to the validator for pages whose
+    markup depends on who is looking at them.
+    """
+    def etag_func(request, *args, **kwargs):
+        key = key_func(request, *args, **kwargs)
+        if key is None:
+            return None
+        if per_user and len(get_messages(request)):
+            # Pending flash messages must be rendered, never served from cache
+            return None
+        watermark = _watermark(request, key)
+        parts = [
+            key,
+            str(watermark.version if watermark else 0),
+            request.META.get('HTTP_ACCEPT', ''),
+        ]
+        if per_user:
+            parts.append(str(request.user.pk))
+        return hashlib.md5('|'.join(parts).encode(), usedforsecurity=False).hexdigest()
+
+    def last_modified_func(request, *args, **kwargs):
+        if per_user:
+            # The validator already varies per user, a shared date would not
+            return None
+        key = key_func(request, *args, **kwargs)
+        watermark = _watermark(request, key) if key else None
+        return watermark.changed_at if watermark else None
+
+    def decorator(view_func):
+        if not iscoroutinefunction(view_func):
+            return condition(etag_func=etag_func, last_modified_func=last_modified_func)(view_func)
+
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            # condition() calls its functions synchronously, the ORM must not
+            # run on the event loop: compute both validators up front
+            etag = await sync_to_async(etag_func)(request, *args, **kwargs)
+            last_modified = await sync_to_async(last_modified_func)(request, *args, **kwargs)
+            conditional_view = condition(
+                etag_func=lambda *args, **kwargs: etag,
+                last_modified_func=lambda *args, **kwargs: last_modified,
+            )(view_func)
+            return await conditional_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def user_page_key(request, username):
+    """Watermark key of user/<username>/"""
+    user_id = User.objects.filter(username=username).values_list('id', flat=True).first()
+    return user_key(user_id) if user_id else None
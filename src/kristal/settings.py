@@ -12,8 +12,10 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
-from decouple import config
+import sys
+from decouple import Csv, config
 from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
 
 load_dotenv()
 
@@ -89,6 +91,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'finest.instrumentation.RequestInstrumentationMiddleware',
+    'finest.replicas.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -96,7 +100,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'finest.middleware.AsyncWhiteNoiseMiddleware',
     'allauth.account.middleware.AccountMiddleware',
 ]
 
@@ -104,7 +108,7 @@ ROOT_URLCONF = 'kristal.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'finest.instrumentation.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR/'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -123,6 +127,11 @@ WSGI_APPLICATION = 'kristal.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+# Persistent connections belong to a thread. Under ASGI (FINEST_ASYNC_VIEWS)
+# sync code and gather_queries run in pooled threads which would each keep
+# one open, so connections are closed after each request and query there.
+
+DATABASE_CONN_MAX_AGE_DEFAULT = 0 if config('FINEST_ASYNC_VIEWS', default=False, cast=bool) else 60
 
 DATABASES = {
     'default': {
@@ -130,9 +139,46 @@ DATABASES = {
         'NAME': config('DATABASE_NAME'),
         'USER': config('DATABASE_USER'),
         'PASSWORD': config('DATABASE_PASSWORD'),
+        'CONN_MAX_AGE': config('DATABASE_CONN_MAX_AGE', default=DATABASE_CONN_MAX_AGE_DEFAULT, cast=int),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Read replicas: comma separated hosts serving copies of the default database,
+# added as replica_1, replica_2, ... Tests run them as mirrors of the default.
+# To try the routing locally, use a settings module with two databases, e.g.
+# two SQLite files, as default and replica_1 in FINEST_DATABASE_REPLICAS.
+for index, host in enumerate(config('DATABASE_REPLICA_HOSTS', default='', cast=Csv()), start=1):
+    DATABASES[f'replica_{index}'] = {**DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_ROUTERS = ['finest.replicas.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Leaderboards and dashboard summaries are invalidated by whichever process
+# writes, a web worker or run_jobs, so deployed processes must share one
+# in-memory cache: REDIS_URL is required. Development (DEBUG) and the tests
+# run a single process and use a local memory cache instead.
+
+TESTING = sys.argv[1:2] == ['test']
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+elif DEBUG or TESTING:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    raise ImproperlyConfigured('Set REDIS_URL, the cache shared by the web and run_jobs processes.')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -199,7 +245,7 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
-    'DEFAULT_FILTER_BACKENDS': 'django_filters.rest_framework.DjangoFilterBackend',
+    'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
 }
 
 #session timeout
@@ -219,3 +265,58 @@ SESSION_COOKIE_SAMESITE = 'Lax'
 
 LOGIN_REDIRECT_URL = 'dashboard/overview/'
 LOGOUT_REDIRECT_URL = '/'
+
+#background jobs: manage.py run_jobs pool size, seconds before a running job is retried,
+#and running jobs in-process on commit instead (tests and development without a worker)
+FINEST_JOB_WORKERS = config('FINEST_JOB_WORKERS', default=2, cast=int)
+FINEST_JOB_TIMEOUT = config('FINEST_JOB_TIMEOUT', default=600, cast=int)
+FINEST_JOBS_EAGER = config('FINEST_JOBS_EAGER', default=False, cast=bool)
+
+#batch projects API: largest request body accepted, screenshots included
+FINEST_BATCH_UPLOAD_MAX_SIZE = config('FINEST_BATCH_UPLOAD_MAX_SIZE', default=50 * 1024 * 1024, cast=int)
+
+#async read views, enabled by kristal/asgi.py
+FINEST_ASYNC_VIEWS = config('FINEST_ASYNC_VIEWS', default=False, cast=bool)
+
+#follower feeds: authors with more followers are merged on read
+FINEST_FEED_FANOUT_LIMIT = config('FINEST_FEED_FANOUT_LIMIT', default=1000, cast=int)
+
+#ranking scores: weight of the prior in reviews, run rebuild_rating_stats after a change
+FINEST_RATING_PRIOR_REVIEWS = config('FINEST_RATING_PRIOR_REVIEWS', default=5, cast=int)
+
+#read replicas: aliases reads of safe requests go to, and how long writers stay on the primary
+FINEST_DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica_')]
+FINEST_REPLICA_PIN_SECONDS = config('FINEST_REPLICA_PIN_SECONDS', default=10, cast=int)
+
+#per-request instrumentation and query budgets by url name
+FINEST_QUERY_BUDGET_STRICT = config('FINEST_QUERY_BUDGET_STRICT', default=False, cast=bool)
+FINEST_QUERY_BUDGETS = {
+    'home': 8,
+    'explore': 8,
+    'user_detail': 10,
+    'api_profiles': 6,
+    'api_profile_projects': 6,
+    'api_projects': 5,
+    'search': 6,
+    'my_post_detail': 6,
+    'all_post_details': 6,
+    'website_reviews': 3,
+    'my_reviews': 4,
+    'api_search': 3,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'finest': {
+            'handlers': ['console'],
+            'level': config('FINEST_LOG_LEVEL', default='INFO'),
+        },
+    },
+}